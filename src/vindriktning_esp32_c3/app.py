@@ -11,23 +11,32 @@ from faebryk.core.parameter import Parameter
 #    LayoutHeuristicElectricalClosenessPullResistors,
 # )
 from faebryk.libs.brightness import TypicalLuminousIntensity
+from faebryk.libs.library import L
 from faebryk.libs.units import P
 
-from vindriktning_esp32_c3.util import get_decoupling_caps
+from vindriktning_esp32_c3.util import design_index, get_decoupling_caps
+from vindriktning_esp32_c3.variants import DEFAULT_VARIANT, Variant
 from vindriktning_esp32_c3.vindriktning_esp32_c3_base import Vindriktning_ESP32_C3
 
 logger = logging.getLogger(__name__)
 
 
 class SmartVindrikting(Module):
+    def __init__(self, variant: Variant = DEFAULT_VARIANT):
+        super().__init__()
+        self._variant = variant
+
     # ----------------------------------------
     #     modules, interfaces, parameters
     # ----------------------------------------
 
-    mcu_pcb: Vindriktning_ESP32_C3
     particulate_sensor: F.PM1006
     fan: F.Fan
 
+    @L.rt_field
+    def mcu_pcb(self):
+        return Vindriktning_ESP32_C3(self._variant)
+
     def __preinit__(self):
         # ----------------------------------------
         #                aliasess
@@ -70,15 +79,19 @@ class SmartVindrikting(Module):
         # ----------------------------------------
         #            parametrization
         # ----------------------------------------
-        self.particulate_sensor.esphome_config.update_interval.merge(20 * P.s)
+        self.particulate_sensor.esphome_config.update_interval.merge(
+            self._variant.pm_update_interval_s * P.s
+        )
 
-        for node in self.get_children(direct_only=False, types=F.PoweredLED):
+        for node in design_index(self).of_type(F.PoweredLED):
             node.led.color.merge(F.LED.Color.RED)
             node.led.brightness.merge(
                 TypicalLuminousIntensity.APPLICATION_LED_STANDBY.value.value
             )
         self.mcu_pcb.qwiic_fuse.fuse_type.merge(F.Fuse.FuseType.RESETTABLE)
-        self.mcu_pcb.qwiic_fuse.trip_current.merge(F.Constant(550 * P.mA))
+        self.mcu_pcb.qwiic_fuse.trip_current.merge(
+            F.Constant(self._variant.qwiic_fuse_trip_current_mA * P.mA)
+        )
 
         for c in get_decoupling_caps(self):
             c.capacitance.merge(
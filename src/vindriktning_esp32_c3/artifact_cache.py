@@ -0,0 +1,198 @@
+import hashlib
+import http.client
+import io
+import logging
+import os
+import shutil
+import tarfile
+import tempfile
+import threading
+import urllib.error
+import urllib.request
+import zlib
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Protocol
+
+logger = logging.getLogger(__name__)
+
+# unreachable or misbehaving stores (urllib's HTTPError is an OSError too)
+_STORE_ERRORS = (OSError, http.client.HTTPException)
+# truncated or otherwise broken entries
+_ENTRY_ERRORS = (OSError, EOFError, tarfile.TarError, zlib.error)
+
+
+class Store(Protocol):
+    def get(self, key: str) -> bytes | None: ...
+
+    def put(self, key: str, data: bytes): ...
+
+
+class LocalStore:
+    def __init__(self, root: Path):
+        self.root = root
+
+    def _path(self, key: str) -> Path:
+        return self.root.joinpath(key[:2], key)
+
+    def get(self, key: str) -> bytes | None:
+        path = self._path(key)
+        return path.read_bytes() if path.is_file() else None
+
+    def put(self, key: str, data: bytes):
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # write + rename, so concurrent readers never see half an entry
+        fd, tmp = tempfile.mkstemp(dir=path.parent)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+
+class HttpStore:
+    """
+    GET/PUT <url>/<key>, e.g. against serve() or any WebDAV-ish server
+    """
+
+    def __init__(self, url: str, timeout: float = 30):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    def get(self, key: str) -> bytes | None:
+        try:
+            with urllib.request.urlopen(
+                f"{self.url}/{key}", timeout=self.timeout
+            ) as response:
+                return response.read()
+        except urllib.error.HTTPError as e:
+            if e.code == HTTPStatus.NOT_FOUND:
+                return None
+            raise
+
+    def put(self, key: str, data: bytes):
+        request = urllib.request.Request(f"{self.url}/{key}", data=data, method="PUT")
+        with urllib.request.urlopen(request, timeout=self.timeout):
+            pass
+
+
+def open_store(spec: str) -> Store:
+    if spec.startswith(("http://", "https://")):
+        return HttpStore(spec)
+    return LocalStore(Path(spec))
+
+
+def _pack(outputs: list[Path]) -> bytes:
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode="w:gz") as tar:
+        for i, path in enumerate(outputs):
+            tar.add(path, arcname=str(i))
+    return buf.getvalue()
+
+
+def _unpack(data: bytes, outputs: list[Path]):
+    with tempfile.TemporaryDirectory() as tmp:
+        with tarfile.open(fileobj=io.BytesIO(data), mode="r:gz") as tar:
+            tar.extractall(tmp, filter="data")
+        for i, path in enumerate(outputs):
+            extracted = Path(tmp, str(i))
+            path.parent.mkdir(parents=True, exist_ok=True)
+            if extracted.is_dir():
+                shutil.copytree(extracted, path, dirs_exist_ok=True)
+            else:
+                shutil.copyfile(extracted, path)
+
+
+class ArtifactCache:
+    """
+    Content-addressed cache of stage outputs, keyed on the stage input hashes
+
+    Failures of the store and broken entries are logged and treated as
+    misses, a broken cache never breaks the build.
+    """
+
+    def __init__(self, store: Store):
+        self.store = store
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(stage: str, fingerprint: str) -> str:
+        return hashlib.sha256(f"{stage}:{fingerprint}".encode()).hexdigest()
+
+    def fetch(self, stage: str, fingerprint: str, outputs: list[Path]) -> bool:
+        try:
+            data = self.store.get(self.key(stage, fingerprint))
+        except _STORE_ERRORS as e:
+            logger.warning(f"Artifact cache unavailable: {e!r}")
+            data = None
+        if data is not None:
+            try:
+                _unpack(data, outputs)
+            except _ENTRY_ERRORS as e:
+                logger.warning(f"Ignoring broken {stage} entry in cache: {e!r}")
+                data = None
+        if data is None:
+            self.misses += 1
+            return False
+        self.hits += 1
+        logger.info(f"Restored {stage} from artifact cache")
+        return True
+
+    def publish(self, stage: str, fingerprint: str, outputs: list[Path]):
+        if not all(path.exists() for path in outputs):
+            return
+        try:
+            self.store.put(self.key(stage, fingerprint), _pack(outputs))
+        except _STORE_ERRORS as e:
+            logger.warning(f"Could not publish {stage} to artifact cache: {e!r}")
+
+
+def make_server(
+    root: Path, host: str = "127.0.0.1", port: int = 0
+) -> ThreadingHTTPServer:
+    """
+    Minimal HTTP front for a LocalStore
+
+    Meant for local use and tests, there is no authentication.
+    """
+    store = LocalStore(root)
+
+    class Handler(BaseHTTPRequestHandler):
+        def _key(self) -> str | None:
+            key = self.path.strip("/")
+            return key if key.isalnum() else None
+
+        def do_GET(self):
+            key = self._key()
+            data = store.get(key) if key else None
+            if data is None:
+                self.send_error(HTTPStatus.NOT_FOUND)
+                return
+            self.send_response(HTTPStatus.OK)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_PUT(self):
+            key = self._key()
+            if key is None:
+                self.send_error(HTTPStatus.BAD_REQUEST)
+                return
+            store.put(key, self.rfile.read(int(self.headers["Content-Length"])))
+            self.send_response(HTTPStatus.CREATED)
+            self.end_headers()
+
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+    return ThreadingHTTPServer((host, port), Handler)
+
+
+def serve(root: Path, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """
+    Run make_server() in a background thread, port 0 picks a free port
+    """
+    server = make_server(root, host, port)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
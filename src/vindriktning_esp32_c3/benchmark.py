@@ -0,0 +1,513 @@
+import json
+import logging
+import math
+import multiprocessing
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+from contextlib import contextmanager
+from dataclasses import replace
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Optional
+
+import typer
+from typing_extensions import Annotated
+
+from vindriktning_esp32_c3.build import BuildPaths, _sync_source
+from vindriktning_esp32_c3.profiling import TRACER
+from vindriktning_esp32_c3.stages import faebryk_version
+
+if TYPE_CHECKING:
+    from multiprocessing.connection import Connection
+
+logger = logging.getLogger(__name__)
+
+cli = typer.Typer(help="Benchmark the build stages", add_completion=False)
+
+DEFAULT_BASELINE = BuildPaths.default().root.joinpath("benchmarks", "baseline.json")
+
+
+class _Timer:
+    def __init__(self, report: Callable[[str, float], None] | None = None):
+        self.timings: dict[str, float] = {}
+        self.report = report
+
+    @contextmanager
+    def __call__(self, name: str):
+        start = time.perf_counter()
+        yield
+        self.timings[name] = time.perf_counter() - start
+        if self.report is not None:
+            self.report(name, self.timings[name])
+
+
+# `main --help` must not pay for importing faebryk
+HELP_BUDGET = 1.0
+
+
+def time_cli_help() -> float:
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-m", "vindriktning_esp32_c3.main", "--help"],
+        check=True,
+        capture_output=True,
+    )
+    return time.perf_counter() - start
+
+
+def _scratch_paths(scratch: Path) -> BuildPaths:
+    """
+    The default build, but writing to scratch, with its own PCB and pick lock
+    """
+    default = BuildPaths.default()
+    build_dir = scratch.joinpath("build")
+    faebryk_build_dir = build_dir.joinpath("faebryk")
+    source = scratch.joinpath("source")
+    _sync_source(default.pcbfile.parent, source)
+    picks_lock = scratch.joinpath(default.picks_lock.name)
+    if default.picks_lock.exists():
+        shutil.copy(default.picks_lock, picks_lock)
+    return replace(
+        default,
+        build_dir=build_dir,
+        faebryk_build_dir=faebryk_build_dir,
+        netlist=faebryk_build_dir.joinpath("faebryk.net"),
+        pcbfile=source.joinpath(default.pcbfile.name),
+        esphome_config=build_dir.joinpath("esphome", "esphome.yaml"),
+        manufacturing_artifacts=build_dir.joinpath("manufacturing"),
+        parameters=faebryk_build_dir.joinpath("parameters.txt"),
+        picks_lock=picks_lock,
+    )
+
+
+def run_once(scratch: Path) -> dict[str, float]:
+    """
+    Time every build stage once, on a fresh design and a scratch copy of the PCB
+
+    Runs the real pipeline (layout and all exporters, serially) and reads the
+    stage times from its trace.
+    """
+    from vindriktning_esp32_c3.build import Pipeline
+    from vindriktning_esp32_c3.exporters import ExportError
+
+    pipeline = Pipeline(_scratch_paths(scratch), force=True, jobs=1, download_jobs=0)
+    TRACER.enabled, events = True, len(TRACER.events)
+    try:
+        pipeline.layout()
+        pipeline.export(
+            [*pipeline.artifacts_exporters(), pipeline.parameters_exporter()]
+        )
+        try:
+            pipeline.export([pipeline.esphome_exporter()])
+        except ExportError as e:
+            # same as the build: a design without esphome config has no stage
+            logger.warning(f"Skipping the esphome stage: {e}")
+    finally:
+        TRACER.enabled = False
+
+    timings: dict[str, float] = {}
+    for event in TRACER.events[events:]:
+        if event["cat"] in ("build", "export"):
+            timings[event["name"]] = timings.get(event["name"], 0) + event["dur"] / 1e6
+    del TRACER.events[events:]
+    return timings
+
+
+# DigitalLED scaling ---------------------------------------
+SCALING_PIXELS = [5, 50, 200, 1000]
+
+
+def scale_once(pixels: int, report: Callable[[str, float], None]):
+    """
+    Build, pick and lay out a lone DigitalLED string, timing each stage
+
+    report is called after every stage, so a run that is cut off still
+    tells how far it got.
+    """
+    import faebryk.library._F as F
+    from faebryk.core.module import Module
+    from faebryk.core.parameter import Parameter
+    from faebryk.exporters.pcb.layout.typehierarchy import LayoutTypeHierarchy
+    from faebryk.libs.app.kicad_netlist import write_netlist
+    from faebryk.libs.app.pcb import apply_layouts
+    from faebryk.libs.app.parameters import replace_tbd_with_any
+    from faebryk.libs.picker.picker import pick_part_recursively
+    from faebryk.libs.units import P
+
+    from vindriktning_esp32_c3.checks import run_checks
+    from vindriktning_esp32_c3.modules.DigitalLED import DigitalLED
+    from vindriktning_esp32_c3.pcb import digital_led_layout
+    from vindriktning_esp32_c3.pickers import add_app_pickers
+    from vindriktning_esp32_c3.util import get_decoupling_caps, iter_children
+
+    BuildPaths.default().setup_lcsc()
+
+    t = _Timer(report)
+    with t("construct"):
+        # same constraints the app puts on the string
+        leds = DigitalLED(pixels, buffered=True)
+        leds.max_refresh_rate.merge(60 * P.Hz)
+        leds.power.voltage.merge(5 * P.V)
+        leds.power_data.voltage.merge(3.3 * P.V)
+        for c in get_decoupling_caps(leds):
+            c.capacitance.merge(F.Range.from_center(100 * P.nF, 50 * P.nF))
+            try:
+                c.rated_voltage.merge(F.Range.lower_bound(10 * P.V))
+            except Parameter.MergeException:
+                ...
+    with t("get_graph"):
+        G = leds.get_graph()
+    with t("replace_tbd_with_any"):
+        replace_tbd_with_any(leds, recursive=True, loglvl=logging.DEBUG)
+    with t("pick"):
+        for m in {n.get_most_special() for n in iter_children(leds, types=Module)}:
+            add_app_pickers(m)
+        pick_part_recursively(leds)
+    with t("run_checks"):
+        run_checks(leds, G)
+    with t("layout"):
+        leds.add(
+            F.has_pcb_layout_defined(LayoutTypeHierarchy([digital_led_layout(pixels)]))
+        )
+        apply_layouts(leds)
+        for n in iter_children(leds, types=Module):
+            if n.has_trait(F.has_pcb_position):
+                n.get_trait(F.has_pcb_position).get_position()
+    with tempfile.TemporaryDirectory(prefix="vindriktning-scale-") as scratch:
+        with t("netlist"):
+            write_netlist(G, Path(scratch, "leds.net"), use_kicad_designators=True)
+
+
+# recorded in place of a stage that did not finish
+_UNFINISHED = ("timeout", "failed")
+
+
+def _scale_worker(pixels: int, conn: "Connection"):
+    try:
+        scale_once(pixels, lambda name, duration: conn.send((name, duration)))
+    except Exception:
+        conn.send(("failed", traceback.format_exc()))
+        raise
+    finally:
+        conn.close()
+
+
+def run_scaling(pixel_counts: list[int], budget: float) -> dict:
+    """
+    Time scale_once for every pixel count, each in its own process
+
+    A run exceeding the budget is killed and recorded as "timeout", a run
+    that raises (e.g. a RecursionError) is recorded as "failed". Either way
+    larger pixel counts are skipped.
+    """
+    ctx = multiprocessing.get_context("spawn")
+    results: dict[int, dict[str, float | None]] = {}
+    for pixels in sorted(pixel_counts):
+        logger.info(f"Scaling run with {pixels} pixels")
+        recv, send = ctx.Pipe(duplex=False)
+        worker = ctx.Process(target=_scale_worker, args=(pixels, send))
+        worker.start()
+        send.close()
+
+        timings: dict[str, float | None] = {}
+        deadline = time.monotonic() + budget
+        timed_out = False
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not recv.poll(remaining):
+                timed_out = remaining <= 0 or worker.is_alive()
+                break
+            try:
+                name, duration = recv.recv()
+            except EOFError:
+                break
+            if name == "failed":
+                logger.error(f"Scaling run with {pixels} pixels failed:\n{duration}")
+                duration = None
+            timings[name] = duration
+        if timed_out:
+            worker.kill()
+            timings["timeout"] = None
+        worker.join()
+        if not timed_out and worker.exitcode != 0 and "failed" not in timings:
+            logger.error(
+                f"Scaling run with {pixels} pixels exited with {worker.exitcode}"
+            )
+            timings["failed"] = None
+        results[pixels] = timings
+        if timed_out:
+            logger.warning(f"{pixels} pixels exceeded {budget:.0f}s, stopping")
+            break
+        if "failed" in timings:
+            break
+
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "faebryk": faebryk_version(),
+            "budget": budget,
+            "timestamp": time.time(),
+        },
+        "pixels": results,
+        "exponents": scaling_exponents(results),
+    }
+
+
+def scaling_exponents(
+    results: dict[int, dict[str, float | None]], min_duration: float = 0.01
+) -> dict[str, float]:
+    """
+    Slope of log(time) over log(pixels) per stage, 1 is linear
+
+    Timings below min_duration are mostly overhead and left out of the fit.
+    """
+    points: dict[str, list[tuple[float, float]]] = {}
+    for pixels, timings in results.items():
+        for name, duration in timings.items():
+            if duration is not None and duration >= min_duration:
+                points.setdefault(name, []).append(
+                    (math.log(pixels), math.log(duration))
+                )
+
+    exponents = {}
+    for name, pts in points.items():
+        if len({x for x, _ in pts}) < 2:
+            continue
+        x_mean = statistics.fmean(x for x, _ in pts)
+        y_mean = statistics.fmean(y for _, y in pts)
+        exponents[name] = sum((x - x_mean) * (y - y_mean) for x, y in pts) / sum(
+            (x - x_mean) ** 2 for x, _ in pts
+        )
+    return exponents
+
+
+def _print_scaling_table(results: dict, max_exponent: float):
+    from rich.console import Console
+    from rich.table import Table
+
+    pixel_counts = list(results["pixels"])
+    stages = list(dict.fromkeys(s for t in results["pixels"].values() for s in t))
+    stages = [s for s in stages if s not in _UNFINISHED]
+
+    table = Table("stage", *(f"{n} px [s]" for n in pixel_counts), "exponent")
+    for stage_name in stages:
+        exponent = results["exponents"].get(stage_name)
+        if exponent is None:
+            exponent_cell = "-"
+        elif exponent > max_exponent:
+            exponent_cell = f"[red]{exponent:.2f}[/red]"
+        else:
+            exponent_cell = f"{exponent:.2f}"
+        cells = []
+        for n in pixel_counts:
+            timings = results["pixels"][n]
+            if stage_name in timings:
+                cells.append(f"{timings[stage_name]:.3f}")
+            elif unfinished := [s for s in _UNFINISHED if s in timings]:
+                cells.append(f"[red]{unfinished[0]}[/red]")
+            else:
+                cells.append("-")
+        table.add_row(stage_name, *cells, exponent_cell)
+    Console().print(table)
+
+
+def plot_scaling(results: dict, path: Path):
+    """
+    Log-log plot of the stage times, needs matplotlib
+    """
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots()
+    stages = {s for t in results["pixels"].values() for s in t} - set(_UNFINISHED)
+    for stage_name in sorted(stages):
+        pts = [
+            (int(n), t[stage_name])
+            for n, t in results["pixels"].items()
+            if t.get(stage_name) is not None
+        ]
+        ax.loglog(*zip(*pts), marker="o", label=stage_name)
+    ax.set_xlabel("pixels")
+    ax.set_ylabel("time [s]")
+    ax.legend()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fig.savefig(path)
+
+
+def run_benchmarks(repeat: int = 3) -> dict:
+    runs: list[dict[str, float]] = []
+    for i in range(repeat):
+        logger.info(f"Benchmark run {i + 1}/{repeat}")
+        with tempfile.TemporaryDirectory(prefix="vindriktning-bench-") as scratch:
+            timings = run_once(Path(scratch))
+        timings["cli_help"] = time_cli_help()
+        runs.append(timings)
+
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "faebryk": faebryk_version(),
+            "machine": platform.machine(),
+            "repeat": repeat,
+            "timestamp": time.time(),
+        },
+        # median, so a single noisy run doesn't move the baseline
+        "stages": {
+            name: statistics.median(run[name] for run in runs) for name in runs[0]
+        },
+    }
+
+
+def compare(
+    baseline: dict, current: dict, threshold_pct: float, min_delta_s: float = 0.05
+) -> dict[str, tuple[float, float, float]]:
+    """
+    Return the stages that got slower than threshold_pct relative to baseline
+
+    Differences below min_delta_s are ignored, they are mostly noise.
+    """
+    regressions = {}
+    for name, old in baseline["stages"].items():
+        new = current["stages"].get(name)
+        if new is None or old <= 0:
+            continue
+        change_pct = (new - old) / old * 100
+        if change_pct > threshold_pct and new - old > min_delta_s:
+            regressions[name] = (old, new, change_pct)
+    return regressions
+
+
+def _print_table(baseline: dict | None, current: dict):
+    from rich.console import Console
+    from rich.table import Table
+
+    table = Table("stage", "baseline [s]", "current [s]", "change")
+    for name, new in current["stages"].items():
+        old = baseline["stages"].get(name) if baseline else None
+        table.add_row(
+            name,
+            f"{old:.3f}" if old is not None else "-",
+            f"{new:.3f}",
+            f"{(new - old) / old * 100:+.1f}%" if old else "-",
+        )
+    Console().print(table)
+
+
+@cli.command()
+def run(
+    output: Annotated[Path, typer.Option(help="Where to store the results")] = Path(
+        "./build/benchmarks/latest.json"
+    ),
+    repeat: Annotated[int, typer.Option(help="Number of runs per stage")] = 3,
+    help_budget: Annotated[
+        float, typer.Option(help="Maximum time in seconds for `main --help`")
+    ] = HELP_BUDGET,
+):
+    """
+    Benchmark every build stage and store the results as JSON
+    """
+    from faebryk.libs.logging import setup_basic_logging
+
+    setup_basic_logging()
+
+    results = run_benchmarks(repeat)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=4))
+    _print_table(None, results)
+
+    if results["stages"]["cli_help"] > help_budget:
+        logger.error(
+            f"`main --help` took {results['stages']['cli_help']:.2f}s,"
+            f" budget is {help_budget:.2f}s"
+        )
+        raise typer.Exit(1)
+
+
+@cli.command()
+def scaling(
+    pixels: Annotated[
+        Optional[list[int]],
+        typer.Option(help="Pixel counts to build, repeat for several"),
+    ] = None,
+    output: Annotated[Path, typer.Option(help="Where to store the results")] = Path(
+        "./build/benchmarks/scaling.json"
+    ),
+    plot: Annotated[
+        Optional[Path], typer.Option(help="Also plot the results (needs matplotlib)")
+    ] = Path("./build/benchmarks/scaling.png"),
+    budget: Annotated[
+        float, typer.Option(help="Time budget in seconds per pixel count")
+    ] = 600.0,
+    max_exponent: Annotated[
+        float, typer.Option(help="Fail if a stage scales worse than n^x")
+    ] = 1.2,
+):
+    """
+    Time how every stage scales with the number of DigitalLED pixels
+    """
+    from faebryk.libs.logging import setup_basic_logging
+
+    setup_basic_logging()
+
+    results = run_scaling(pixels or SCALING_PIXELS, budget)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=4))
+    _print_scaling_table(results, max_exponent)
+
+    if plot is not None:
+        try:
+            plot_scaling(results, plot)
+        except ImportError:
+            logger.warning("matplotlib is not installed, skipping the plot")
+
+    superlinear = {
+        name: exponent
+        for name, exponent in results["exponents"].items()
+        if exponent > max_exponent
+    }
+    for name, exponent in superlinear.items():
+        logger.error(f"{name} scales with n^{exponent:.2f}")
+    if superlinear or any(
+        s in t for t in results["pixels"].values() for s in _UNFINISHED
+    ):
+        raise typer.Exit(1)
+
+
+@cli.command("compare")
+def compare_cmd(
+    current: Annotated[Path, typer.Argument(help="Results of `bench run`")] = Path(
+        "./build/benchmarks/latest.json"
+    ),
+    baseline: Annotated[
+        Optional[Path], typer.Option(help="Baseline to compare against")
+    ] = None,
+    threshold: Annotated[
+        float, typer.Option(help="Allowed slowdown per stage in percent")
+    ] = 10.0,
+):
+    """
+    Fail if any stage regressed by more than the threshold
+    """
+    baseline = baseline or DEFAULT_BASELINE
+    if not baseline.is_file():
+        logger.error(
+            f"No baseline at {baseline}, record one with"
+            f" `bench run --output {baseline}`"
+        )
+        raise typer.Exit(1)
+    baseline_data = json.loads(baseline.read_text())
+    current_data = json.loads(current.read_text())
+    _print_table(baseline_data, current_data)
+
+    regressions = compare(baseline_data, current_data, threshold)
+    for name, (old, new, change_pct) in regressions.items():
+        logger.error(f"{name} regressed: {old:.3f}s -> {new:.3f}s ({change_pct:+.1f}%)")
+    if regressions:
+        raise typer.Exit(1)
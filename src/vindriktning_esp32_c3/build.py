@@ -0,0 +1,689 @@
+import gc
+import logging
+import os
+import shutil
+import sys
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable
+
+from vindriktning_esp32_c3.artifact_cache import ArtifactCache
+from vindriktning_esp32_c3.exporters import Exporter, run_exporters
+from vindriktning_esp32_c3.part_store import get_part_store
+from vindriktning_esp32_c3.prefetch import (
+    start_background_prefetch,
+    stop_background_prefetch,
+)
+from vindriktning_esp32_c3.profiling import span, stage
+from vindriktning_esp32_c3.snapshot import (
+    load_snapshot,
+    save_snapshot,
+    take_snapshot,
+    write_esphome_config,
+    write_parameters,
+)
+from vindriktning_esp32_c3.stages import (
+    LAYOUT_SOURCES,
+    SOURCE_DIR,
+    TOOLING_SOURCES,
+    StageTracker,
+    faebryk_version,
+    fingerprint,
+    hash_file,
+    hash_tree,
+)
+from vindriktning_esp32_c3.variants import DEFAULT_VARIANT, Variant
+
+if TYPE_CHECKING:
+    from faebryk.core.graphinterface import Graph
+    from faebryk.core.node import Node
+    from faebryk.core.trait import Trait, TraitImpl
+    from faebryk.exporters.pcb.kicad.transformer import PCB_Transformer
+
+    from vindriktning_esp32_c3.app import SmartVindrikting
+
+# faebryk is only imported inside the functions below, so the CLI can start
+# (and print its help) without paying for the whole library
+
+logger = logging.getLogger(__name__)
+
+
+class BuildError(Exception): ...
+
+
+# what faebryk's export_pcba_artifacts writes, next to them goes pcba.svg
+PCBA_ARTIFACTS = (
+    "cad",
+    "gerber.zip",
+    "jlcpcb_bom.csv",
+    "jlcpcb_pick_and_place.csv",
+    "pick_and_place.csv",
+)
+
+
+def _sync_source(source: Path, copy: Path):
+    """
+    Copy the KiCad project, unless copy was made from the same project
+    """
+    fp = hash_tree(source)
+    stamp = copy.with_name(copy.name + ".fingerprint")
+    if copy.exists() and stamp.exists() and stamp.read_text() == fp:
+        return
+    shutil.rmtree(copy, ignore_errors=True)
+    shutil.copytree(source, copy)
+    # the library paths are relative to the project
+    lib_table = copy.joinpath("fp-lib-table")
+    if lib_table.exists():
+        rel = os.path.relpath(source.resolve(), copy.resolve())
+        lib_table.write_text(
+            lib_table.read_text().replace("${KIPRJMOD}/", f"${{KIPRJMOD}}/{rel}/")
+        )
+    stamp.write_text(fp)
+
+
+@dataclass
+class BuildPaths:
+    root: Path
+    # shared by all variants: part cache, libs, ...
+    shared_build_dir: Path
+    build_dir: Path
+    faebryk_build_dir: Path
+    netlist: Path
+    pcbfile: Path
+    esphome_config: Path
+    manufacturing_artifacts: Path
+    parameters: Path
+    # checked in for the default build, so releases keep their parts
+    picks_lock: Path
+
+    @property
+    def part_cache(self) -> Path:
+        return self.shared_build_dir.joinpath("cache", "easyeda-store")
+
+    def setup_lcsc(self):
+        """
+        Point faebryk's LCSC part cache and library exports at this build
+
+        faebryk reads and downloads the raw part data through the part store.
+        """
+        import faebryk.libs.picker.lcsc as lcsc
+
+        from vindriktning_esp32_c3 import part_store
+
+        lcsc.BUILD_FOLDER = self.shared_build_dir
+        lcsc.LIB_FOLDER = self.root.joinpath("libs")
+        lcsc.get_raw = part_store.get_raw
+
+    @classmethod
+    def default(cls) -> "BuildPaths":
+        root = Path(__file__).parent.parent.parent
+        build_dir = Path("./build")
+        faebryk_build_dir = build_dir.joinpath("faebryk")
+        return cls(
+            root=root,
+            shared_build_dir=build_dir,
+            build_dir=build_dir,
+            faebryk_build_dir=faebryk_build_dir,
+            netlist=faebryk_build_dir.joinpath("faebryk.net"),
+            pcbfile=root.joinpath("source", "main.kicad_pcb"),
+            esphome_config=build_dir.joinpath("esphome", "esphome.yaml"),
+            manufacturing_artifacts=build_dir.joinpath("manufacturing"),
+            parameters=faebryk_build_dir.joinpath("parameters.txt"),
+            picks_lock=root.joinpath("picks.lock"),
+        )
+
+    @classmethod
+    def for_variant(cls, name: str) -> "BuildPaths":
+        """
+        Separate build directory with its own copy of the KiCad project
+
+        The copy is replaced whenever the project changed since it was made.
+        The variant's pick lock stays in its build directory, out of git.
+        """
+        default = cls.default()
+        build_dir = default.build_dir.joinpath("variants", name)
+        faebryk_build_dir = build_dir.joinpath("faebryk")
+        source = build_dir.joinpath("source")
+        _sync_source(default.pcbfile.parent, source)
+        return cls(
+            root=default.root,
+            shared_build_dir=default.build_dir,
+            build_dir=build_dir,
+            faebryk_build_dir=faebryk_build_dir,
+            netlist=faebryk_build_dir.joinpath("faebryk.net"),
+            pcbfile=source.joinpath(default.pcbfile.name),
+            esphome_config=build_dir.joinpath("esphome", "esphome.yaml"),
+            manufacturing_artifacts=build_dir.joinpath("manufacturing"),
+            parameters=faebryk_build_dir.joinpath("parameters.txt"),
+            picks_lock=build_dir.joinpath("picks.lock"),
+        )
+
+
+def _caused_by_recursion(e: BaseException | None) -> bool:
+    # faebryk wraps errors in the construction of a field in a
+    # FieldConstructionError, and those while connecting in a plain Exception
+    while e is not None:
+        if isinstance(e, RecursionError):
+            return True
+        e = e.__cause__ or e.__context__
+    return False
+
+
+def build_design(
+    variant: Variant = DEFAULT_VARIANT,
+    picks_lock: Path | None = None,
+) -> tuple["SmartVindrikting", "Graph"]:
+    from faebryk.core.module import Module
+    from faebryk.libs.app.parameters import replace_tbd_with_any
+    from faebryk.libs.picker.picker import pick_part_recursively
+
+    from vindriktning_esp32_c3.app import SmartVindrikting
+    from vindriktning_esp32_c3.nets import NetNameError, net_index
+    from vindriktning_esp32_c3.pick_cache import PICK_CACHE
+    from vindriktning_esp32_c3.pick_lock import PickLock
+    from vindriktning_esp32_c3.pickers import add_app_pickers
+    from vindriktning_esp32_c3.util import design_index
+
+    logger.info("Make app")
+    try:
+        with stage("make_app"):
+            app = SmartVindrikting(variant)
+    except Exception as e:
+        if not _caused_by_recursion(e):
+            raise
+        raise BuildError(
+            f"Recursion limit ({sys.getrecursionlimit()}) exceeded while "
+            "constructing the app"
+        ) from e
+    logger.info("Build graph")
+    with stage("get_graph"):
+        G = app.get_graph()
+    with stage("net_index"):
+        try:
+            net_index(app)
+        except NetNameError as e:
+            raise BuildError(str(e)) from e
+
+    logger.info("Filling unspecified parameters")
+    with stage("replace_tbd_with_any"):
+        replace_tbd_with_any(app, recursive=True, loglvl=logging.DEBUG)
+
+    logger.info("Picking parts")
+    modules = {n.get_most_special() for n in design_index(app).of_type(Module)}
+    with stage("add_app_pickers"):
+        for m in modules:
+            # add_jlcpcb_pickers(m, base_prio=10)
+            add_app_pickers(m)
+    lock = PickLock(picks_lock) if picks_lock else None
+    PICK_CACHE.use_lock(lock, modules)
+    try:
+        with stage("pick_part_recursively"):
+            pick_part_recursively(app)
+    finally:
+        PICK_CACHE.use_lock(None)
+    stats = PICK_CACHE.stats()
+    logger.info(
+        f"Pick cache: {stats['hits']} hits, {stats['misses']} misses, "
+        f"{stats['uncached']} not cacheable"
+    )
+    if lock is not None:
+        logger.info(f"Applied {lock.applied} locked picks")
+        lock.save()
+
+    return app, G
+
+
+def release_pickers(app: "SmartVindrikting"):
+    """
+    Drop the picker tables, they are not needed anymore once parts are picked
+    """
+    import faebryk.library._F as F
+    from faebryk.core.module import Module
+
+    from vindriktning_esp32_c3.util import design_index, iter_children
+
+    for m in iter_children(app, types=Module):
+        if m.has_trait(F.has_multi_picker):
+            m.del_trait(F.has_multi_picker)
+    design_index(app).invalidate()
+    gc.collect()
+
+
+def release_pcb(app: "SmartVindrikting"):
+    """
+    Drop the links into the parsed PCB, so it can be freed after apply_design
+    """
+    from faebryk.core.node import Node
+    from faebryk.exporters.pcb.kicad.transformer import PCB_Transformer
+
+    from vindriktning_esp32_c3.util import design_index, iter_children
+
+    linked = (
+        PCB_Transformer.has_linked_kicad_footprint,
+        PCB_Transformer.has_linked_kicad_pad,
+    )
+    for n in iter_children(app, types=Node):
+        for trait in linked:
+            if n.has_trait(trait):
+                n.del_trait(trait)
+    design_index(app).invalidate()
+    gc.collect()
+
+
+def _layout_traits() -> tuple[type["Trait"], ...]:
+    import faebryk.library._F as F
+    from faebryk.exporters.pcb.kicad.transformer import PCB_Transformer
+
+    return (
+        F.has_pcb_position,
+        F.has_pcb_layout,
+        F.has_pcb_routing_strategy,
+        PCB_Transformer.has_linked_kicad_footprint,
+        PCB_Transformer.has_linked_kicad_pad,
+    )
+
+
+def layout_state(app: "SmartVindrikting") -> dict["Node", list["TraitImpl"]]:
+    """
+    The placement and PCB traits of every node, see restore_layout_state()
+    """
+    from faebryk.core.node import Node
+    from faebryk.core.trait import TraitImpl
+
+    from vindriktning_esp32_c3.util import iter_children
+
+    traits = _layout_traits()
+    return {
+        n: n.get_children(
+            direct_only=True,
+            types=TraitImpl,
+            f_filter=lambda t: any(t.implements(trait) for trait in traits),
+        )
+        for n in (app, *iter_children(app, types=Node))
+    }
+
+
+def restore_layout_state(
+    app: "SmartVindrikting", state: dict["Node", list["TraitImpl"]]
+):
+    """
+    Undo a layout: put the traits of layout_state() back
+
+    The layout adds positions and layouts and skips nodes that already have a
+    position, so a design can only be laid out again once they are dropped.
+    The traits the netlist adds (designators, net names) are kept, writing
+    the netlist reuses them.
+    """
+    from faebryk.core.trait import TraitImpl
+
+    from vindriktning_esp32_c3.util import design_index
+
+    traits = _layout_traits()
+    for n, before in state.items():
+        kept = {id(t) for t in before}
+        for t in n.get_children(
+            direct_only=True,
+            types=TraitImpl,
+            f_filter=lambda t: any(t.implements(trait) for trait in traits),
+        ):
+            if id(t) not in kept:
+                n._remove_child(t)
+        for t in before:
+            # replaced by one of the layout
+            if t.get_parent() is None:
+                n.add(t)
+    design_index(app).invalidate()
+
+
+def relayout_pcb(
+    pcbfile: Path,
+    G: "Graph",
+    app: "SmartVindrikting",
+    transform: Callable[["PCB_Transformer"], Any],
+):
+    """
+    faebryk's apply_design without writing and applying the netlist
+
+    Only valid for a PCB the same design was already applied to, e.g. to lay
+    it out again after the layout script changed.
+    """
+    from faebryk.exporters.pcb.kicad.transformer import PCB_Transformer
+    from faebryk.libs.app.pcb import apply_layouts, apply_routing
+    from faebryk.libs.kicad.fileformats import C_kicad_pcb_file
+
+    pcb = C_kicad_pcb_file.loads(pcbfile)
+    transformer = PCB_Transformer(pcb.kicad_pcb, G, app)
+    transform(transformer)
+    apply_layouts(app)
+    transformer.move_footprints()
+    apply_routing(app, transformer)
+    logger.info(f"Writing pcbfile {pcbfile}")
+    pcb.dumps(pcbfile)
+
+
+class Pipeline:
+    """
+    The build stages of the project, each skipped when its inputs are unchanged
+
+    The design is only constructed (once) when a stale stage needs it.
+    With an artifact cache, stale stages are first looked up there by their
+    input fingerprint and only run (and published) on a miss.
+    In lean mode, data a later stage doesn't need anymore is dropped as soon
+    as possible to keep the peak memory down.
+    """
+
+    def __init__(
+        self,
+        paths: BuildPaths | None = None,
+        force: bool = False,
+        jobs: int | None = None,
+        lean: bool = False,
+        variant: Variant = DEFAULT_VARIANT,
+        cache: ArtifactCache | None = None,
+        download_jobs: int = 8,
+    ):
+        self.paths = paths or BuildPaths.default()
+        self.variant = variant
+        self.cache = cache
+        self.jobs = jobs
+        self.download_jobs = download_jobs
+        self.lean = lean
+        self.paths.faebryk_build_dir.mkdir(parents=True, exist_ok=True)
+        self.tracker = StageTracker(
+            self.paths.faebryk_build_dir.joinpath("stages.json"),
+            self.paths.root,
+            force=force,
+        )
+        self.design_fp = self._design_fingerprint()
+        self.snapshot_path = self.paths.faebryk_build_dir.joinpath(
+            "design.snapshot.json"
+        )
+        self._design: tuple["SmartVindrikting", "Graph"] | None = None
+        # layout traits of the design before its first layout, to lay it out
+        # again without rebuilding it
+        self._unlaid: dict["Node", list["TraitImpl"]] | None = None
+        # hash of the PCB as the last layout of the design wrote it
+        self._laid_out_pcb: str | None = None
+        self._snapshot: dict | None = None
+
+    def _design_fingerprint(self) -> str:
+        return fingerprint(
+            sources=hash_tree(
+                SOURCE_DIR, "*.py", exclude=LAYOUT_SOURCES + TOOLING_SOURCES
+            ),
+            faebryk=faebryk_version(),
+            pickers=hash_file(SOURCE_DIR.joinpath("pickers.py")),
+            picks_lock=hash_file(self.paths.picks_lock),
+            variant=asdict(self.variant),
+        )
+
+    def refresh(self, keep_design: bool = False):
+        """
+        Pick up source changes made since the pipeline was created
+
+        keep_design reuses the already built design, which is only valid if
+        the changes don't affect it (e.g. only the layout script changed).
+        """
+        self.design_fp = self._design_fingerprint()
+        self._snapshot = None
+        if not keep_design:
+            self._design = None
+
+    def get_design(self) -> tuple["SmartVindrikting", "Graph"]:
+        if self._design is None:
+            self.paths.setup_lcsc()
+
+            # parts picked by someone else for the same design, saves the
+            # EasyEDA downloads
+            self._restore("parts", self.design_fp, [self.paths.part_cache])
+            if self.download_jobs:
+                start_background_prefetch(self.paths, self.download_jobs)
+            try:
+                with span("build_design"):
+                    self._design = build_design(self.variant, self.paths.picks_lock)
+                self._unlaid = None
+                self._laid_out_pcb = None
+            finally:
+                stop_background_prefetch()
+            get_part_store().evict()
+            # the build (re)writes the lock, its picks are the ones just made
+            self.design_fp = self._design_fingerprint()
+            with stage("snapshot"):
+                try:
+                    self._snapshot = take_snapshot(*self._design, self.design_fp)
+                except Exception as e:
+                    # only an optimization for later runs, don't fail the
+                    # stages that don't need it
+                    logger.warning(f"Could not snapshot the design: {e!r}")
+                else:
+                    save_snapshot(self._snapshot, self.snapshot_path)
+            self._publish("parts", self.design_fp, [self.paths.part_cache])
+            if self._snapshot is not None:
+                self._publish("design", self.design_fp, [self.snapshot_path])
+            if self.lean:
+                with stage("release_pickers"):
+                    release_pickers(self._design[0])
+        return self._design
+
+    def get_snapshot(self) -> dict | None:
+        """
+        The snapshot of the current design, if one was taken from these sources
+        """
+        if self._snapshot is None:
+            with span("load_snapshot"):
+                self._snapshot = load_snapshot(self.snapshot_path, self.design_fp)
+            if self._snapshot is None and self._restore(
+                "design", self.design_fp, [self.snapshot_path]
+            ):
+                self._snapshot = load_snapshot(self.snapshot_path, self.design_fp)
+        return self._snapshot
+
+    def _restore(self, name: str, fp: str, outputs: list[Path]) -> bool:
+        if self.cache is None:
+            return False
+        with span(f"cache_fetch:{name}", cat="cache"):
+            return self.cache.fetch(name, fp, outputs)
+
+    def _publish(self, name: str, fp: str, outputs: list[Path]):
+        if self.cache is None:
+            return
+        with span(f"cache_publish:{name}", cat="cache"):
+            self.cache.publish(name, fp, outputs)
+
+    # stages -------------------------------------------------
+    def layout(self):
+        outputs = [self.paths.pcbfile, self.paths.netlist]
+        layout_fp = self.layout_fingerprint()
+        if self.tracker.is_up_to_date("layout", layout_fp, outputs):
+            logger.info("Design and layout up to date, skipping")
+            return
+
+        # the PCB is in- and output, the cached result is only valid for the
+        # PCB it was applied to
+        pcb_in = hash_file(self.paths.pcbfile)
+        cache_fp = fingerprint(layout=layout_fp, pcb=pcb_in)
+        if self._restore("layout", cache_fp, outputs):
+            self.tracker.record("layout", layout_fp, outputs)
+            return
+
+        from faebryk.libs.app.pcb import apply_design
+
+        from vindriktning_esp32_c3.checks import run_checks
+        from vindriktning_esp32_c3.pcb import transform_pcb
+
+        app, G = self.get_design()
+        # building rewrites picks.lock, record the layout under the lock the
+        # next run will find
+        layout_fp = self.layout_fingerprint()
+        cache_fp = fingerprint(layout=layout_fp, pcb=pcb_in)
+        if self._unlaid is None:
+            with stage("run_checks"):
+                run_checks(app, G)
+            self._unlaid = layout_state(app)
+        else:
+            with stage("restore_layout_state"):
+                restore_layout_state(app, self._unlaid)
+
+        if self._laid_out_pcb == hash_file(self.paths.pcbfile):
+            # our own output, the netlist of this design is already applied
+            with stage("relayout_pcb"):
+                relayout_pcb(self.paths.pcbfile, G, app, transform_pcb)
+        else:
+            with stage("apply_design"):
+                apply_design(
+                    self.paths.pcbfile, self.paths.netlist, G, app, transform_pcb
+                )
+        self._laid_out_pcb = hash_file(self.paths.pcbfile)
+        self.tracker.record("layout", layout_fp, outputs)
+        self._publish("layout", cache_fp, outputs)
+        if self.lean:
+            with stage("release_pcb"):
+                release_pcb(app)
+
+    def export(self, exporters: list[tuple[Exporter, Callable[[], str]]]):
+        """
+        Run the exporters that are not up to date
+
+        Each exporter comes with a function returning its input fingerprint.
+        It is called again after the design was built here, as building
+        rewrites picks.lock.
+        """
+        stale = []
+        for exporter, fp in exporters:
+            outputs = list(exporter.outputs.values())
+            if self.tracker.is_up_to_date(exporter.name, fp(), outputs):
+                logger.info(f"Exporter {exporter.name} up to date, skipping")
+            elif self._restore(exporter.name, fp(), outputs):
+                self.tracker.record(exporter.name, fp(), outputs)
+            else:
+                stale.append((exporter, fp))
+        if not stale:
+            return
+
+        # build before forking, so all workers share the same design
+        if any(exporter.needs_design for exporter, _ in stale):
+            self.get_design()
+        with stage("export"):
+            run_exporters(
+                [exporter for exporter, _ in stale],
+                self.paths.faebryk_build_dir.joinpath("export_staging"),
+                self.jobs,
+            )
+        for exporter, fp in stale:
+            outputs = list(exporter.outputs.values())
+            self.tracker.record(exporter.name, fp(), outputs)
+            self._publish(exporter.name, fp(), outputs)
+
+    # exporters ----------------------------------------------
+    def layout_fingerprint(self) -> str:
+        return fingerprint(
+            design=self.design_fp,
+            sources={
+                name: hash_file(SOURCE_DIR.joinpath(name)) for name in LAYOUT_SOURCES
+            },
+        )
+
+    def pcb_fingerprint(self) -> str:
+        return fingerprint(design=self.design_fp, pcb=hash_file(self.paths.pcbfile))
+
+    def artifacts_exporters(self) -> list[tuple[Exporter, Callable[[], str]]]:
+        paths = self.paths
+
+        def _export_artifacts(d: Path):
+            from faebryk.libs.app.manufacturing import export_pcba_artifacts
+
+            export_pcba_artifacts(d, paths.pcbfile, self.get_design()[0])
+
+        def _export_svg(d: Path):
+            from faebryk.exporters.pcb.kicad.artifacts import export_svg
+
+            export_svg(paths.pcbfile, d.joinpath("pcba.svg"))
+
+        fp = self.pcb_fingerprint
+        return [
+            (
+                Exporter(
+                    "artifacts",
+                    _export_artifacts,
+                    {
+                        name: paths.manufacturing_artifacts.joinpath(name)
+                        for name in PCBA_ARTIFACTS
+                    },
+                ),
+                fp,
+            ),
+            (
+                Exporter(
+                    "svg",
+                    _export_svg,
+                    {"pcba.svg": paths.manufacturing_artifacts.joinpath("pcba.svg")},
+                ),
+                fp,
+            ),
+        ]
+
+    def esphome_exporter(self) -> tuple[Exporter, Callable[[], str]]:
+        snapshot = self.get_snapshot() if self._design is None else None
+        if snapshot is not None and snapshot["esphome"] is not None:
+            return (
+                Exporter(
+                    "esphome",
+                    lambda d: write_esphome_config(
+                        snapshot, d.joinpath("esphome.yaml")
+                    ),
+                    {"esphome.yaml": self.paths.esphome_config},
+                    needs_design=False,
+                ),
+                lambda: self.design_fp,
+            )
+
+        def _export_esphome(d: Path):
+            from faebryk.exporters.esphome.esphome import (
+                dump_esphome_config,
+                make_esphome_config,
+            )
+
+            logger.info("Generating esphome config")
+            esphome_config = make_esphome_config(self.get_design()[1])
+            d.joinpath("esphome.yaml").write_text(
+                dump_esphome_config(esphome_config), encoding="utf-8"
+            )
+
+        return (
+            Exporter(
+                "esphome",
+                _export_esphome,
+                {"esphome.yaml": self.paths.esphome_config},
+            ),
+            lambda: self.design_fp,
+        )
+
+    def parameters_exporter(self) -> tuple[Exporter, Callable[[], str]]:
+        if self._design is None and (snapshot := self.get_snapshot()) is not None:
+            return (
+                Exporter(
+                    "parameters",
+                    lambda d: write_parameters(snapshot, d.joinpath("parameters.txt")),
+                    {"parameters.txt": self.paths.parameters},
+                    needs_design=False,
+                ),
+                lambda: self.design_fp,
+            )
+
+        def _export_parameters(d: Path):
+            from faebryk.exporters.parameters.parameters_to_file import (
+                export_parameters_to_file,
+            )
+
+            export_parameters_to_file(
+                self.get_design()[0], d.joinpath("parameters.txt")
+            )
+
+        return (
+            Exporter(
+                "parameters",
+                _export_parameters,
+                {"parameters.txt": self.paths.parameters},
+            ),
+            lambda: self.design_fp,
+        )
@@ -0,0 +1,172 @@
+import logging
+import multiprocessing
+import os
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING, Callable, Iterable
+
+from vindriktning_esp32_c3.profiling import TRACER
+
+if TYPE_CHECKING:
+    from faebryk.core.graphinterface import Graph
+    from faebryk.core.module import Module
+    from faebryk.core.node import Node
+
+logger = logging.getLogger(__name__)
+
+# worker processes for the checks, 1 runs them in the build process. Each
+# check takes about 10 ms at the moment, less than forking a worker costs.
+CHECK_JOBS = int(os.environ.get("VINDRIKTNING_CHECK_JOBS", "1"))
+
+# A check gets the app and all nodes of its graph and yields a message per
+# violation instead of raising on the first one. Checks only read the design,
+# so they are independent of each other.
+Check = Callable[["Module", list["Node"]], Iterable[str]]
+
+CHECKS: dict[str, Check] = {}
+
+
+def check(func: Check) -> Check:
+    """
+    Register a design check, run by run_checks()
+    """
+    CHECKS[func.__name__] = func
+    return func
+
+
+class CheckError(Exception):
+    def __init__(self, failures: dict[str, list[str]]):
+        super().__init__(
+            "Design checks failed:\n"
+            + "\n".join(
+                f"{name}: {message}"
+                for name, messages in failures.items()
+                for message in messages
+            )
+        )
+        self.failures = failures
+
+
+def _net_name(net: "Node") -> str:
+    import faebryk.library._F as F
+
+    if net.has_trait(F.has_overriden_name):
+        return net.get_trait(F.has_overriden_name).get_name()
+    return net.get_full_name()
+
+
+def _of_type[T](nodes: list["Node"], types: type[T] | tuple[type, ...]) -> list[T]:
+    return [n for n in nodes if isinstance(n, types)]
+
+
+# faebryk's simple_erc, split up ------------------------------
+@check
+def shorted_power(app: "Module", nodes: list["Node"]) -> Iterable[str]:
+    import faebryk.library._F as F
+
+    for ep in _of_type(nodes, F.ElectricPower):
+        if ep.lv.is_connected_to(ep.hv):
+            yield f"shorted power: {ep.get_full_name()}"
+
+
+@check
+def shorted_nets(app: "Module", nodes: list["Node"]) -> Iterable[str]:
+    import faebryk.library._F as F
+
+    reported = set()
+    for net in _of_type(nodes, F.Net):
+        collisions = {
+            p[0]
+            for mif in net.part_of.get_direct_connections()
+            if (p := mif.get_parent()) and isinstance(p[0], F.Net)
+        }
+        shorted = frozenset(collisions | {net})
+        if collisions and shorted not in reported:
+            reported.add(shorted)
+            yield f"shorted nets: {sorted(_net_name(n) for n in shorted)}"
+
+
+@check
+def net_name_collisions(app: "Module", nodes: list["Node"]) -> Iterable[str]:
+    import faebryk.library._F as F
+    from faebryk.libs.util import groupby
+
+    for name, colliding in groupby(
+        _of_type(nodes, F.Net), lambda n: n.get_trait(F.has_overriden_name).get_name()
+    ).items():
+        if len(colliding) > 1:
+            names = [n.get_full_name() for n in colliding]
+            yield f"net name collision: {name} {names}"
+
+
+@check
+def shorted_components(app: "Module", nodes: list["Node"]) -> Iterable[str]:
+    import faebryk.library._F as F
+    from faebryk.libs.picker.picker import has_part_picked
+
+    for comp in _of_type(nodes, (F.Resistor, F.Capacitor, F.Fuse)):
+        if (
+            comp.has_trait(has_part_picked)
+            and comp.get_trait(has_part_picked).get_part().partno == "REMOVE"
+        ):
+            continue
+        if comp.unnamed[0].is_connected_to(comp.unnamed[1]):
+            yield f"shorted component: {comp.get_full_name()}"
+
+
+# runner ------------------------------------------------------
+# design of the current run, inherited by the forked workers
+_design: tuple["Module", list["Node"]] | None = None
+
+
+def _run_check(name: str) -> tuple[float, float, int, list[str]]:
+    assert _design is not None
+    start = TRACER.now_us()
+    try:
+        messages = list(CHECKS[name](*_design))
+    except Exception:
+        messages = [f"check crashed:\n{traceback.format_exc()}"]
+    return start, TRACER.now_us() - start, os.getpid(), messages
+
+
+def run_checks(app: "Module", G: "Graph", jobs: int = CHECK_JOBS) -> dict[str, float]:
+    """
+    Run all registered checks and return their durations in seconds
+
+    Unlike faebryk's simple_erc this does not stop at the first violation,
+    all of them are collected and raised together as CheckError. With more
+    than one job the checks run in forked workers, which only pays off once
+    they take longer than forking does.
+    """
+    global _design
+
+    names = list(CHECKS)
+    # walking the graph is the expensive part of most checks, do it only once
+    with TRACER.span("node_projection", cat="check"):
+        _design = (app, list(G.node_projection()))
+    try:
+        if jobs == 1 or len(names) <= 1:
+            results = [_run_check(name) for name in names]
+        else:
+            with ProcessPoolExecutor(
+                max_workers=min(jobs, len(names)),
+                mp_context=multiprocessing.get_context("fork"),
+            ) as pool:
+                results = list(pool.map(_run_check, names))
+    finally:
+        _design = None
+
+    durations = {}
+    failures = {}
+    for name, (start, dur, pid, messages) in zip(names, results):
+        TRACER.add_span(name, start, dur, pid, cat="check")
+        durations[name] = dur / 1e6
+        if messages:
+            failures[name] = messages
+
+    for name, duration in sorted(durations.items(), key=lambda x: -x[1]):
+        logger.info(f"Check {name} took {duration:.3f}s")
+
+    if failures:
+        raise CheckError(failures)
+    return durations
@@ -0,0 +1,148 @@
+import logging
+import multiprocessing
+import os
+import shutil
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable
+
+from vindriktning_esp32_c3.profiling import TRACER
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Exporter:
+    """
+    An independent export step
+
+    func writes its results into the staging directory it gets passed.
+    outputs maps names inside that staging directory to their final location,
+    they are only moved there once every scheduled exporter succeeded.
+    needs_design is False for exporters that work from the design snapshot.
+    """
+
+    name: str
+    func: Callable[[Path], None]
+    outputs: dict[str, Path] = field(default_factory=dict)
+    needs_design: bool = True
+
+
+class ExportError(Exception):
+    def __init__(self, failures: dict[str, str]):
+        super().__init__(
+            "Exporters failed: "
+            + ", ".join(failures)
+            + "\n"
+            + "\n".join(failures.values())
+        )
+        self.failures = failures
+
+
+# exporters of the current run, inherited by the forked workers
+_scheduled: list[Exporter] = []
+
+
+def _run_exporter(index: int, staging: Path) -> tuple[float, float, int]:
+    exporter = _scheduled[index]
+    staging.mkdir(parents=True, exist_ok=True)
+    start = TRACER.now_us()
+    exporter.func(staging)
+    return start, TRACER.now_us() - start, os.getpid()
+
+
+def _run_exporter_safe(index: int, staging: Path):
+    try:
+        return _run_exporter(index, staging), None
+    except Exception:
+        return None, traceback.format_exc()
+
+
+def _commit(staged: Path, destination: Path):
+    # a directory is replaced whole, files of an earlier export that this one
+    # didn't write again must not be left in it
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    old = destination.with_name(f".{destination.name}.old")
+    shutil.rmtree(old, ignore_errors=True)
+    if destination.is_dir():
+        os.replace(destination, old)
+    os.replace(staged, destination)
+    shutil.rmtree(old, ignore_errors=True)
+
+
+def _check_disjoint(exporters: list[Exporter]):
+    # the outputs are committed one exporter after the other, overlapping
+    # ones would overwrite each other
+    seen: dict[Path, str] = {}
+    for exporter in exporters:
+        for path in map(Path.resolve, exporter.outputs.values()):
+            for other, name in seen.items():
+                if path == other or other in path.parents or path in other.parents:
+                    raise ValueError(
+                        f"Outputs of exporters {name} and {exporter.name}"
+                        f" overlap: {other}, {path}"
+                    )
+            seen[path] = exporter.name
+
+
+def run_exporters(
+    exporters: list[Exporter], staging_root: Path, jobs: int | None = None
+) -> dict[str, float]:
+    """
+    Run all exporters concurrently and return their durations in seconds
+
+    The workers are forked so they share the already built design with the
+    parent instead of having to pickle it. If any exporter fails or doesn't
+    write one of its outputs, none of the outputs are written and an
+    ExportError listing all failures is raised.
+    """
+    global _scheduled
+
+    _check_disjoint(exporters)
+    shutil.rmtree(staging_root, ignore_errors=True)
+    stagings = [staging_root.joinpath(e.name) for e in exporters]
+    _scheduled = exporters
+    try:
+        if len(exporters) <= 1 or jobs == 1:
+            results = [
+                _run_exporter_safe(i, staging) for i, staging in enumerate(stagings)
+            ]
+        else:
+            with ProcessPoolExecutor(
+                max_workers=min(jobs or os.cpu_count() or 1, len(exporters)),
+                mp_context=multiprocessing.get_context("fork"),
+            ) as pool:
+                results = list(
+                    pool.map(_run_exporter_safe, range(len(exporters)), stagings)
+                )
+    finally:
+        _scheduled = []
+
+    failures = {
+        exporter.name: error
+        for exporter, (_, error) in zip(exporters, results)
+        if error is not None
+    }
+    for exporter, staging in zip(exporters, stagings):
+        missing = [n for n in exporter.outputs if not staging.joinpath(n).exists()]
+        if missing and exporter.name not in failures:
+            failures[exporter.name] = f"Did not write {', '.join(missing)}"
+    if failures:
+        shutil.rmtree(staging_root, ignore_errors=True)
+        raise ExportError(failures)
+
+    durations = {}
+    for exporter, staging, (timing, _) in zip(exporters, stagings, results):
+        start, dur, pid = timing
+        TRACER.add_span(exporter.name, start, dur, pid, cat="export")
+        durations[exporter.name] = dur / 1e6
+        for name, destination in exporter.outputs.items():
+            _commit(staging.joinpath(name), destination)
+    shutil.rmtree(staging_root, ignore_errors=True)
+
+    for name, duration in durations.items():
+        logger.info(f"Exporter {name} took {duration:.2f}s")
+
+    return durations
@@ -1,31 +1,146 @@
 import logging
-import sys
 from pathlib import Path
+from typing import Optional
 
-import faebryk.libs.picker.lcsc as lcsc
 import typer
-from faebryk.core.module import Module
-from faebryk.exporters.esphome.esphome import dump_esphome_config, make_esphome_config
-from faebryk.exporters.parameters.parameters_to_file import export_parameters_to_file
-from faebryk.exporters.pcb.kicad.artifacts import export_svg
-from faebryk.libs.app.checks import run_checks
-from faebryk.libs.app.manufacturing import export_pcba_artifacts
-from faebryk.libs.app.parameters import replace_tbd_with_any
-from faebryk.libs.app.pcb import apply_design
-from faebryk.libs.logging import setup_basic_logging
-from faebryk.libs.picker.picker import pick_part_recursively
-from rich.traceback import install
 from typing_extensions import Annotated
 
-from vindriktning_esp32_c3.app import SmartVindrikting
-from vindriktning_esp32_c3.pcb import transform_pcb
-from vindriktning_esp32_c3.pickers import add_app_pickers
+from vindriktning_esp32_c3.artifact_cache import ArtifactCache, open_store
+from vindriktning_esp32_c3.benchmark import cli as bench_cli
+from vindriktning_esp32_c3.build import BuildError, BuildPaths, Pipeline
+from vindriktning_esp32_c3.checks import CheckError
+from vindriktning_esp32_c3.exporters import ExportError
+from vindriktning_esp32_c3.prefetch import API_URL
+from vindriktning_esp32_c3.profiling import MEMORY, TRACER
+
+# Only the lightweight project modules are imported here, faebryk and the
+# exporters are imported by the subcommands that actually need them.
 
 # logging settings
 logger = logging.getLogger(__name__)
 
+cli = typer.Typer(
+    help="Build the Vindriktning ESP32-C3 PCBA",
+    add_completion=False,
+)
+cli.add_typer(bench_cli, name="bench")
+
+Force = Annotated[
+    bool, typer.Option(help="Ignore recorded stage fingerprints, rebuild all")
+]
+Jobs = Annotated[
+    Optional[int],
+    typer.Option(help="Number of parallel exporter processes (default: all cores)"),
+]
+Downloads = Annotated[
+    int,
+    typer.Option(
+        help="Threads downloading missing parts while the design is built (0: off)"
+    ),
+]
+Profile = Annotated[
+    Optional[Path],
+    typer.Option(help="Write a Chrome trace-event JSON of all build stages"),
+]
+Memory = Annotated[
+    bool,
+    typer.Option(help="Report peak and retained memory after each stage (slow)"),
+]
+Lean = Annotated[
+    bool,
+    typer.Option(help="Free data as soon as no later stage needs it"),
+]
+Cache = Annotated[
+    Optional[str],
+    typer.Option(
+        help="Shared artifact cache, a directory or an http(s) URL",
+        envvar="VINDRIKTNING_ARTIFACT_CACHE",
+    ),
+]
+
 
-def main(
+def _setup():
+    # done here instead of at import time, so --help stays fast
+    from faebryk.libs.logging import setup_basic_logging
+    from rich.traceback import install
+
+    setup_basic_logging()
+    install(
+        width=500,
+        show_locals=True,
+    )
+
+
+def _run(
+    layout: bool = True,
+    export_artifacts: bool = False,
+    export_esphome_config: bool = False,
+    export_parameters: bool = False,
+    force: bool = False,
+    jobs: int | None = None,
+    profile: Path | None = None,
+    memory: bool = False,
+    lean: bool = False,
+    watch: bool = False,
+    cache: str | None = None,
+    download_jobs: int = 8,
+):
+    _setup()
+    pipeline = Pipeline(
+        force=force,
+        jobs=jobs,
+        lean=lean and not watch,
+        cache=ArtifactCache(open_store(cache)) if cache else None,
+        download_jobs=download_jobs,
+    )
+
+    def run_stages(pipeline: Pipeline):
+        if layout:
+            pipeline.layout()
+
+        exporters = []
+        # generate pcba manufacturing and other artifacts ---------
+        if export_artifacts:
+            exporters += pipeline.artifacts_exporters()
+        # esphome config -----------------------------------------
+        if export_esphome_config:
+            exporters.append(pipeline.esphome_exporter())
+        # export all narrowed parameters
+        if export_parameters:
+            exporters.append(pipeline.parameters_exporter())
+        pipeline.export(exporters)
+
+    TRACER.enabled = profile is not None
+    if memory:
+        MEMORY.start()
+    try:
+        if watch:
+            from vindriktning_esp32_c3.watch import watch as watch_sources
+
+            watch_sources(pipeline, run_stages)
+        else:
+            run_stages(pipeline)
+    except (BuildError, CheckError, ExportError) as e:
+        logger.error(f"{e}, aborting")
+        raise typer.Exit(1)
+    except KeyboardInterrupt:
+        if not watch:
+            raise
+    finally:
+        if profile is not None:
+            TRACER.dump(profile)
+        if memory:
+            MEMORY.report(pipeline.paths.faebryk_build_dir.joinpath("memory.json"))
+
+
+@cli.callback(invoke_without_command=True)
+def main(ctx: typer.Context):
+    if ctx.invoked_subcommand is None:
+        ctx.invoke(build)
+
+
+@cli.command()
+def build(
     export_artifacts: Annotated[
         bool, typer.Option(help="Export manufacturing artifacts")
     ] = False,
@@ -35,71 +150,243 @@ def main(
     export_parameters: Annotated[
         bool, typer.Option(help="Export project parameters to a file")
     ] = False,
+    force: Force = False,
+    jobs: Jobs = None,
+    download_jobs: Downloads = 8,
+    profile: Profile = None,
+    memory: Memory = False,
+    lean: Lean = False,
+    watch: Annotated[
+        bool,
+        typer.Option(
+            help="Keep the design in memory and rebuild whenever the sources change"
+        ),
+    ] = False,
+    cache: Cache = None,
 ):
-    install(
-        width=500,
-        show_locals=True,
+    """
+    Build the design, update the PCB and run the requested exporters
+    """
+    _run(
+        export_artifacts=export_artifacts,
+        export_esphome_config=export_esphome_config,
+        export_parameters=export_parameters,
+        force=force,
+        jobs=jobs,
+        download_jobs=download_jobs,
+        profile=profile,
+        memory=memory,
+        lean=lean,
+        watch=watch,
+        cache=cache,
+    )
+
+
+@cli.command()
+def esphome(
+    force: Force = False,
+    profile: Profile = None,
+    memory: Memory = False,
+    lean: Lean = False,
+    cache: Cache = None,
+):
+    """
+    Only export the esphome config, without touching the PCB
+    """
+    _run(
+        layout=False,
+        export_esphome_config=True,
+        force=force,
+        cache=cache,
+        profile=profile,
+        memory=memory,
+        lean=lean,
     )
 
-    # paths --------------------------------------------------
-    build_dir = Path("./build")
-    faebryk_build_dir = build_dir.joinpath("faebryk")
-    faebryk_build_dir.mkdir(parents=True, exist_ok=True)
-    root = Path(__file__).parent.parent.parent
-    netlist_path = faebryk_build_dir.joinpath("faebryk.net")
-    kicad_prj_path = root.joinpath("source")
-    pcbfile = kicad_prj_path.joinpath("main.kicad_pcb")
-    esphome_path = build_dir.joinpath("esphome")
-    esphome_config_path = esphome_path.joinpath("esphome.yaml")
-    manufacturing_artifacts_path = build_dir.joinpath("manufacturing")
-    parameters_path = faebryk_build_dir.joinpath("parameters.txt")
-
-    lcsc.BUILD_FOLDER = build_dir
-    lcsc.LIB_FOLDER = root.joinpath("libs")
-
-    # graph --------------------------------------------------
-    logger.info("Make app")
+
+@cli.command()
+def params(
+    force: Force = False,
+    profile: Profile = None,
+    memory: Memory = False,
+    lean: Lean = False,
+    cache: Cache = None,
+):
+    """
+    Only export the narrowed project parameters, without touching the PCB
+    """
+    _run(
+        layout=False,
+        export_parameters=True,
+        force=force,
+        cache=cache,
+        profile=profile,
+        memory=memory,
+        lean=lean,
+    )
+
+
+@cli.command()
+def artifacts(
+    force: Force = False,
+    jobs: Jobs = None,
+    download_jobs: Downloads = 8,
+    profile: Profile = None,
+    memory: Memory = False,
+    lean: Lean = False,
+    cache: Cache = None,
+):
+    """
+    Update the PCB and export the manufacturing artifacts
+    """
+    _run(
+        export_artifacts=True,
+        force=force,
+        cache=cache,
+        jobs=jobs,
+        download_jobs=download_jobs,
+        profile=profile,
+        memory=memory,
+        lean=lean,
+    )
+
+
+@cli.command()
+def matrix(
+    matrix_file: Annotated[
+        Optional[Path],
+        typer.Option(
+            "--matrix",
+            help="JSON list of variants, defaults to the release matrix",
+        ),
+    ] = None,
+    jobs: Annotated[
+        Optional[int],
+        typer.Option(help="Number of variants built in parallel"),
+    ] = None,
+    export_artifacts: Annotated[
+        bool, typer.Option(help="Export manufacturing artifacts")
+    ] = True,
+    export_esphome_config: Annotated[
+        bool, typer.Option(help="Export esphome config")
+    ] = True,
+    force: Force = False,
+    cache: Cache = None,
+):
+    """
+    Build all board variants in parallel, each into build/variants/<name>
+    """
+    _setup()
+    from vindriktning_esp32_c3.variants import (
+        MATRIX,
+        build_matrix,
+        load_matrix,
+        print_summary,
+    )
+
+    variants = load_matrix(matrix_file) if matrix_file else MATRIX
+    results = build_matrix(
+        variants,
+        jobs,
+        export_artifacts=export_artifacts,
+        export_esphome_config=export_esphome_config,
+        force=force,
+        cache=cache,
+    )
+    print_summary(results)
+    if not all(r.ok for r in results):
+        raise typer.Exit(1)
+
+
+@cli.command()
+def prefetch(
+    jobs: Annotated[int, typer.Option(help="Number of parallel downloads")] = 8,
+    retries: Annotated[
+        int, typer.Option(help="Retries per part, with exponential backoff")
+    ] = 5,
+    api_url: Annotated[
+        str,
+        typer.Option(
+            help="EasyEDA component API, {partno} is replaced by the part number",
+            envvar="VINDRIKTNING_EASYEDA_API",
+        ),
+    ] = API_URL,
+):
+    """
+    Download the EasyEDA data of every part the pickers can pick, in parallel
+    """
+    _setup()
+    from vindriktning_esp32_c3.prefetch import prefetch_parts
+
+    if prefetch_parts(BuildPaths.default(), jobs, retries, api_url):
+        raise typer.Exit(1)
+
+
+@cli.command()
+def cache_serve(
+    root: Annotated[Path, typer.Argument(help="Directory holding the entries")] = Path(
+        "./build/artifact-cache"
+    ),
+    host: Annotated[str, typer.Option(help="Address to listen on")] = "127.0.0.1",
+    port: Annotated[int, typer.Option(help="Port to listen on")] = 8765,
+):
+    """
+    Serve a directory as shared artifact cache over HTTP, until interrupted
+    """
+    _setup()
+    from vindriktning_esp32_c3.artifact_cache import make_server
+
+    with make_server(root, host, port) as server:
+        logger.info(f"Serving artifact cache {root} on http://{host}:{port}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+@cli.command()
+def profile_construction(
+    top: Annotated[
+        Optional[int], typer.Option(help="Only show the N slowest entries")
+    ] = None,
+):
+    """
+    Construct the app with per-module-type timing and print the results
+    """
+    _setup()
+    from vindriktning_esp32_c3.app import SmartVindrikting
+    from vindriktning_esp32_c3.profiling import ConstructionProfiler
+
+    with ConstructionProfiler() as profiler:
+        SmartVindrikting()
+    profiler.report(top)
+
+
+@cli.command()
+def profile_picking(
+    output: Annotated[
+        Path, typer.Option(help="Where to write the statistics as JSON")
+    ] = Path("./build/faebryk/pick_stats.json"),
+    lock: Annotated[
+        bool, typer.Option(help="Use picks.lock, measures the locked build")
+    ] = False,
+):
+    """
+    Build and pick the design, print what the pickers did per module type
+    """
+    _setup()
+    from vindriktning_esp32_c3.build import build_design
+    from vindriktning_esp32_c3.profiling import PICKS
+
+    paths = BuildPaths.default()
+    paths.setup_lcsc()
+    PICKS.start()
     try:
-        sys.setrecursionlimit(20000)  # TODO needs optimization
-        app = SmartVindrikting()
-    except RecursionError:
-        logger.error("RECURSION ERROR ABORTING")
-        return
-    logger.info("Build graph")
-    G = app.get_graph()
-
-    logger.info("Filling unspecified parameters")
-    replace_tbd_with_any(app, recursive=True, loglvl=logging.DEBUG)
-
-    logger.info("Picking parts")
-    for m in {
-        n.get_most_special() for n in app.get_children(direct_only=False, types=Module)
-    }:
-        # add_jlcpcb_pickers(m, base_prio=10)
-        add_app_pickers(m)
-    pick_part_recursively(app)
-
-    run_checks(app, G)
-    apply_design(pcbfile, netlist_path, G, app, transform_pcb)
-
-    # generate pcba manufacturing and other artifacts ---------
-    if export_artifacts:
-        export_pcba_artifacts(manufacturing_artifacts_path, pcbfile, app)
-        export_svg(pcbfile, manufacturing_artifacts_path.joinpath("pcba.svg"))
-
-    # esphome config -----------------------------------------
-    if export_esphome_config:
-        logger.info("Generating esphome config")
-        esphome_config = make_esphome_config(G)
-        esphome_config_path.write_text(
-            dump_esphome_config(esphome_config), encoding="utf-8"
-        )
-
-    # export all narrowed parameters
-    if export_parameters:
-        export_parameters_to_file(app, parameters_path)
+        build_design(picks_lock=paths.picks_lock if lock else None)
+    finally:
+        PICKS.stop()
+    PICKS.report(output)
 
 
 if __name__ == "__main__":
-    setup_basic_logging()
-    typer.run(main)
+    cli()
@@ -4,6 +4,8 @@ from faebryk.libs.library import L
 from faebryk.libs.units import Quantity
 from faebryk.libs.util import cast_assert, times
 
+from vindriktning_esp32_c3.util import connect
+
 
 class DigitalLED(Module):
     """
@@ -58,15 +60,20 @@ class DigitalLED(Module):
             return self._led_class()
 
         def __preinit__(self):
-            self.data_in.connect_via(self.led, self.data_out)
+            self.data_in.connect_via(
+                self.led,
+                self.data_out,
+                linkcls=F.ElectricLogic.LinkIsolatedReference,
+            )
 
-            self.power.connect(self.led.power)
+            # the power net grows with every pixel, connect to it without
+            # recursion
+            connect(self.power, self.led.power)
+            connect(self.power, self.data_in.reference, self.data_out.reference)
 
         @L.rt_field
         def single_electric_reference(self):
-            return F.has_single_electric_reference_defined(
-                F.ElectricLogic.connect_all_module_references(self)
-            )
+            return F.has_single_electric_reference_defined(self.power)
 
         @L.rt_field
         def can_bridge(self):
@@ -88,24 +95,33 @@ class DigitalLED(Module):
             self._pixels, lambda: self.DecoupledDigitalLED(F.XL_3528RGBW_WS2812B)
         )
 
+    def _connect_chain(self, head: F.ElectricLogic):
+        # chain the pixels hop by hop, their references are already shared
+        # through the power rail so there is no need to drag them along
+        prev = head
+        for led in self.leds:
+            connect(prev, led.data_in, linkcls=F.ElectricLogic.LinkIsolatedReference)
+            prev = led.data_out
+
     def __preinit__(self):
-        # connect power
+        # connect power, the rail grows with every pixel so it is connected
+        # without recursion
         for led in self.leds:
-            led.power.connect(self.power)
+            connect(led.power, self.power)
 
         if self._buffered:
             buffer = self.add(F.TXS0102DCUR())
 
             self.data_in.connect(buffer.shifters[0].io_a)
-            buffer.shifters[0].io_b.connect_via(self.leds)
+            self._connect_chain(buffer.shifters[0].io_b)
 
             buffer.n_oe.set(True)
             buffer.voltage_a_power.connect(self.power_data)
-            buffer.voltage_b_power.connect(self.power)
+            connect(buffer.voltage_b_power, self.power)
             ref = self.power_data
         else:
-            self.power_data.connect(self.power)
-            self.data_in.connect_via(self.leds)
+            connect(self.power_data, self.power)
+            self._connect_chain(self.data_in)
             ref = self.power
 
-        self.data_in.reference.connect(ref)
+        connect(self.data_in.reference, ref)
@@ -0,0 +1,128 @@
+import logging
+import weakref
+from typing import TYPE_CHECKING
+
+import faebryk.library._F as F
+from faebryk.core.moduleinterface import ModuleInterface
+from faebryk.core.node import Node
+
+if TYPE_CHECKING:
+    from faebryk.exporters.pcb.kicad.transformer import PCB_Transformer
+
+logger = logging.getLogger(__name__)
+
+
+class NetNameError(Exception): ...
+
+
+class NetIndex:
+    """
+    The named nets of a design (F.Net.with_name), by name and by interface
+
+    Built from the graph after the design is constructed, net_index() builds
+    it again once the graph changed (or after invalidate()). Two nets with
+    the same name or an interface on two named nets raise NetNameError right
+    away, with every conflict listed. Nets faebryk names itself from their
+    pads when exporting the netlist are not indexed.
+    """
+
+    def __init__(self, root: Node):
+        self.root = root
+        self._key = _graph_key(root)
+        self._by_name: dict[str, F.Net] = {}
+        self._by_interface: dict[ModuleInterface, F.Net] = {}
+        # KiCad nets by name, for the transformer they were read from. Weak,
+        # the index must not keep the parsed PCB alive
+        self._pcb_nets: tuple[weakref.ref["PCB_Transformer"], dict] | None = None
+
+        conflicts = []
+        for net in root.get_graph().nodes_of_type(F.Net):
+            name_trait = net.get_trait(F.has_overriden_name)
+            if not isinstance(name_trait, F.has_overriden_name_defined):
+                continue
+            name = name_trait.get_name()
+            other = self._by_name.setdefault(name, net)
+            if other is not net:
+                conflicts.append(f"net name {name} used twice")
+                continue
+            for mif in [net.part_of, *net.part_of.get_connected()]:
+                other = self._by_interface.setdefault(mif, net)
+                if other is not net:
+                    conflicts.append(
+                        f"{mif.get_full_name()} is on net {name} and on"
+                        f" {other.get_trait(F.has_overriden_name).get_name()}"
+                    )
+        if conflicts:
+            raise NetNameError("Conflicting net names:\n" + "\n".join(conflicts))
+        logger.debug(f"Indexed {len(self._by_name)} named nets")
+
+    def __getitem__(self, name: str) -> F.Net:
+        return self._by_name[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._by_name
+
+    def names(self) -> list[str]:
+        return sorted(self._by_name)
+
+    def is_stale(self) -> bool:
+        return self._key is None or self._key != _graph_key(self.root)
+
+    def invalidate(self):
+        """
+        Have net_index() build the index again, e.g. after links were removed
+        """
+        self._key = None
+        self.forget_pcb()
+
+    def net_of(self, mif: F.Electrical) -> F.Net | None:
+        """
+        The named net the interface is connected to, if any
+
+        Only electricals are on a net. Compound interfaces span several nets,
+        ask for the electrical in question (e.g. power.hv, logic.signal).
+        """
+        if not isinstance(mif, F.Electrical):
+            raise TypeError(f"{mif.get_full_name()} is not an Electrical")
+        return self._by_interface.get(mif)
+
+    def pcb_net(self, transformer: "PCB_Transformer", name: str):
+        """
+        The KiCad net of a named net, like transformer.get_net()
+
+        transformer.get_net() collects all nets of the PCB on every call, here
+        they are collected once per transformer, until forget_pcb().
+        """
+        if name not in self:
+            raise KeyError(name)
+        if self._pcb_nets is None or self._pcb_nets[0]() is not transformer:
+            self._pcb_nets = (
+                weakref.ref(transformer),
+                {n.name: n for n in transformer.pcb.nets},
+            )
+        return self._pcb_nets[1][name]
+
+    def forget_pcb(self):
+        """
+        Drop the KiCad nets, at the end of the layout
+        """
+        self._pcb_nets = None
+
+
+_indexes: weakref.WeakKeyDictionary[Node, NetIndex] = weakref.WeakKeyDictionary()
+
+
+def _graph_key(root: Node) -> tuple[int, int]:
+    G = root.get_graph()
+    return G.node_cnt, G.edge_cnt
+
+
+def net_index(root: Node) -> NetIndex:
+    """
+    The net index of the design under root, built on first use and again
+    whenever the design changed since
+    """
+    index = _indexes.get(root)
+    if index is None or index.is_stale():
+        index = _indexes[root] = NetIndex(root)
+    return index
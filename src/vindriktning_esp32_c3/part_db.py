@@ -0,0 +1,250 @@
+import json
+import logging
+import sqlite3
+from dataclasses import dataclass
+from pathlib import Path
+
+import faebryk.library._F as F
+import faebryk.libs.picker.lcsc as lcsc
+from faebryk.core.module import Module
+from faebryk.libs.picker.lcsc import LCSC, LCSC_Part, LCSCException
+from faebryk.libs.picker.picker import PickerOption
+
+from vindriktning_esp32_c3.part_store import PartStore, get_part_store
+from vindriktning_esp32_c3.prefetch import export_lock, wait_for_part
+
+logger = logging.getLogger(__name__)
+
+# bump when the table changes, older indexes are rebuilt
+_SCHEMA_VERSION = 2
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS parts (
+    partno TEXT PRIMARY KEY,
+    ref TEXT NOT NULL,
+    footprint TEXT,
+    pads TEXT,
+    pins TEXT,
+    model TEXT,
+    description TEXT,
+    price REAL,
+    stock INTEGER
+)
+"""
+
+
+@dataclass(frozen=True)
+class PartInfo:
+    partno: str
+    footprint: str
+    # pad numbers of the footprint, in footprint order
+    pads: list[str]
+    # (spice pin number, pin name) of the symbol
+    pins: list[tuple[str, str]]
+    model: str | None
+    description: str
+    price: float | None
+    stock: int | None
+
+
+def extract(partno: str, data: dict) -> PartInfo:
+    """
+    The fields of a raw EasyEDA blob the build needs, parsed like faebryk does
+    """
+    from easyeda2kicad.easyeda.easyeda_importer import (
+        Easyeda3dModelImporter,
+        EasyedaFootprintImporter,
+        EasyedaSymbolImporter,
+    )
+
+    footprint = EasyedaFootprintImporter(easyeda_cp_cad_data=data).get_footprint()
+    symbol = EasyedaSymbolImporter(easyeda_cp_cad_data=data).get_symbol()
+    model = Easyeda3dModelImporter(
+        easyeda_cp_cad_data=data, download_raw_3d_model=False
+    ).output
+    szlcsc = data.get("szlcsc") or {}
+    return PartInfo(
+        partno=partno,
+        footprint=footprint.info.name,
+        pads=[p.number for p in footprint.pads],
+        pins=[(p.settings.spice_pin_number, p.name.text) for p in symbol.pins],
+        model=model.name if model else None,
+        description=data.get("description", ""),
+        price=szlcsc.get("price"),
+        stock=szlcsc.get("stock"),
+    )
+
+
+class PartDB:
+    """
+    SQLite index over the EasyEDA part store (build/cache/easyeda-store)
+
+    Every part is parsed once, when it is new or its data has changed, later
+    lookups are a primary key query.
+    """
+
+    def __init__(self, path: Path, store: PartStore):
+        self.path = path
+        self.store = store
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # variants build in parallel processes against the same index
+        self.conn = sqlite3.connect(path, timeout=60)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        with self.conn:
+            (version,) = self.conn.execute("PRAGMA user_version").fetchone()
+            if version != _SCHEMA_VERSION:
+                self.conn.execute("DROP TABLE IF EXISTS parts")
+                self.conn.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+            self.conn.execute(_SCHEMA)
+
+    def update(self) -> int:
+        """
+        Index new and changed parts, drop evicted ones
+
+        Returns the number of (re)indexed parts.
+        """
+        known = dict(self.conn.execute("SELECT partno, ref FROM parts"))
+        present = set(self.store.partnos())
+        indexed = 0
+        for partno in sorted(present):
+            if known.get(partno) != self.store.ref(partno):
+                indexed += self.index(partno)
+        with self.conn:
+            self.conn.executemany(
+                "DELETE FROM parts WHERE partno = ?",
+                [(p,) for p in known.keys() - present],
+            )
+        if indexed:
+            logger.info(f"Indexed {indexed} parts into {self.path}")
+        return indexed
+
+    def index(self, partno: str) -> bool:
+        ref = self.store.ref(partno)
+        try:
+            data = self.store.get(partno)
+            # an empty answer is stored as well, there is nothing to index
+            info = extract(partno, data) if data else None
+        except Exception as e:
+            logger.warning(f"Could not index part {partno}: {e!r}")
+            info = None
+        with self.conn:
+            if info is None or ref is None:
+                self.conn.execute("DELETE FROM parts WHERE partno = ?", (partno,))
+                return False
+            self.conn.execute(
+                "INSERT OR REPLACE INTO parts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    partno,
+                    ref,
+                    info.footprint,
+                    json.dumps(info.pads),
+                    json.dumps(info.pins),
+                    info.model,
+                    info.description,
+                    info.price,
+                    info.stock,
+                ),
+            )
+        return True
+
+    def get(self, partno: str) -> PartInfo | None:
+        row = self.conn.execute(
+            "SELECT footprint, pads, pins, model, description, price, stock "
+            "FROM parts WHERE partno = ?",
+            (partno,),
+        ).fetchone()
+        if row is None:
+            return None
+        footprint, pads, pins, model, description, price, stock = row
+        return PartInfo(
+            partno=partno,
+            footprint=footprint,
+            pads=json.loads(pads),
+            pins=[tuple(p) for p in json.loads(pins)],
+            model=model,
+            description=description,
+            price=price,
+            stock=stock,
+        )
+
+
+# opened on first use, for the build folder faebryk's lcsc module points at
+_db: PartDB | None = None
+
+
+def get_part_db() -> PartDB:
+    global _db
+    store = get_part_store()
+    if _db is None or _db.store is not store:
+        _db = PartDB(store.root.parent.joinpath("parts.sqlite"), store)
+        _db.update()
+    return _db
+
+
+def is_exported(info: PartInfo) -> bool:
+    libs = lcsc.LIB_FOLDER
+    footprint = libs.joinpath(
+        "footprints", "lcsc.pretty", f"{info.footprint}.kicad_mod"
+    )
+    model = libs.joinpath("3dmodels", "lcsc.3dshapes", f"{info.model}.wrl")
+    return footprint.exists() and (info.model is None or model.exists())
+
+
+def attach(component: Module, partno: str):
+    """
+    faebryk's lcsc.attach, served from the part index when possible
+
+    Parts that are not indexed yet or whose footprint or model is missing in
+    libs/ go through faebryk, which downloads and exports them.
+    """
+    wait_for_part(partno)
+    db = get_part_db()
+    info = db.get(partno)
+    # served from the index, but still a use of the stored part
+    db.store.touch(partno)
+    if info is None or not is_exported(info):
+        with export_lock():
+            lcsc.attach(component, partno)
+        db.index(partno)
+        return
+
+    if not component.has_trait(F.has_footprint):
+        if not component.has_trait(F.can_attach_to_footprint):
+            if not component.has_trait(F.has_pin_association_heuristic):
+                raise LCSCException(
+                    partno,
+                    "Need either F.can_attach_to_footprint or "
+                    "F.has_pin_association_heuristic"
+                    f" for {component} with partno {partno}",
+                )
+            try:
+                pinmap = component.get_trait(F.has_pin_association_heuristic).get_pins(
+                    info.pins
+                )
+            except F.has_pin_association_heuristic.PinMatchException as e:
+                raise lcsc.LCSC_PinmapException(
+                    partno, f"Failed to get pinmap: {e}"
+                ) from e
+            component.add(F.can_attach_to_footprint_via_pinmap(pinmap))
+
+        fp = F.KicadFootprint(f"lcsc:{info.footprint}", info.pads)
+        component.get_trait(F.can_attach_to_footprint).attach(fp)
+
+    component.add(F.has_descriptive_properties_defined({"LCSC": partno}))
+
+
+class IndexedLCSC(LCSC):
+    def attach(self, module: Module, part: PickerOption):
+        assert isinstance(part.part, LCSC_Part)
+        attach(module, part.part.partno)
+        if part.info is not None:
+            module.add(F.has_descriptive_properties_defined(part.info))
+
+
+class IndexedLCSC_Part(LCSC_Part):
+    """
+    LCSC part attached via the part index
+    """
+
+    def __init__(self, partno: str) -> None:
+        super().__init__(partno)
+        self.supplier = IndexedLCSC()
@@ -0,0 +1,250 @@
+import contextlib
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import zlib
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# size of the store before least recently used parts are evicted
+MAX_SIZE_MB = int(os.environ.get("VINDRIKTNING_PART_CACHE_MB", "256"))
+
+# stored as objects of their own: every part in the same package shares its
+# footprint (with the 3D model reference), many share a symbol
+_SHARED = ("packageDetail", "dataStr")
+_REF = "$object"
+
+
+@contextlib.contextmanager
+def file_lock(path: Path, exclusive: bool):
+    # readers share the lock, writers and eviction hold it alone
+    with open(path, "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _write_atomic(path: Path, data: bytes):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent)
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class PartStore:
+    """
+    Compressed, content-addressed store of the raw EasyEDA part data
+
+    objects/ holds zlib compressed payloads named by the sha256 of their
+    content, so equal payloads are stored once. A part is a manifest object
+    (the EasyEDA answer with its footprint and symbol replaced by references
+    to their objects) and parts/<partno>, the key of that manifest. Reading a
+    part touches its ref file, evict() drops the parts used longest ago
+    until the store fits max_bytes again.
+
+    Writers and eviction take the lock file exclusively, readers shared (an
+    flock, so POSIX only), so builds running in parallel can use one store.
+
+    seed is a folder of plain EasyEDA files that is committed with the
+    project. New parts are also written there, so a fresh checkout can fill
+    its store from it with import_dir().
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        max_bytes: int = MAX_SIZE_MB * 2**20,
+        seed: Path | None = None,
+    ):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.seed = seed
+        root.mkdir(parents=True, exist_ok=True)
+        self.lock_path = root.joinpath("lock")
+
+    def _object_path(self, key: str) -> Path:
+        return self.root.joinpath("objects", key[:2], key)
+
+    def _ref_path(self, partno: str) -> Path:
+        return self.root.joinpath("parts", partno)
+
+    def _put_object(self, data: bytes) -> str:
+        key = hashlib.sha256(data).hexdigest()
+        path = self._object_path(key)
+        if not path.exists():
+            _write_atomic(path, zlib.compress(data, 9))
+        return key
+
+    def _get_object(self, key: str) -> bytes:
+        return zlib.decompress(self._object_path(key).read_bytes())
+
+    def _get_json(self, key: str):
+        return json.loads(self._get_object(key))
+
+    def ref(self, partno: str) -> str | None:
+        """
+        Key of the part's manifest, changes whenever the part data does
+        """
+        try:
+            return self._ref_path(partno).read_text()
+        except FileNotFoundError:
+            return None
+
+    def __contains__(self, partno: str) -> bool:
+        return self._ref_path(partno).is_file()
+
+    def partnos(self) -> list[str]:
+        parts = self.root.joinpath("parts")
+        return sorted(p.name for p in parts.iterdir()) if parts.is_dir() else []
+
+    def touch(self, partno: str):
+        with contextlib.suppress(FileNotFoundError):
+            os.utime(self._ref_path(partno))
+
+    def get(self, partno: str) -> dict | None:
+        """
+        The part data as EasyEDA returned it, None if it isn't stored
+        """
+        with file_lock(self.lock_path, exclusive=False):
+            key = self.ref(partno)
+            if key is None:
+                return None
+            try:
+                data = self._get_json(key)
+                for name in _SHARED:
+                    if isinstance(data.get(name), dict) and _REF in data[name]:
+                        data[name] = self._get_json(data[name][_REF])
+            except (OSError, ValueError, zlib.error) as e:
+                # fetched again, like a missing part
+                logger.warning(f"Ignoring broken part {partno} in store: {e}")
+                return None
+            self.touch(partno)
+        return data
+
+    def put(self, partno: str, data: dict):
+        with file_lock(self.lock_path, exclusive=True):
+            manifest = dict(data)
+            for name in _SHARED:
+                if name in manifest:
+                    payload = json.dumps(manifest[name], sort_keys=True).encode()
+                    manifest[name] = {_REF: self._put_object(payload)}
+            key = self._put_object(json.dumps(manifest, sort_keys=True).encode())
+            _write_atomic(self._ref_path(partno), key.encode())
+        if self.seed is not None and not self.seed.joinpath(partno).exists():
+            _write_atomic(self.seed.joinpath(partno), json.dumps(data).encode())
+
+    def _objects_of(self, key: str) -> set[str]:
+        manifest = self._get_json(key)
+        return {key} | {
+            manifest[name][_REF]
+            for name in _SHARED
+            if isinstance(manifest.get(name), dict) and _REF in manifest[name]
+        }
+
+    def evict(self) -> list[str]:
+        """
+        Drop the least recently used parts beyond max_bytes
+
+        Objects no part refers to anymore are deleted with them. Returns the
+        evicted part numbers.
+        """
+        with file_lock(self.lock_path, exclusive=True):
+            sizes = {
+                p.name: p.stat().st_size
+                for p in self.root.joinpath("objects").glob("*/*")
+            }
+            # most recently used first
+            parts = sorted(
+                self.partnos(),
+                key=lambda p: self._ref_path(p).stat().st_mtime_ns,
+                reverse=True,
+            )
+            live: set[str] = set()
+            size = 0
+            evicted = []
+            for partno in parts:
+                try:
+                    new = self._objects_of(self.ref(partno)) - live
+                except (OSError, ValueError, zlib.error) as e:
+                    logger.warning(f"Dropping broken part {partno} from store: {e}")
+                    new = None
+                if new is not None:
+                    new_size = sum(sizes.get(o, 0) for o in new)
+                    # the most recent part is always kept
+                    if not live or size + new_size <= self.max_bytes:
+                        live |= new
+                        size += new_size
+                        continue
+                self._ref_path(partno).unlink()
+                evicted.append(partno)
+            for key in sizes.keys() - live:
+                self._object_path(key).unlink()
+        if evicted:
+            logger.info(f"Evicted {len(evicted)} parts from {self.root}")
+        return evicted
+
+    def import_dir(self, cache_dir: Path) -> int:
+        """
+        Import the parts of a plain EasyEDA cache directory the store is missing
+
+        The directory is left as it is.
+        """
+        imported = 0
+        for path in sorted(cache_dir.iterdir()) if cache_dir.is_dir() else []:
+            if not path.is_file() or path.name in self:
+                continue
+            try:
+                self.put(path.name, json.loads(path.read_text()))
+            except ValueError as e:
+                logger.warning(f"Could not import part {path.name}: {e}")
+                continue
+            imported += 1
+        if imported:
+            logger.info(f"Imported {imported} parts from {cache_dir} into {self.root}")
+        return imported
+
+
+# opened on first use, next to the cache folder faebryk's lcsc module uses
+_store: PartStore | None = None
+
+
+def get_part_store() -> PartStore:
+    import faebryk.libs.picker.lcsc as lcsc
+
+    global _store
+    # faebryk's own cache folder, committed as the seed of the store
+    seed = lcsc.cache_base_path()
+    root = seed.parent.joinpath("easyeda-store")
+    if _store is None or _store.root != root:
+        _store = PartStore(root, seed=seed)
+        _store.import_dir(seed)
+    return _store
+
+
+def get_raw(partno: str) -> dict:
+    """
+    Replacement of faebryk's lcsc.get_raw, backed by the part store
+    """
+    import faebryk.libs.picker.lcsc as lcsc
+    from easyeda2kicad.easyeda.easyeda_api import EasyedaApi
+
+    store = get_part_store()
+    data = store.get(partno)
+    if data is None:
+        logger.debug(f"Did not find component {partno} in cache, downloading...")
+        data = EasyedaApi().get_cad_data_of_component(lcsc_id=partno)
+        store.put(partno, data)
+
+    # API returned no data
+    if not data:
+        raise lcsc.LCSC_NoDataException(
+            partno, f"Failed to fetch data from EasyEDA API for part {partno}"
+        )
+    return data
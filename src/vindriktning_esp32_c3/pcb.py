@@ -2,9 +2,11 @@
 # SPDX-License-Identifier: MIT
 
 import logging
+import re
 import subprocess
 
 import faebryk.library._F as F
+from faebryk.core.node import Node
 from faebryk.exporters.pcb.kicad.transformer import (
     Font,
     Line,
@@ -17,7 +19,6 @@ from faebryk.library.Fuse import Fuse
 from faebryk.library.has_pcb_layout_defined import has_pcb_layout_defined
 from faebryk.library.has_pcb_position import has_pcb_position
 from faebryk.library.has_pcb_position_defined import has_pcb_position_defined
-from faebryk.library.Net import Net
 from faebryk.library.pf_533984002 import pf_533984002
 from faebryk.library.Resistor import Resistor
 from faebryk.libs.geometry.basic import Geometry
@@ -38,6 +39,9 @@ from vindriktning_esp32_c3.modules.IKEAVindriktningPMSensorInterface import (
     IKEAVindriktningPMSensorInterface,
 )
 from vindriktning_esp32_c3.modules.PCBMount import PCB_Mount
+from vindriktning_esp32_c3.nets import net_index
+from vindriktning_esp32_c3.profiling import span, traced
+from vindriktning_esp32_c3.util import design_index
 
 logger = logging.getLogger(__name__)
 
@@ -47,6 +51,7 @@ E.g placing components, layer switching, mass renaming, etc.
 """
 
 
+@traced()
 def transform_pcb(transformer: PCB_Transformer):
     app = transformer.app
     assert isinstance(app, SmartVindrikting)
@@ -94,10 +99,10 @@ def transform_pcb(transformer: PCB_Transformer):
     #               Copper zones
     # ----------------------------------------
     copper_zone_offset = 1
-    if True:
+    with span("insert_zone"):
         # for _layer in transformer.get_copper_layers():
         transformer.insert_zone(
-            net=transformer.get_net(Net.with_name("GND")),
+            net=net_index(transformer.app).pcb_net(transformer, "GND"),
             layers=["F.Cu", "B.Cu", "In1.Cu", "In2.Cu"],
             polygon=Geometry.rect_to_polygon(
                 Geometry.bbox(
@@ -184,15 +189,16 @@ def transform_pcb(transformer: PCB_Transformer):
     #               Designators
     # ----------------------------------------
     # move all reference designators to the same position
-    transformer.set_designator_position(
-        offset=0.5,
-        displacement=C_xy(0, 0),
-        rotation=None,
-        offset_side=PCB_Transformer.Side.BOTTOM,
-        layer=None,
-        font=None,
-        knockout=None,
-    )
+    with span("set_designator_position"):
+        transformer.set_designator_position(
+            offset=0.5,
+            displacement=C_xy(0, 0),
+            rotation=None,
+            offset_side=PCB_Transformer.Side.BOTTOM,
+            layer=None,
+            font=None,
+            knockout=None,
+        )
 
     # ----------------------------------------
     #               Layout
@@ -204,7 +210,10 @@ def transform_pcb(transformer: PCB_Transformer):
     # ----------------------------------------
     # apply_routing(transformer)
 
+    net_index(app).forget_pcb()
 
+
+@traced()
 def set_outline(
     transformer: PCB_Transformer,
     outline_coordinates: list,
@@ -266,8 +275,9 @@ def set_outline(
     )
 
 
+@traced()
 def apply_routing(transformer: PCB_Transformer):
-    for node in transformer.app.get_children(direct_only=False, types=F.Capacitor):
+    for node in design_index(transformer.app).of_type(F.Capacitor):
         node.add_trait(
             F.has_pcb_routing_strategy_greedy_direct_line(
                 F.has_pcb_routing_strategy_greedy_direct_line.Topology.DIRECT
@@ -275,6 +285,99 @@ def apply_routing(transformer: PCB_Transformer):
         )
 
 
+# LED string ---------------------------------------------
+# length of the light window the LEDs shine through, fits 5 pixels
+LED_WINDOW = 30.5
+LED_PITCH = LED_WINDOW / 5
+
+
+def _natural_key(name: str) -> tuple:
+    # leds[2] before leds[10]
+    return tuple(int(p) if p.isdigit() else p for p in re.split(r"(\d+)", name))
+
+
+class LayoutExtrudeInOrder(LayoutExtrude):
+    """
+    LayoutExtrude in natural order of the node names
+
+    LayoutExtrude sorts the full names as plain text, which puts leds[10]
+    between leds[1] and leds[2] and scrambles the data chain for longer
+    strings. Here the indices in the names compare as numbers.
+    """
+
+    def apply(self, *node: Node):
+        vector = self.vector if len(self.vector) == 3 else (*self.vector, 0)
+
+        nodes = sorted(
+            (n for n in node if not n.has_trait(has_pcb_position)),
+            key=lambda n: _natural_key(n.get_name()),
+            reverse=self.reverse_order,
+        )
+        for i, n in enumerate(nodes):
+            vec_i = (
+                vector[0] * i,
+                vector[1] * i,
+                (vector[2] * (i if self.dynamic_rotation else 1)) % 360,
+                has_pcb_position.layer_type.NONE,
+            )
+            n.add(
+                F.has_pcb_position_defined_relative_to_parent(
+                    Geometry.abs_pos(self.base, vec_i)
+                )
+            )
+
+
+def digital_led_layout(pixels: int) -> LayoutTypeHierarchy.Level:
+    """
+    Layout of a DigitalLED string, the pixels in a line on the bottom layer
+    """
+    Point = has_pcb_position.Point
+    L = has_pcb_position.layer_type
+    LVL = LayoutTypeHierarchy.Level
+
+    return LVL(
+        mod_type=DigitalLED,
+        layout=LayoutAbsolute(Point((0, 11, 0, L.NONE))),
+        children_layout=LayoutTypeHierarchy(
+            layouts=[
+                LVL(
+                    mod_type=F.TXS0102DCUR,
+                    layout=LayoutAbsolute(Point((-1.5, 19, 0, L.TOP_LAYER))),
+                ),
+                LVL(
+                    mod_type=DigitalLED.DecoupledDigitalLED,
+                    layout=LayoutExtrudeInOrder(
+                        # the string ends at the top of the light window
+                        base=Point(
+                            (0, LED_WINDOW - LED_PITCH * pixels, 0, L.BOTTOM_LAYER)
+                        ),
+                        vector=(0, LED_PITCH, 0),
+                    ),
+                    children_layout=LayoutTypeHierarchy(
+                        layouts=[
+                            LVL(
+                                mod_type=F.XL_3528RGBW_WS2812B,
+                                layout=LayoutAbsolute(Point((0, 0, 180, L.NONE))),
+                                children_layout=LayoutTypeHierarchy(
+                                    layouts=[
+                                        LVL(
+                                            mod_type=F.Capacitor,
+                                            layout=LayoutAbsolute(
+                                                Point((-0.95, 2, 0, L.NONE)),
+                                            ),
+                                        ),
+                                    ],
+                                ),
+                            ),
+                        ]
+                    ),
+                ),
+            ]
+        ),
+    )
+
+
+@traced()
 def apply_root_layout(app: SmartVindrikting):
     Point = has_pcb_position.Point
     L = has_pcb_position.layer_type
@@ -488,54 +591,7 @@ def apply_root_layout(app: SmartVindrikting):
                 ],
             ),
         ),
-        LVL(
-            mod_type=DigitalLED,
-            layout=LayoutAbsolute(Point((0, 11, 0, L.NONE))),
-            children_layout=LayoutTypeHierarchy(
-                layouts=[
-                    LVL(
-                        mod_type=F.TXS0102DCUR,
-                        layout=LayoutAbsolute(Point((-1.5, 19, 0, L.TOP_LAYER))),
-                    ),
-                    LVL(
-                        mod_type=DigitalLED.DecoupledDigitalLED,
-                        layout=LayoutExtrude(
-                            base=Point(
-                                (
-                                    0,
-                                    30.5 - (30.5 / 5 * len(app.mcu_pcb.leds.leds)),
-                                    0,
-                                    L.BOTTOM_LAYER,
-                                )
-                            ),
-                            vector=(
-                                0,
-                                30.5 / 5,
-                                0,
-                            ),
-                        ),
-                        children_layout=LayoutTypeHierarchy(
-                            layouts=[
-                                LVL(
-                                    mod_type=F.XL_3528RGBW_WS2812B,
-                                    layout=LayoutAbsolute(Point((0, 0, 180, L.NONE))),
-                                    children_layout=LayoutTypeHierarchy(
-                                        layouts=[
-                                            LVL(
-                                                mod_type=F.Capacitor,
-                                                layout=LayoutAbsolute(
-                                                    Point((-0.95, 2, 0, L.NONE)),
-                                                ),
-                                            ),
-                                        ],
-                                    ),
-                                ),
-                            ]
-                        ),
-                    ),
-                ]
-            ),
-        ),
+        digital_led_layout(len(app.mcu_pcb.leds.leds)),
         LVL(
             mod_type=PCB_Mount,
             layout=LayoutAbsolute(Point((0, 0, 0, L.TOP_LAYER))),
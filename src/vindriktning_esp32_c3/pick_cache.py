@@ -0,0 +1,184 @@
+import logging
+import math
+import time
+from enum import Enum
+from typing import Iterable
+
+import faebryk.library._F as F
+from faebryk.core.module import Module
+from faebryk.core.parameter import Parameter
+from faebryk.libs.picker.picker import (
+    PickError,
+    PickerOption,
+    has_part_picked,
+    pick_module_by_params,
+)
+from faebryk.libs.units import P, Quantity
+
+from vindriktning_esp32_c3.pick_lock import PickLock
+from vindriktning_esp32_c3.profiling import PICKS
+
+logger = logging.getLogger(__name__)
+
+
+# units the signatures are written in, by dimensionality
+_UNITS = {
+    u.dimensionality: u
+    for u in map(P.Unit, ("F", "V", "A", "ohm", "W", "Hz", "H", "s", "K", "cd"))
+}
+
+
+def _value_signature(value) -> str:
+    if isinstance(value, Quantity):
+        # equal values get equal text however they were written, 0.1 µF and
+        # 100 nF are both 100 nF
+        unit = _UNITS.get(value.dimensionality)
+        if unit is None:
+            value = value.to_base_units()
+        else:
+            value = value.to(unit)
+            if math.isfinite(value.magnitude) and value.magnitude != 0:
+                value = value.to_compact()
+        return f"{value.magnitude:.12g} {value.units:~P}".rstrip()
+    if isinstance(value, Enum):
+        return f"{type(value).__name__}.{value.name}"
+    return repr(value)
+
+
+def param_signature(param: Parameter) -> str | None:
+    """
+    Canonical text of a narrowed parameter, None if it can't be compared
+
+    Unlike str() of the parameter it doesn't contain the node name, so equal
+    parameters of different modules get the same signature.
+    """
+    param = param.get_most_narrow()
+    if isinstance(param, F.ANY):
+        return "ANY"
+    if isinstance(param, F.Constant):
+        return _value_signature(param.value)
+    if isinstance(param, F.Range):
+        try:
+            lo, hi = param.as_tuple()
+        except F.Range.MinMaxError:
+            return None
+        if isinstance(lo, F.Constant) and isinstance(hi, F.Constant):
+            return f"[{_value_signature(lo.value)}, {_value_signature(hi.value)}]"
+    # TBD, Operation, Set, ... are left to the picker
+    return None
+
+
+def module_signature(module: Module) -> str | None:
+    """
+    Signature of all parameters a picker matches options against
+    """
+    parts = []
+    for p in module.get_children(direct_only=True, types=Parameter):
+        sig = param_signature(p)
+        if sig is None:
+            return None
+        parts.append(f"{p.get_name()}={sig}")
+    return ";".join(sorted(parts))
+
+
+class PickCache:
+    """
+    Remembers which option was picked for a module type and parameter signature
+
+    Only the position of the option is stored, the option lists are rebuilt
+    by the pickers for every module (their pinmaps point into the module).
+    A hit still lets pick_module_by_params check and attach the one option,
+    so a wrong entry can only cost time, not pick a wrong part.
+    """
+
+    def __init__(self):
+        self.choices: dict[tuple[type[Module], str], int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.uncached = 0
+        # set by use_lock() while picking a design with a lock file
+        self.lock: PickLock | None = None
+        self.lock_signatures: dict[Module, str | None] = {}
+
+    def use_lock(self, lock: PickLock | None, modules: Iterable[Module] = ()):
+        """
+        Pick from and record into lock, None stops using it
+
+        The lock keys picks on the signatures of modules before anything is
+        picked. Picking narrows the parameters shared with modules picked
+        later (e.g. the load capacitors of a crystal), and faebryk picks
+        siblings in no fixed order.
+        """
+        self.lock = lock
+        self.lock_signatures = (
+            {m: module_signature(m) for m in modules} if lock is not None else {}
+        )
+
+    def pick(self, module: Module, options: list[PickerOption]):
+        if module.has_trait(has_part_picked):
+            return pick_module_by_params(module, options)
+
+        start, comparisons = time.perf_counter(), PICKS.comparisons
+        outcome, evaluated = "failed", len(options)
+        sig = module_signature(module)
+        try:
+            option, outcome = self._pick(module, sig, options)
+        finally:
+            if PICKS.enabled:
+                if outcome == "searched":
+                    evaluated = next(i for i, o in enumerate(options) if o is option)
+                    evaluated += 1
+                elif outcome != "failed":
+                    evaluated = 1
+                PICKS.record(
+                    type(module).__name__,
+                    outcome,
+                    evaluated,
+                    PICKS.comparisons - comparisons,
+                    time.perf_counter() - start,
+                )
+        if self.lock is not None:
+            self.lock.record(module, self.lock_signatures.get(module, sig), option)
+        return option
+
+    def _pick(
+        self, module: Module, sig: str | None, options: list[PickerOption]
+    ) -> tuple[PickerOption, str]:
+        """
+        The picked option and how it was found: locked, cached or searched
+        """
+        if self.lock is not None:
+            lock_sig = self.lock_signatures.get(module, sig)
+            locked = self.lock.lookup(module, lock_sig, options)
+            if locked is not None:
+                return pick_module_by_params(module, [locked]), "locked"
+
+        if sig is None:
+            self.uncached += 1
+            return pick_module_by_params(module, options), "searched"
+
+        key = (type(module), sig)
+        index = self.choices.get(key)
+        if index is not None and index < len(options):
+            try:
+                option = pick_module_by_params(module, [options[index]])
+                self.hits += 1
+                return option, "cached"
+            except PickError:
+                logger.debug(f"Stale pick cache entry for {module}")
+
+        self.misses += 1
+        option = pick_module_by_params(module, options)
+        self.choices[key] = next(i for i, o in enumerate(options) if o is option)
+        return option, "searched"
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "uncached": self.uncached,
+            "entries": len(self.choices),
+        }
+
+
+PICK_CACHE = PickCache()
@@ -0,0 +1,80 @@
+import json
+import logging
+from pathlib import Path
+
+from faebryk.core.module import Module
+from faebryk.libs.picker.picker import PickerOption
+
+logger = logging.getLogger(__name__)
+
+LOCK_VERSION = 3
+
+
+class PickLock:
+    """
+    The part picked for every module of the design, keyed on the module path
+
+    A locked part is reused as long as the module's parameter signature is
+    unchanged and the picker still offers that part, every other module is
+    picked as usual. Modules without a comparable signature are not locked.
+    Delete the lock file to re-pick everything.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.locked = self._load()
+        self.picks: dict[str, dict] = {}
+        self.applied = 0
+
+    def _load(self) -> dict[str, dict]:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable pick lock {self.path}: {e}")
+            return {}
+        if data.get("version") != LOCK_VERSION:
+            logger.warning(f"Ignoring pick lock {self.path} of another version")
+            return {}
+        return data["picks"]
+
+    def lookup(
+        self, module: Module, signature: str | None, options: list[PickerOption]
+    ) -> PickerOption | None:
+        entry = self.locked.get(module.get_full_name())
+        if entry is None or signature is None or entry["signature"] != signature:
+            return None
+        option = next((o for o in options if o.part.partno == entry["partno"]), None)
+        if option is None:
+            logger.info(
+                f"Locked part {entry['partno']} of {module} is not offered anymore"
+            )
+            return None
+        self.applied += 1
+        return option
+
+    def record(self, module: Module, signature: str | None, option: PickerOption):
+        # such an entry could never be looked up again
+        if signature is None:
+            return
+        self.picks[module.get_full_name()] = {
+            "partno": option.part.partno,
+            "signature": signature,
+        }
+
+    def save(self) -> bool:
+        """
+        Write the picks of this build, returns whether the lock changed
+        """
+        if self.picks == self.locked:
+            return False
+        data = json.dumps(
+            {"version": LOCK_VERSION, "picks": self.picks},
+            indent=2,
+            sort_keys=True,
+            ensure_ascii=False,
+        )
+        self.path.write_text(data + "\n", encoding="utf-8")
+        logger.info(f"Updated pick lock {self.path}")
+        return True
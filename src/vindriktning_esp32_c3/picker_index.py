@@ -0,0 +1,111 @@
+import logging
+from bisect import bisect_left, bisect_right
+from dataclasses import replace
+from typing import Iterable
+
+import faebryk.library._F as F
+from faebryk.core.module import Module
+from faebryk.core.parameter import Parameter
+from faebryk.libs.picker.picker import PickErrorParams, PickerOption
+from faebryk.libs.units import Quantity
+
+from vindriktning_esp32_c3.pick_cache import PICK_CACHE
+
+logger = logging.getLogger(__name__)
+
+# slack for unit conversions, 4700nF and 4.7uF should land on the same key
+_REL_TOL = 1e-9
+
+
+def _bounds(param: Parameter) -> tuple[Quantity, Quantity] | None:
+    """
+    Interval a narrowed parameter allows, None if it is not a plain interval
+    """
+    if isinstance(param, F.Constant):
+        return param.value, param.value
+    if isinstance(param, F.Range):
+        try:
+            lo, hi = param.as_tuple()
+        except F.Range.MinMaxError:
+            return None
+        if isinstance(lo, F.Constant) and isinstance(hi, F.Constant):
+            return lo.value, hi.value
+    return None
+
+
+class _SortedParam:
+    """
+    Option indices sorted by the magnitude of one parameter
+    """
+
+    def __init__(self, name: str, options: list[PickerOption]):
+        self.name = name
+        values = [o.params[name].value for o in options]
+        self.unit = values[0].units
+        keyed = sorted((v.to(self.unit).magnitude, i) for i, v in enumerate(values))
+        self.keys = [k for k, _ in keyed]
+        self.indices = [i for _, i in keyed]
+
+    def lookup(self, module: Module) -> set[int] | None:
+        """
+        Indices of the options inside the module's interval, None if unknown
+        """
+        param = getattr(module, self.name, None)
+        if not isinstance(param, Parameter):
+            return None
+        bounds = _bounds(param.get_most_narrow())
+        if bounds is None:
+            return None
+        try:
+            lo, hi = (b.to(self.unit).magnitude for b in bounds)
+        except Exception:
+            # unitless or incompatible, leave the decision to the parameters
+            return None
+        lo -= abs(lo) * _REL_TOL
+        hi += abs(hi) * _REL_TOL
+        return set(
+            self.indices[bisect_left(self.keys, lo) : bisect_right(self.keys, hi)]
+        )
+
+
+class IndexedOptions:
+    """
+    A picker table, indexed on its numeric parameters
+
+    Only the options inside the intervals of the module's indexed parameters
+    are handed to the picker, so a lookup costs a bisect per
+    parameter instead of a comparison per option. The candidates keep the
+    table order, so the first matching option wins exactly like with the
+    plain list.
+    """
+
+    def __init__(self, options: list[PickerOption], indexed: Iterable[str]):
+        self.options = options
+        self.indexes = [_SortedParam(name, options) for name in indexed]
+
+    def candidates(self, module: Module) -> list[PickerOption]:
+        selected: set[int] | None = None
+        for index in self.indexes:
+            found = index.lookup(module)
+            if found is None:
+                continue
+            selected = found if selected is None else selected & found
+        if selected is None:
+            return self.options
+        return [self.options[i] for i in sorted(selected)]
+
+    def pick(self, module: Module):
+        candidates = self.candidates(module)
+        logger.debug(f"{len(candidates)}/{len(self.options)} options left for {module}")
+        try:
+            # the table is shared by all modules, every pick gets its own
+            # parameters to narrow with
+            return PICK_CACHE.pick(
+                module,
+                [
+                    replace(o, params={k: v.copy() for k, v in o.params.items()})
+                    for o in candidates
+                ],
+            )
+        except PickErrorParams:
+            raise PickErrorParams(module, self.options) from None
@@ -1,14 +1,17 @@
 import logging
+from functools import cache
+from typing import Callable
 
 import faebryk.library._F as F
 from faebryk.core.module import Module
-from faebryk.libs.picker.lcsc import LCSC_Part
-from faebryk.libs.picker.picker import (
-    PickerOption,
-    pick_module_by_params,
-)
+from faebryk.libs.picker.picker import PickerOption
 from faebryk.libs.units import P
 
+from vindriktning_esp32_c3.part_db import IndexedLCSC_Part
+from vindriktning_esp32_c3.pick_cache import PICK_CACHE
+from vindriktning_esp32_c3.picker_index import IndexedOptions
+from vindriktning_esp32_c3.profiling import span
+
 logger = logging.getLogger(__name__)
 
 
@@ -18,18 +21,18 @@ def pick_mosfet(module: F.MOSFET):
         "2": module.source,
         "3": module.drain,
     }
-    pick_module_by_params(
+    PICK_CACHE.pick(
         module,
         [
             PickerOption(
-                part=LCSC_Part(partno="C8545"),
+                part=IndexedLCSC_Part(partno="C8545"),
                 params={
                     "channel_type": F.Constant(F.MOSFET.ChannelType.N_CHANNEL),
                 },
                 pinmap=standard_pinmap,
             ),
             PickerOption(
-                part=LCSC_Part(partno="C8492"),
+                part=IndexedLCSC_Part(partno="C8492"),
                 params={
                     "channel_type": F.Constant(F.MOSFET.ChannelType.P_CHANNEL),
                 },
@@ -39,6 +42,157 @@ def pick_mosfet(module: F.MOSFET):
     )
 
 
+# 1% 0402 resistors
+RESISTORS = IndexedOptions(
+    [
+        PickerOption(
+            part=IndexedLCSC_Part(partno="C25076"),
+            params={"resistance": F.Constant(100 * P.ohm)},
+        ),
+        PickerOption(
+            part=IndexedLCSC_Part(partno="C474070"),
+            params={"resistance": F.Constant(120 * P.ohm)},
+        ),
+        PickerOption(
+            part=IndexedLCSC_Part(partno="C328302"),
+            params={"resistance": F.Constant(150 * P.ohm)},
+        ),
+        PickerOption(
+            part=IndexedLCSC_Part(partno="C25087"),
+            params={"resistance": F.Constant(200 * P.ohm)},
+        ),
+        PickerOption(
+            part=IndexedLCSC_Part(partno="C137885"),
+            params={"resistance": F.Constant(300 * P.ohm)},
+        ),
+        PickerOption(
+            part=IndexedLCSC_Part(partno="C137997"),
+            params={"resistance": F.Constant(390 * P.ohm)},
+        ),
+        PickerOption(
+            part=IndexedLCSC_Part(partno="C284656"),
+            params={"resistance": F.Constant(680 * P.ohm)},
+        ),
+        PickerOption(
+            part=IndexedLCSC_Part(partno="C11702"),
+            params={"resistance": F.Constant(1 * P.kohm)},
+        ),
+        PickerOption(
+            part=IndexedLCSC_Part(partno="C25879"),
+            params={"resistance": F.Constant(2.2 * P.kohm)},
+        ),
+        PickerOption(
+            part=IndexedLCSC_Part(partno="C25900"),
+            params={"resistance": F.Constant(4.7 * P.kohm)},
+        ),
+        PickerOption(
+            part=IndexedLCSC_Part(partno="C25905"),
+            params={"resistance": F.Constant(5.1 * P.kohm)},
+        ),
+        PickerOption(
+            part=IndexedLCSC_Part(partno="C25917"),
+            params={"resistance": F.Constant(6.8 * P.kohm)},
+        ),
+        PickerOption(
+            part=IndexedLCSC_Part(partno="C25744"),
+            params={"resistance": F.Constant(10 * P.kohm)},
+        ),
+        PickerOption(
+            part=IndexedLCSC_Part(partno="C25752"),
+            params={"resistance": F.Constant(12 * P.kohm)},
+        ),
+        PickerOption(
+            part=IndexedLCSC_Part(partno="C25771"),
+            params={"resistance": F.Constant(27 * P.kohm)},
+        ),
+        PickerOption(
+            part=IndexedLCSC_Part(partno="C25741"),
+            params={"resistance": F.Constant(100 * P.kohm)},
+        ),
+        PickerOption(
+            part=IndexedLCSC_Part(partno="C25782"),
+            params={"resistance": F.Constant(390 * P.kohm)},
+        ),
+        PickerOption(
+            part=IndexedLCSC_Part(partno="C25790"),
+            params={"resistance": F.Constant(470 * P.kohm)},
+        ),
+        PickerOption(
+            part=IndexedLCSC_Part(partno="C305257"),
+            params={"resistance": F.Constant(1 * P.Mohm)},
+        ),
+    ],
+    indexed=["resistance"],
+)
+
+# 0402 when possible
+CAPACITORS = IndexedOptions(
+    [
+        PickerOption(
+            part=IndexedLCSC_Part(partno="C285151"),
+            params={
+                "temperature_coefficient": F.Constant(
+                    F.Capacitor.TemperatureCoefficient.C0G,
+                ),
+                "capacitance": F.Constant(15 * P.pF),
+                "rated_voltage": F.Constant(50 * P.V),
+            },
+        ),
+        PickerOption(
+            part=IndexedLCSC_Part(partno="C52923"),
+            params={
+                "temperature_coefficient": F.Constant(
+                    F.Capacitor.TemperatureCoefficient.X5R,
+                ),
+                "capacitance": F.Constant(1 * P.uF),
+                "rated_voltage": F.Constant(25 * P.V),
+            },
+        ),
+        PickerOption(
+            part=IndexedLCSC_Part(partno="C1525"),
+            params={
+                "temperature_coefficient": F.Constant(
+                    F.Capacitor.TemperatureCoefficient.X7R,
+                ),
+                "capacitance": F.Constant(100 * P.nF),
+                "rated_voltage": F.Constant(16 * P.V),
+            },
+        ),
+        PickerOption(
+            part=IndexedLCSC_Part(partno="C86057"),
+            params={
+                "temperature_coefficient": F.Constant(
+                    F.Capacitor.TemperatureCoefficient.X7R,
+                ),
+                "capacitance": F.Constant(100 * P.nF),
+                "rated_voltage": F.Constant(1000 * P.V),
+            },
+        ),
+        PickerOption(
+            part=IndexedLCSC_Part(partno="C368809"),
+            params={
+                "temperature_coefficient": F.Constant(
+                    F.Capacitor.TemperatureCoefficient.X5R,
+                ),
+                "capacitance": F.Constant(4700 * P.nF),
+                "rated_voltage": F.Constant(10 * P.V),
+            },
+        ),
+        PickerOption(
+            part=IndexedLCSC_Part(partno="C19702"),
+            params={
+                "temperature_coefficient": F.Constant(
+                    F.Capacitor.TemperatureCoefficient.X5R,
+                ),
+                "capacitance": F.Constant(10 * P.uF),
+                "rated_voltage": F.Constant(10 * P.V),
+            },
+        ),
+    ],
+    indexed=["capacitance", "rated_voltage"],
+)
+
+
 def pick_resistor(resistor: F.Resistor):
     """
     Link a partnumber/footprint to a Resistor
@@ -46,87 +200,7 @@ def pick_resistor(resistor: F.Resistor):
     Selects only 1% 0402 resistors
     """
 
-    pick_module_by_params(
-        resistor,
-        [
-            PickerOption(
-                part=LCSC_Part(partno="C25076"),
-                params={"resistance": F.Constant(100 * P.ohm)},
-            ),
-            PickerOption(
-                part=LCSC_Part(partno="C474070"),
-                params={"resistance": F.Constant(120 * P.ohm)},
-            ),
-            PickerOption(
-                part=LCSC_Part(partno="C328302"),
-                params={"resistance": F.Constant(150 * P.ohm)},
-            ),
-            PickerOption(
-                part=LCSC_Part(partno="C25087"),
-                params={"resistance": F.Constant(200 * P.ohm)},
-            ),
-            PickerOption(
-                part=LCSC_Part(partno="C137885"),
-                params={"resistance": F.Constant(300 * P.ohm)},
-            ),
-            PickerOption(
-                part=LCSC_Part(partno="C137997"),
-                params={"resistance": F.Constant(390 * P.ohm)},
-            ),
-            PickerOption(
-                part=LCSC_Part(partno="C284656"),
-                params={"resistance": F.Constant(680 * P.ohm)},
-            ),
-            PickerOption(
-                part=LCSC_Part(partno="C11702"),
-                params={"resistance": F.Constant(1 * P.kohm)},
-            ),
-            PickerOption(
-                part=LCSC_Part(partno="C25879"),
-                params={"resistance": F.Constant(2.2 * P.kohm)},
-            ),
-            PickerOption(
-                part=LCSC_Part(partno="C25900"),
-                params={"resistance": F.Constant(4.7 * P.kohm)},
-            ),
-            PickerOption(
-                part=LCSC_Part(partno="C25905"),
-                params={"resistance": F.Constant(5.1 * P.kohm)},
-            ),
-            PickerOption(
-                part=LCSC_Part(partno="C25917"),
-                params={"resistance": F.Constant(6.8 * P.kohm)},
-            ),
-            PickerOption(
-                part=LCSC_Part(partno="C25744"),
-                params={"resistance": F.Constant(10 * P.kohm)},
-            ),
-            PickerOption(
-                part=LCSC_Part(partno="C25752"),
-                params={"resistance": F.Constant(12 * P.kohm)},
-            ),
-            PickerOption(
-                part=LCSC_Part(partno="C25771"),
-                params={"resistance": F.Constant(27 * P.kohm)},
-            ),
-            PickerOption(
-                part=LCSC_Part(partno="C25741"),
-                params={"resistance": F.Constant(100 * P.kohm)},
-            ),
-            PickerOption(
-                part=LCSC_Part(partno="C25782"),
-                params={"resistance": F.Constant(390 * P.kohm)},
-            ),
-            PickerOption(
-                part=LCSC_Part(partno="C25790"),
-                params={"resistance": F.Constant(470 * P.kohm)},
-            ),
-            PickerOption(
-                part=LCSC_Part(partno="C305257"),
-                params={"resistance": F.Constant(1 * P.Mohm)},
-            ),
-        ],
-    )
+    RESISTORS.pick(resistor)
 
 
 def pick_capacitor(module: F.Capacitor):
@@ -136,79 +210,15 @@ def pick_capacitor(module: F.Capacitor):
     Uses 0402 when possible
     """
 
-    pick_module_by_params(
-        module,
-        [
-            PickerOption(
-                part=LCSC_Part(partno="C285151"),
-                params={
-                    "temperature_coefficient": F.Constant(
-                        F.Capacitor.TemperatureCoefficient.C0G,
-                    ),
-                    "capacitance": F.Constant(15 * P.pF),
-                    "rated_voltage": F.Constant(50 * P.V),
-                },
-            ),
-            PickerOption(
-                part=LCSC_Part(partno="C52923"),
-                params={
-                    "temperature_coefficient": F.Constant(
-                        F.Capacitor.TemperatureCoefficient.X5R,
-                    ),
-                    "capacitance": F.Constant(1 * P.uF),
-                    "rated_voltage": F.Constant(25 * P.V),
-                },
-            ),
-            PickerOption(
-                part=LCSC_Part(partno="C1525"),
-                params={
-                    "temperature_coefficient": F.Constant(
-                        F.Capacitor.TemperatureCoefficient.X7R,
-                    ),
-                    "capacitance": F.Constant(100 * P.nF),
-                    "rated_voltage": F.Constant(16 * P.V),
-                },
-            ),
-            PickerOption(
-                part=LCSC_Part(partno="C86057"),
-                params={
-                    "temperature_coefficient": F.Constant(
-                        F.Capacitor.TemperatureCoefficient.X7R,
-                    ),
-                    "capacitance": F.Constant(100 * P.nF),
-                    "rated_voltage": F.Constant(1000 * P.V),
-                },
-            ),
-            PickerOption(
-                part=LCSC_Part(partno="C368809"),
-                params={
-                    "temperature_coefficient": F.Constant(
-                        F.Capacitor.TemperatureCoefficient.X5R,
-                    ),
-                    "capacitance": F.Constant(4700 * P.nF),
-                    "rated_voltage": F.Constant(10 * P.V),
-                },
-            ),
-            PickerOption(
-                part=LCSC_Part(partno="C19702"),
-                params={
-                    "temperature_coefficient": F.Constant(
-                        F.Capacitor.TemperatureCoefficient.X5R,
-                    ),
-                    "capacitance": F.Constant(10 * P.uF),
-                    "rated_voltage": F.Constant(10 * P.V),
-                },
-            ),
-        ],
-    )
+    CAPACITORS.pick(module)
 
 
 def pick_led(module: F.LED):
-    pick_module_by_params(
+    PICK_CACHE.pick(
         module,
         [
             PickerOption(
-                part=LCSC_Part(partno="C72043"),
+                part=IndexedLCSC_Part(partno="C72043"),
                 params={
                     "color": F.Constant(F.LED.Color.GREEN),
                     "max_brightness": F.Constant(285 * P.mcandela),
@@ -218,7 +228,7 @@ def pick_led(module: F.LED):
                 pinmap={"1": module.cathode, "2": module.anode},
             ),
             PickerOption(
-                part=LCSC_Part(partno="C72041"),
+                part=IndexedLCSC_Part(partno="C72041"),
                 params={
                     "color": F.Constant(F.LED.Color.BLUE),
                     "max_brightness": F.Constant(28.5 * P.mcandela),
@@ -228,7 +238,7 @@ def pick_led(module: F.LED):
                 pinmap={"1": module.cathode, "2": module.anode},
             ),
             PickerOption(
-                part=LCSC_Part(partno="C72038"),
+                part=IndexedLCSC_Part(partno="C72038"),
                 params={
                     "color": F.Constant(F.LED.Color.YELLOW),
                     "max_brightness": F.Constant(180 * P.mcandela),
@@ -238,7 +248,7 @@ def pick_led(module: F.LED):
                 pinmap={"1": module.cathode, "2": module.anode},
             ),
             PickerOption(
-                part=LCSC_Part(partno="C84256"),
+                part=IndexedLCSC_Part(partno="C84256"),
                 params={
                     "color": F.Constant(F.LED.Color.RED),
                     "max_brightness": F.Constant(195 * P.mcandela),
@@ -255,11 +265,11 @@ def pick_led(module: F.LED):
 
 
 def pick_fuse(module: F.Fuse):
-    pick_module_by_params(
+    PICK_CACHE.pick(
         module,
         [
             PickerOption(
-                part=LCSC_Part(partno="C914087"),
+                part=IndexedLCSC_Part(partno="C914087"),
                 params={
                     "fuse_type": F.Constant(F.Fuse.FuseType.RESETTABLE),
                     "response_type": F.Constant(F.Fuse.ResponseType.SLOW),
@@ -267,7 +277,7 @@ def pick_fuse(module: F.Fuse):
                 },
             ),
             PickerOption(
-                part=LCSC_Part(partno="C914085"),
+                part=IndexedLCSC_Part(partno="C914085"),
                 params={
                     "fuse_type": F.Constant(F.Fuse.FuseType.RESETTABLE),
                     "response_type": F.Constant(F.Fuse.ResponseType.SLOW),
@@ -275,7 +285,7 @@ def pick_fuse(module: F.Fuse):
                 },
             ),
             PickerOption(
-                part=LCSC_Part(partno="C70050"),
+                part=IndexedLCSC_Part(partno="C70050"),
                 params={
                     "fuse_type": F.Constant(F.Fuse.FuseType.RESETTABLE),
                     "response_type": F.Constant(F.Fuse.ResponseType.SLOW),
@@ -286,153 +296,169 @@ def pick_fuse(module: F.Fuse):
     )
 
 
-def add_app_pickers(module: Module):
-    # switch over all types of parts you want to assign real components to
-    assert isinstance(module, Module)
-    lookup = {
-        F.Resistor: pick_resistor,
-        F.Capacitor: pick_capacitor,
-        F.LED: pick_led,
-        F.Fuse: pick_fuse,
-        F.MOSFET: pick_mosfet,
-        F.USB_Type_C_Receptacle_14_pin_Vertical: lambda x: pick_module_by_params(
-            x, [PickerOption(part=LCSC_Part(partno="C168704"))]
-        ),
-        F.USB_Type_C_Receptacle_24_pin: (
-            lambda x: pick_module_by_params(
-                x, [PickerOption(part=LCSC_Part(partno="C134092"))]
+def _traced_picker(picker):
+    def wrapper(module: Module):
+        with span(
+            f"pick {type(module).__name__}", cat="picker", module=module.get_full_name()
+        ):
+            return picker(module)
+
+    return wrapper
+
+
+# switch over all types of parts you want to assign real components to
+PICKERS: dict[type[Module], Callable[[Module], None]] = {
+    F.Resistor: pick_resistor,
+    F.Capacitor: pick_capacitor,
+    F.LED: pick_led,
+    F.Fuse: pick_fuse,
+    F.MOSFET: pick_mosfet,
+    F.USB_Type_C_Receptacle_14_pin_Vertical: lambda x: PICK_CACHE.pick(
+        x, [PickerOption(part=IndexedLCSC_Part(partno="C168704"))]
+    ),
+    F.USB_Type_C_Receptacle_24_pin: (
+        lambda x: PICK_CACHE.pick(
+            x, [PickerOption(part=IndexedLCSC_Part(partno="C134092"))]
+        )
+    ),
+    F.ESP32_C3_MINI_1: lambda x: PICK_CACHE.pick(
+        x, [PickerOption(part=IndexedLCSC_Part(partno="C3013922"))]
+    ),
+    F.TXS0102DCUR: lambda x: PICK_CACHE.pick(
+        x,
+        [
+            PickerOption(
+                part=IndexedLCSC_Part(partno="C53434"),
+                pinmap={
+                    "1": x.shifters[1].io_b.signal,
+                    "2": x.voltage_a_power.lv,
+                    "3": x.voltage_a_power.hv,
+                    "4": x.shifters[1].io_a.signal,
+                    "5": x.shifters[0].io_a.signal,
+                    "6": x.n_oe.signal,
+                    "7": x.voltage_b_power.hv,
+                    "8": x.shifters[0].io_b.signal,
+                },
             )
-        ),
-        F.LED: pick_led,
-        F.ESP32_C3_MINI_1: lambda x: pick_module_by_params(
-            x, [PickerOption(part=LCSC_Part(partno="C3013922"))]
-        ),
-        F.TXS0102DCUR: lambda x: pick_module_by_params(
-            x,
-            [
-                PickerOption(
-                    part=LCSC_Part(partno="C53434"),
-                    pinmap={
-                        "1": x.shifters[1].io_b.signal,
-                        "2": x.voltage_a_power.lv,
-                        "3": x.voltage_a_power.hv,
-                        "4": x.shifters[1].io_a.signal,
-                        "5": x.shifters[0].io_a.signal,
-                        "6": x.n_oe.signal,
-                        "7": x.voltage_b_power.hv,
-                        "8": x.shifters[0].io_b.signal,
-                    },
-                )
-            ],
-        ),
-        F.QWIIC: lambda x: pick_module_by_params(
-            x,
-            [
-                PickerOption(
-                    part=LCSC_Part(partno="C495539"),
-                    pinmap={
-                        "1": x.power.lv,
-                        "2": x.power.hv,
-                        "3": x.i2c.sda.signal,
-                        "4": x.i2c.scl.signal,
-                    },
-                )
-            ],
-        ),
-        # TODO: F.Switch(F.Electrical).is_instance(module):
-        F.Button: lambda x: pick_module_by_params(
-            x,
-            [
-                PickerOption(
-                    part=LCSC_Part(partno="C139797"),
-                    pinmap={
-                        "1": x.unnamed[0],
-                        "2": x.unnamed[0],
-                        "3": x.unnamed[1],
-                        "4": x.unnamed[1],
-                    },
-                )
-            ],
-        ),
-        F.Fuse: pick_fuse,
-        F.USB2_0_ESD_Protection: lambda x: pick_module_by_params(
-            x,
-            [
-                # USBLC6_2P6
-                PickerOption(
-                    part=LCSC_Part(partno="C2827693"),
-                    pinmap={
-                        "1": x.usb[0].usb_if.d.p,
-                        "2": x.usb[0].usb_if.buspower.lv,
-                        "3": x.usb[0].usb_if.d.n,
-                        "4": x.usb[1].usb_if.d.n,
-                        "5": x.usb[0].usb_if.buspower.hv,
-                        "6": x.usb[1].usb_if.d.p,
-                    },
-                )
-            ],
-        ),
-        F.SCD40: lambda x: pick_module_by_params(
-            x, [PickerOption(part=LCSC_Part(partno="C3659421"))]
-        ),
-        F.ME6211C33M5G_N: lambda x: pick_module_by_params(
-            x, [PickerOption(part=LCSC_Part(partno="C82942"))]
-        ),
-        F.XL_3528RGBW_WS2812B: lambda x: pick_module_by_params(
-            x, [PickerOption(part=LCSC_Part(partno="C2890364"))]
-        ),
-        F.pf_533984002: lambda x: pick_module_by_params(
-            x, [PickerOption(part=LCSC_Part(partno="C393945"))]
-        ),
-        F.B4B_ZR_SM4_TF: lambda x: pick_module_by_params(
-            x, [PickerOption(part=LCSC_Part(partno="C145997"))]
-        ),
-        F.HLK_LD2410B_P: lambda x: pick_module_by_params(
-            x, [PickerOption(part=LCSC_Part(partno="C5183132"))]
-        ),
-        F.BH1750FVI_TR: lambda x: pick_module_by_params(
-            x, [PickerOption(part=LCSC_Part(partno="C78960"))]
-        ),
-        F.Diode: lambda x: pick_module_by_params(
-            x,
-            [
-                PickerOption(
-                    part=LCSC_Part(partno="C64898"),
-                    params={
-                        "forward_voltage": F.Constant(1.1 * P.V),
-                        "max_current": F.Constant(1 * P.A),
-                    },
-                    pinmap={
-                        "2": x.anode,
-                        "1": x.cathode,
-                    },
-                )
-            ],
-        ),
-        F.Crystal: lambda x: pick_module_by_params(
-            x,
-            [
-                PickerOption(
-                    part=LCSC_Part(partno="C5213671"),
-                    params={
-                        "frequency": F.Constant(32.768 * P.kHz),
-                        "frequency_tolerance": F.Constant(20 * P.ppm),
-                        "load_capacitance": F.Constant(12.5 * P.pF),
-                        "shunt_capacitance": F.Constant(
-                            F.Range.upper_bound(1.4 * P.pF)
-                        ),
-                    },
-                    pinmap={
-                        "1": x.unnamed[0],
-                        "2": x.unnamed[1],
-                    },
-                )
-            ],
-        ),
-    }
+        ],
+    ),
+    F.QWIIC: lambda x: PICK_CACHE.pick(
+        x,
+        [
+            PickerOption(
+                part=IndexedLCSC_Part(partno="C495539"),
+                pinmap={
+                    "1": x.power.lv,
+                    "2": x.power.hv,
+                    "3": x.i2c.sda.signal,
+                    "4": x.i2c.scl.signal,
+                },
+            )
+        ],
+    ),
+    # TODO: F.Switch(F.Electrical).is_instance(module):
+    F.Button: lambda x: PICK_CACHE.pick(
+        x,
+        [
+            PickerOption(
+                part=IndexedLCSC_Part(partno="C139797"),
+                pinmap={
+                    "1": x.unnamed[0],
+                    "2": x.unnamed[0],
+                    "3": x.unnamed[1],
+                    "4": x.unnamed[1],
+                },
+            )
+        ],
+    ),
+    F.USB2_0_ESD_Protection: lambda x: PICK_CACHE.pick(
+        x,
+        [
+            # USBLC6_2P6
+            PickerOption(
+                part=IndexedLCSC_Part(partno="C2827693"),
+                pinmap={
+                    "1": x.usb[0].usb_if.d.p,
+                    "2": x.usb[0].usb_if.buspower.lv,
+                    "3": x.usb[0].usb_if.d.n,
+                    "4": x.usb[1].usb_if.d.n,
+                    "5": x.usb[0].usb_if.buspower.hv,
+                    "6": x.usb[1].usb_if.d.p,
+                },
+            )
+        ],
+    ),
+    F.SCD40: lambda x: PICK_CACHE.pick(
+        x, [PickerOption(part=IndexedLCSC_Part(partno="C3659421"))]
+    ),
+    F.ME6211C33M5G_N: lambda x: PICK_CACHE.pick(
+        x, [PickerOption(part=IndexedLCSC_Part(partno="C82942"))]
+    ),
+    F.XL_3528RGBW_WS2812B: lambda x: PICK_CACHE.pick(
+        x, [PickerOption(part=IndexedLCSC_Part(partno="C2890364"))]
+    ),
+    F.pf_533984002: lambda x: PICK_CACHE.pick(
+        x, [PickerOption(part=IndexedLCSC_Part(partno="C393945"))]
+    ),
+    F.B4B_ZR_SM4_TF: lambda x: PICK_CACHE.pick(
+        x, [PickerOption(part=IndexedLCSC_Part(partno="C145997"))]
+    ),
+    F.HLK_LD2410B_P: lambda x: PICK_CACHE.pick(
+        x, [PickerOption(part=IndexedLCSC_Part(partno="C5183132"))]
+    ),
+    F.BH1750FVI_TR: lambda x: PICK_CACHE.pick(
+        x, [PickerOption(part=IndexedLCSC_Part(partno="C78960"))]
+    ),
+    F.Diode: lambda x: PICK_CACHE.pick(
+        x,
+        [
+            PickerOption(
+                part=IndexedLCSC_Part(partno="C64898"),
+                params={
+                    "forward_voltage": F.Constant(1.1 * P.V),
+                    "max_current": F.Constant(1 * P.A),
+                },
+                pinmap={
+                    "2": x.anode,
+                    "1": x.cathode,
+                },
+            )
+        ],
+    ),
+    F.Crystal: lambda x: PICK_CACHE.pick(
+        x,
+        [
+            PickerOption(
+                part=IndexedLCSC_Part(partno="C5213671"),
+                params={
+                    "frequency": F.Constant(32.768 * P.kHz),
+                    "frequency_tolerance": F.Constant(20 * P.ppm),
+                    "load_capacitance": F.Constant(12.5 * P.pF),
+                    "shunt_capacitance": F.Constant(F.Range.upper_bound(1.4 * P.pF)),
+                },
+                pinmap={
+                    "1": x.unnamed[0],
+                    "2": x.unnamed[1],
+                },
+            )
+        ],
+    ),
+}
 
-    F.has_multi_picker.add_pickers_by_type(
-        module,
-        lookup,
-        F.has_multi_picker.FunctionPicker,
-    )
+
+@cache
+def _picker_for(module_type: type[Module]) -> F.has_multi_picker.Picker | None:
+    """
+    Picker of the most specific registered base type, resolved once per type
+    """
+    for base in module_type.__mro__:
+        if base in PICKERS:
+            return F.has_multi_picker.FunctionPicker(_traced_picker(PICKERS[base]))
+    return None
+
+
+def add_app_pickers(module: Module):
+    assert isinstance(module, Module)
+    picker = _picker_for(type(module))
+    if picker is not None:
+        module.add(F.has_multi_picker(0, picker))
@@ -0,0 +1,289 @@
+import ast
+import contextlib
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from vindriktning_esp32_c3.part_store import PartStore, file_lock, get_part_store
+from vindriktning_esp32_c3.stages import SOURCE_DIR
+
+if TYPE_CHECKING:
+    from vindriktning_esp32_c3.build import BuildPaths
+
+logger = logging.getLogger(__name__)
+
+# same endpoint and headers as easyeda2kicad's EasyedaApi
+API_URL = os.environ.get(
+    "VINDRIKTNING_EASYEDA_API",
+    "https://easyeda.com/api/products/{partno}/components?version=6.4.19.5",
+)
+_RETRY_STATUS = (429, 500, 502, 503, 504)
+
+
+@contextlib.contextmanager
+def export_lock():
+    """
+    Held by everyone exporting parts to the libraries
+
+    faebryk's export writes footprints and 3D models shared by parts of the
+    same package without any locking. The lock is a file, so it also covers
+    the variant builds running in other processes.
+    """
+    import faebryk.libs.picker.lcsc as lcsc
+
+    path = lcsc.BUILD_FOLDER.joinpath("cache", "libs.lock")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with file_lock(path, exclusive=True):
+        yield
+
+
+def referenced_parts(*sources: Path) -> list[str]:
+    """
+    Part numbers of all LCSC parts constructed in the given sources
+
+    Read from the source, so pickers that need a module to build their
+    options are covered without constructing the design.
+    """
+    parts = set()
+    for source in sources or [SOURCE_DIR.joinpath("pickers.py")]:
+        for node in ast.walk(ast.parse(source.read_text())):
+            if not isinstance(node, ast.Call):
+                continue
+            func = node.func
+            name = getattr(func, "attr", None) or getattr(func, "id", None)
+            if name not in ("LCSC_Part", "IndexedLCSC_Part"):
+                continue
+            for kw in node.keywords:
+                if kw.arg == "partno" and isinstance(kw.value, ast.Constant):
+                    parts.add(kw.value.value)
+            if node.args and isinstance(node.args[0], ast.Constant):
+                parts.add(node.args[0].value)
+    return sorted(parts)
+
+
+def locked_parts(*locks: Path) -> list[str]:
+    parts = set()
+    for lock in locks:
+        if lock.is_file():
+            picks = json.loads(lock.read_text())["picks"]
+            parts |= {entry["partno"] for entry in picks.values()}
+    return sorted(parts)
+
+
+class Prefetcher:
+    """
+    Fetch the EasyEDA data of many parts at once into the part store
+
+    The raw API calls share one pooled session and are retried with
+    exponential backoff on connection errors and 429/5xx answers. The
+    footprint and 3D model export is faebryk's, it runs in the same worker
+    threads (one at a time, under export_lock()) and is retried the same way.
+    Once cancelled, workers stop before their next request or export.
+    """
+
+    def __init__(
+        self,
+        jobs: int = 8,
+        retries: int = 5,
+        backoff: float = 0.5,
+        api_url: str = API_URL,
+    ):
+        import requests
+        from easyeda2kicad import __version__
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        self.jobs = jobs
+        self.retries = retries
+        self.backoff = backoff
+        self.api_url = api_url
+        self.cancelled = threading.Event()
+        self.session = requests.Session()
+        self.session.headers.update(
+            {
+                "Accept-Encoding": "gzip, deflate",
+                "Accept": "application/json, text/javascript, */*; q=0.01",
+                "User-Agent": f"easyeda2kicad v{__version__}",
+            }
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=jobs,
+            max_retries=Retry(
+                total=retries,
+                backoff_factor=backoff,
+                status_forcelist=_RETRY_STATUS,
+            ),
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def fetch_raw(self, partno: str, store: PartStore):
+        response = self.session.get(self.api_url.format(partno=partno), timeout=30)
+        response.raise_for_status()
+        data = response.json()
+        # stored like faebryk's get_raw, {} for parts EasyEDA has no data for
+        ok = data and data.get("success", True)
+        store.put(partno, data.get("result", {}) if ok else {})
+
+    def _export(self, partno: str):
+        import faebryk.libs.picker.lcsc as lcsc
+
+        for attempt in range(self.retries + 1):
+            if self.cancelled.is_set():
+                return
+            try:
+                with export_lock():
+                    lcsc.download_easyeda_info(partno)
+                return
+            except lcsc.LCSC_NoDataException:
+                raise
+            except Exception as e:
+                if attempt == self.retries:
+                    raise
+                delay = self.backoff * 2**attempt
+                logger.debug(f"Exporting {partno} failed ({e!r}), retry in {delay}s")
+                time.sleep(delay)
+
+    def prefetch_one(self, partno: str, store: PartStore):
+        if self.cancelled.is_set():
+            return
+        if partno not in store:
+            self.fetch_raw(partno, store)
+        self._export(partno)
+
+    def prefetch(self, partnos: list[str]) -> dict[str, str]:
+        """
+        Fetch and export all parts, returns the errors by part number
+        """
+        store = get_part_store()
+        errors = {}
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            futures = {
+                pool.submit(self.prefetch_one, partno, store): partno
+                for partno in partnos
+            }
+            for future in as_completed(futures):
+                partno = futures[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    errors[partno] = repr(e)
+                    logger.error(f"Could not prefetch {partno}: {e!r}")
+        return errors
+
+
+def missing_parts(paths: "BuildPaths", partnos: list[str]) -> list[str]:
+    """
+    The parts that are not indexed or not exported to libs/ yet
+    """
+    from vindriktning_esp32_c3.part_db import get_part_db, is_exported
+
+    paths.setup_lcsc()
+    db = get_part_db()
+    return [p for p in partnos if (info := db.get(p)) is None or not is_exported(info)]
+
+
+def prefetch_parts(
+    paths: "BuildPaths",
+    jobs: int = 8,
+    retries: int = 5,
+    api_url: str = API_URL,
+) -> dict[str, str]:
+    """
+    Fetch every part the pickers or the pick locks reference, if it's missing
+
+    Returns the errors by part number.
+    """
+    from vindriktning_esp32_c3.part_db import get_part_db
+
+    locks = [
+        paths.root.joinpath("picks.lock"),
+        *paths.shared_build_dir.glob("variants/*/picks.lock"),
+    ]
+    partnos = sorted(set(referenced_parts()) | set(locked_parts(*locks)))
+    missing = missing_parts(paths, partnos)
+    logger.info(f"{len(missing)} of {len(partnos)} parts missing")
+    if not missing:
+        return {}
+    start = time.perf_counter()
+    errors = Prefetcher(jobs, retries, api_url=api_url).prefetch(missing)
+    get_part_db().update()
+    get_part_store().evict()
+    logger.info(
+        f"Prefetched {len(missing) - len(errors)} parts"
+        f" in {time.perf_counter() - start:.1f}s"
+    )
+    return errors
+
+
+# background downloads -------------------------------------------------
+class BackgroundPrefetch:
+    """
+    Download parts on worker threads while the design is built and picked
+
+    Picking itself stays serial, so the picks are exactly those of a serial
+    run. Only the downloads run in parallel: attaching a part first waits for
+    its download, if one is running. close() joins the worker threads, so
+    the stages forking worker processes afterwards start without them.
+    """
+
+    def __init__(self, partnos: list[str], jobs: int = 8):
+        self.prefetcher = Prefetcher(jobs)
+        self.pool = ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="prefetch")
+        store = get_part_store()
+        self.futures = {
+            partno: self.pool.submit(self.prefetcher.prefetch_one, partno, store)
+            for partno in partnos
+        }
+
+    def wait(self, partno: str):
+        future = self.futures.get(partno)
+        if future is None:
+            return
+        try:
+            future.result()
+        except Exception as e:
+            # the picker downloads it again and reports the error in context
+            logger.debug(f"Background download of {partno} failed: {e!r}")
+
+    def close(self):
+        # downloads still running are for parts the design didn't pick
+        self.prefetcher.cancelled.set()
+        self.pool.shutdown(wait=True, cancel_futures=True)
+
+
+_background: BackgroundPrefetch | None = None
+
+
+def start_background_prefetch(paths: "BuildPaths", jobs: int):
+    global _background
+    # the lock names exactly the parts of this design, without one the
+    # pickers download what they pick
+    if not paths.picks_lock.is_file():
+        logger.debug("No pick lock, parts are downloaded while picking")
+        return
+    missing = missing_parts(paths, locked_parts(paths.picks_lock))
+    if missing:
+        logger.info(f"Downloading {len(missing)} missing parts in the background")
+        _background = BackgroundPrefetch(missing, jobs)
+
+
+def stop_background_prefetch():
+    global _background
+    if _background is not None:
+        _background.close()
+        _background = None
+
+
+def wait_for_part(partno: str):
+    """
+    Block until the background download of partno is done, if there is one
+    """
+    if _background is not None:
+        _background.wait(partno)
@@ -0,0 +1,469 @@
+import functools
+import gc
+import json
+import logging
+import os
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+import weakref
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+class Tracer:
+    """
+    Collects nested wall time spans in the Chrome trace-event format
+
+    The resulting file can be opened in chrome://tracing or ui.perfetto.dev.
+    Spans nest by time containment, so no explicit parent bookkeeping is needed.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.events: list[dict] = []
+        self._t0 = time.perf_counter_ns()
+
+    def now_us(self) -> float:
+        return (time.perf_counter_ns() - self._t0) / 1000
+
+    @contextmanager
+    def span(self, name: str, cat: str = "build", **args):
+        if not self.enabled:
+            yield
+            return
+        start = self.now_us()
+        try:
+            yield
+        finally:
+            self.events.append(
+                {
+                    "name": name,
+                    "cat": cat,
+                    "ph": "X",
+                    "ts": start,
+                    "dur": self.now_us() - start,
+                    "pid": os.getpid(),
+                    "tid": threading.get_ident(),
+                    "args": args,
+                }
+            )
+
+    def add_span(
+        self,
+        name: str,
+        start: float,
+        dur: float,
+        pid: int,
+        cat: str = "build",
+        **args,
+    ):
+        """
+        Record a span measured elsewhere, e.g. in a forked worker process
+        """
+        if not self.enabled:
+            return
+        self.events.append(
+            {
+                "name": name,
+                "cat": cat,
+                "ph": "X",
+                "ts": start,
+                "dur": dur,
+                "pid": pid,
+                "tid": pid,
+                "args": args,
+            }
+        )
+
+    def dump(self, path: Path):
+        metadata = [
+            {
+                "name": "process_name",
+                "ph": "M",
+                "pid": os.getpid(),
+                "args": {"name": "vindriktning_esp32_c3"},
+            }
+        ]
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(
+            json.dumps(
+                {
+                    "traceEvents": metadata
+                    + sorted(self.events, key=lambda e: e["ts"]),
+                    "displayTimeUnit": "ms",
+                }
+            )
+        )
+        logger.info(f"Wrote {len(self.events)} trace events to {path}")
+
+
+def current_rss() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return peak_rss()
+
+
+def peak_rss() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # linux reports KiB, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+@dataclass
+class MemoryStats:
+    stage: str
+    peak: int
+    retained: int
+    rss: int
+    peak_rss: int
+
+
+class MemoryTracker:
+    """
+    Records peak and retained python heap (tracemalloc) and RSS per stage
+
+    tracemalloc slows the build down noticeably, so this is opt-in.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.stats: list[MemoryStats] = []
+        # peak of every open stage up to the last reset_peak() of a nested one
+        self._peaks: list[int] = []
+
+    def start(self):
+        self.enabled = True
+        tracemalloc.start()
+
+    def _fold_peak(self, peak: int):
+        if self._peaks:
+            self._peaks[-1] = max(self._peaks[-1], peak)
+
+    @contextmanager
+    def stage(self, name: str):
+        if not self.enabled:
+            yield
+            return
+        # stages nest (e.g. checks inside layout), resetting the peak for this
+        # one must not lose what the enclosing stage reached so far
+        self._fold_peak(tracemalloc.get_traced_memory()[1])
+        self._peaks.append(0)
+        tracemalloc.reset_peak()
+        try:
+            yield
+        finally:
+            gc.collect()
+            retained, peak = tracemalloc.get_traced_memory()
+            peak = max(peak, self._peaks.pop())
+            self._fold_peak(peak)
+            self.stats.append(
+                MemoryStats(name, peak, retained, current_rss(), peak_rss())
+            )
+
+    def report(self, path: Path | None = None):
+        from rich.console import Console
+        from rich.table import Table
+
+        def mib(size: int) -> str:
+            return f"{size / 2**20:.1f}"
+
+        table = Table(
+            "stage",
+            "heap peak [MiB]",
+            "heap retained [MiB]",
+            "rss [MiB]",
+            "peak rss [MiB]",
+            title="Memory per stage",
+        )
+        for s in self.stats:
+            table.add_row(
+                s.stage, mib(s.peak), mib(s.retained), mib(s.rss), mib(s.peak_rss)
+            )
+        Console().print(table)
+
+        if path is not None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps([s.__dict__ for s in self.stats], indent=4))
+
+
+@dataclass
+class _CallStats:
+    count: int = 0
+    self_time: float = 0.0
+    total_time: float = 0.0
+
+
+class ConstructionProfiler:
+    """
+    Aggregates time spent in node construction by module type
+
+    While active, __init__ (per constructed object), __preinit__/__postinit__
+    (per defining class), field setup and connect/connect_via of all loaded
+    node classes are instrumented. Self time excludes nested instrumented calls,
+    total time of recursive calls is only counted for the outermost one.
+    """
+
+    HOOKS = ("__preinit__", "__postinit__", "_setup_fields")
+    CONNECT_HOOKS = ("connect", "connect_via")
+
+    def __init__(self):
+        self.stats: dict[tuple[str, str], _CallStats] = {}
+        self._stack: list[list] = []
+        self._active: dict[tuple[str, str], int] = {}
+        self._patched: list[tuple[type, str, object]] = []
+        # objects inside their outermost (timed) __init__, kept out of the
+        # nodes themselves
+        self._constructing: weakref.WeakSet = weakref.WeakSet()
+
+    def _call(self, key: tuple[str, str], func, *args, **kwargs):
+        self._active[key] = self._active.get(key, 0) + 1
+        frame = [time.perf_counter(), 0.0]
+        self._stack.append(frame)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self._stack.pop()
+            total = time.perf_counter() - frame[0]
+            self._active[key] -= 1
+            stats = self.stats.setdefault(key, _CallStats())
+            stats.count += 1
+            stats.self_time += total - frame[1]
+            if not self._active[key]:
+                stats.total_time += total
+            if self._stack:
+                self._stack[-1][1] += total
+
+    def _wrap(self, cls: type, name: str, kind: str, key_by_instance: bool):
+        original = cls.__dict__[name]
+        profiler = self
+
+        @functools.wraps(original)
+        def wrapper(obj, *args, **kwargs):
+            owner = type(obj) if key_by_instance else cls
+            return profiler._call(
+                (owner.__qualname__, kind), original, obj, *args, **kwargs
+            )
+
+        setattr(cls, name, wrapper)
+        self._patched.append((cls, name, original))
+
+    def _wrap_init(self, cls: type):
+        original = cls.__dict__["__init__"]
+        profiler = self
+
+        @functools.wraps(original)
+        def wrapper(obj, *args, **kwargs):
+            # super().__init__ chains belong to the object being constructed
+            if obj in profiler._constructing:
+                return original(obj, *args, **kwargs)
+            profiler._constructing.add(obj)
+            try:
+                return profiler._call(
+                    (type(obj).__qualname__, "construct"),
+                    original,
+                    obj,
+                    *args,
+                    **kwargs,
+                )
+            finally:
+                profiler._constructing.discard(obj)
+
+        setattr(cls, "__init__", wrapper)
+        self._patched.append((cls, "__init__", original))
+
+    def __enter__(self):
+        from faebryk.core.moduleinterface import ModuleInterface
+        from faebryk.core.node import Node
+
+        classes, todo = set(), [Node]
+        while todo:
+            cls = todo.pop()
+            if cls in classes:
+                continue
+            classes.add(cls)
+            todo.extend(cls.__subclasses__())
+
+        for cls in classes:
+            if "__init__" in cls.__dict__:
+                self._wrap_init(cls)
+            for name in self.HOOKS:
+                if name in cls.__dict__:
+                    self._wrap(cls, name, name.strip("_"), key_by_instance=False)
+            if issubclass(cls, ModuleInterface):
+                for name in self.CONNECT_HOOKS:
+                    if name in cls.__dict__:
+                        self._wrap(cls, name, name, key_by_instance=True)
+        return self
+
+    def __exit__(self, *exc):
+        for cls, name, original in reversed(self._patched):
+            setattr(cls, name, original)
+        self._patched.clear()
+
+    def report(self, top: int | None = None):
+        from rich.console import Console
+        from rich.table import Table
+
+        table = Table(
+            "type",
+            "kind",
+            "count",
+            "self [ms]",
+            "total [ms]",
+            title="Construction time by module type",
+        )
+        rows = sorted(self.stats.items(), key=lambda kv: kv[1].self_time, reverse=True)
+        for (type_name, kind), stats in rows[:top]:
+            table.add_row(
+                type_name,
+                kind,
+                str(stats.count),
+                f"{stats.self_time * 1000:.1f}",
+                f"{stats.total_time * 1000:.1f}",
+            )
+        Console().print(table)
+
+
+@dataclass
+class PickStats:
+    picks: int = 0
+    # how each pick was resolved
+    locked: int = 0
+    cached: int = 0
+    searched: int = 0
+    failed: int = 0
+    options: int = 0
+    comparisons: int = 0
+    time: float = 0.0
+
+
+class PickProfiler:
+    """
+    Aggregates what the pickers did, by module type
+
+    Counts the options each pick evaluated and the parameter comparisons
+    (Parameter.is_subset_of calls, including those of merging the picked
+    option's parameters) it made. Comparisons are counted by wrapping
+    is_subset_of while started, so this is opt-in.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.stats: dict[str, PickStats] = {}
+        self.comparisons = 0
+        self._original = None
+
+    def start(self):
+        from faebryk.core.parameter import Parameter
+
+        original = Parameter.is_subset_of
+        profiler = self
+
+        @functools.wraps(original)
+        def wrapper(*args, **kwargs):
+            profiler.comparisons += 1
+            return original(*args, **kwargs)
+
+        Parameter.is_subset_of = wrapper
+        self._original = original
+        self.enabled = True
+
+    def stop(self):
+        from faebryk.core.parameter import Parameter
+
+        if self._original is not None:
+            Parameter.is_subset_of = self._original
+            self._original = None
+        self.enabled = False
+
+    def record(
+        self,
+        module_type: str,
+        outcome: str,
+        options: int,
+        comparisons: int,
+        duration: float,
+    ):
+        stats = self.stats.setdefault(module_type, PickStats())
+        stats.picks += 1
+        setattr(stats, outcome, getattr(stats, outcome) + 1)
+        stats.options += options
+        stats.comparisons += comparisons
+        stats.time += duration
+
+    def report(self, path: Path | None = None):
+        from rich.console import Console
+        from rich.table import Table
+
+        table = Table(
+            "type",
+            "picks",
+            "locked",
+            "cached",
+            "searched",
+            "failed",
+            "options",
+            "comparisons",
+            "time [ms]",
+            title="Picks by module type",
+        )
+        rows = sorted(self.stats.items(), key=lambda kv: kv[1].time, reverse=True)
+        for type_name, s in rows:
+            table.add_row(
+                type_name,
+                str(s.picks),
+                str(s.locked),
+                str(s.cached),
+                str(s.searched),
+                str(s.failed),
+                str(s.options),
+                str(s.comparisons),
+                f"{s.time * 1000:.1f}",
+            )
+        Console().print(table)
+
+        if path is not None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps({k: v.__dict__ for k, v in rows}, indent=4))
+
+
+TRACER = Tracer()
+MEMORY = MemoryTracker()
+PICKS = PickProfiler()
+
+
+def span(name: str, cat: str = "build", **args):
+    return TRACER.span(name, cat, **args)
+
+
+@contextmanager
+def stage(name: str, cat: str = "build", **args):
+    """
+    A build stage: traced and, if enabled, memory accounted
+    """
+    with MEMORY.stage(name), TRACER.span(name, cat, **args):
+        yield
+
+
+def traced(name: str | None = None, cat: str = "build"):
+    """
+    Decorator that wraps every call of the function in a span
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with TRACER.span(name or func.__name__, cat):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,116 @@
+import json
+import logging
+import tempfile
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from faebryk.core.graphinterface import Graph
+
+    from vindriktning_esp32_c3.app import SmartVindrikting
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 2
+
+
+def take_snapshot(app: "SmartVindrikting", G: "Graph", fingerprint: str) -> dict:
+    """
+    Capture the built and picked design in plain data
+
+    Holds the node hierarchy, the electrical links, the narrowed parameters
+    (as faebryk's parameters export renders them), the picked parts and the
+    esphome config, which is all the read-only exporters need. The esphome
+    config is None if it can't be made from the design, its exporter then
+    needs the design to report why.
+    """
+    import faebryk.library._F as F
+    from faebryk.core.module import Module
+    from faebryk.core.moduleinterface import ModuleInterface
+    from faebryk.exporters.esphome.esphome import make_esphome_config
+    from faebryk.exporters.parameters.parameters_to_file import (
+        export_parameters_to_file,
+    )
+    from faebryk.libs.picker.picker import has_part_picked
+
+    from vindriktning_esp32_c3.util import iter_children
+
+    modules = [app, *iter_children(app, types=Module)]
+
+    nodes = {
+        n.get_full_name(): type(n).__qualname__
+        for n in [*modules, *iter_children(app, types=ModuleInterface)]
+    }
+
+    with tempfile.TemporaryDirectory() as d:
+        parameters_path = Path(d, "parameters.txt")
+        export_parameters_to_file(app, parameters_path)
+        parameters = parameters_path.read_text(encoding="utf-8")
+
+    try:
+        esphome = make_esphome_config(G)
+    except Exception as e:
+        logger.debug(f"No esphome config in the snapshot: {e!r}")
+        esphome = None
+
+    parts = {}
+    for m in modules:
+        if not m.has_trait(has_part_picked):
+            continue
+        part = m.get_trait(has_part_picked).get_part()
+        parts[m.get_full_name()] = {
+            "partno": part.partno,
+            "supplier": type(part.supplier).__name__,
+        }
+
+    links = sorted(
+        {
+            tuple(sorted((mif.get_full_name(), other.get_full_name())))
+            for mif in iter_children(app, types=F.Electrical)
+            for other in mif.get_direct_connections()
+        }
+    )
+
+    return {
+        "version": SNAPSHOT_VERSION,
+        "fingerprint": fingerprint,
+        "nodes": nodes,
+        "links": links,
+        "parameters": parameters,
+        "parts": parts,
+        "esphome": esphome,
+    }
+
+
+def save_snapshot(snapshot: dict, path: Path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(snapshot, default=str))
+
+
+def load_snapshot(path: Path, fingerprint: str) -> dict | None:
+    """
+    Load the snapshot, None if it is missing or was taken from other sources
+    """
+    if not path.is_file():
+        return None
+    try:
+        snapshot = json.loads(path.read_text())
+    except json.JSONDecodeError:
+        logger.warning(f"Ignoring corrupt design snapshot {path}")
+        return None
+    if (
+        snapshot.get("version") != SNAPSHOT_VERSION
+        or snapshot.get("fingerprint") != fingerprint
+    ):
+        return None
+    return snapshot
+
+
+def write_esphome_config(snapshot: dict, path: Path):
+    from faebryk.exporters.esphome.esphome import dump_esphome_config
+
+    path.write_text(dump_esphome_config(snapshot["esphome"]), encoding="utf-8")
+
+
+def write_parameters(snapshot: dict, path: Path):
+    path.write_text(snapshot["parameters"], encoding="utf-8")
@@ -0,0 +1,139 @@
+import hashlib
+import json
+import logging
+from dataclasses import dataclass, field
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+SOURCE_DIR = Path(__file__).parent
+# sources only the layout stage runs, they don't change the design
+LAYOUT_SOURCES = ("pcb.py", "checks.py")
+# build machinery, no input of any stage
+TOOLING_SOURCES = (
+    "artifact_cache.py",
+    "benchmark.py",
+    "exporters.py",
+    "main.py",
+    "prefetch.py",
+    "profiling.py",
+    "stages.py",
+    "watch.py",
+)
+
+
+def hash_file(path: Path) -> str | None:
+    if not path.is_file():
+        return None
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def hash_tree(
+    root: Path, pattern: str = "*", exclude: tuple[str, ...] = ()
+) -> str | None:
+    """
+    Digest over the relative paths and contents of all files below root
+
+    exclude lists paths relative to root to leave out.
+    """
+    if not root.is_dir():
+        return None
+    h = hashlib.sha256()
+    for path in sorted(p for p in root.rglob(pattern) if p.is_file()):
+        if "__pycache__" in path.parts:
+            continue
+        if path.relative_to(root).as_posix() in exclude:
+            continue
+        h.update(path.relative_to(root).as_posix().encode())
+        h.update(hashlib.sha256(path.read_bytes()).digest())
+    return h.hexdigest()
+
+
+def hash_path(path: Path) -> str | None:
+    return hash_tree(path) if path.is_dir() else hash_file(path)
+
+
+def faebryk_version() -> str:
+    try:
+        return version("faebryk")
+    except PackageNotFoundError:
+        return "unknown"
+
+
+def fingerprint(**inputs) -> str:
+    return hashlib.sha256(
+        json.dumps(inputs, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+@dataclass
+class StageRecord:
+    fingerprint: str
+    outputs: dict[str, str | None] = field(default_factory=dict)
+
+
+class StageTracker:
+    """
+    Make-style bookkeeping for the build stages in main()
+
+    A stage is up to date when the fingerprint of its inputs matches the one
+    recorded on its last successful run and all of its outputs still have the
+    digests they had back then. Outputs are recorded relative to root (or
+    absolute, outside of it), whatever the directory the build ran in.
+    """
+
+    def __init__(self, state_file: Path, root: Path, force: bool = False):
+        self.state_file = state_file
+        self.root = root.resolve()
+        self.force = force
+        self.records: dict[str, StageRecord] = {}
+        if state_file.is_file():
+            try:
+                self.records = {
+                    name: StageRecord(**record)
+                    for name, record in json.loads(state_file.read_text()).items()
+                }
+            except (json.JSONDecodeError, TypeError):
+                logger.warning(f"Ignoring corrupt stage state in {state_file}")
+
+    def is_up_to_date(self, name: str, fp: str, outputs: list[Path]) -> bool:
+        if self.force:
+            return False
+        record = self.records.get(name)
+        if record is None or record.fingerprint != fp:
+            return False
+        return all(
+            record.outputs.get(self._key(path)) is not None
+            and hash_path(path) == record.outputs[self._key(path)]
+            for path in outputs
+        )
+
+    def _key(self, path: Path) -> str:
+        path = path.resolve()
+        if path.is_relative_to(self.root):
+            return path.relative_to(self.root).as_posix()
+        return path.as_posix()
+
+    def record(self, name: str, fp: str, outputs: list[Path]):
+        self.records[name] = StageRecord(
+            fingerprint=fp,
+            outputs={self._key(path): hash_path(path) for path in outputs},
+        )
+        self.save()
+
+    def invalidate(self, name: str):
+        if self.records.pop(name, None) is not None:
+            self.save()
+
+    def save(self):
+        self.state_file.parent.mkdir(parents=True, exist_ok=True)
+        self.state_file.write_text(
+            json.dumps(
+                {
+                    name: {"fingerprint": r.fingerprint, "outputs": r.outputs}
+                    for name, r in self.records.items()
+                },
+                indent=4,
+            )
+        )
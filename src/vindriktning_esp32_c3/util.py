@@ -1,13 +1,240 @@
+import weakref
+from collections import deque
+from typing import Callable, Generator, Iterator
+
 import faebryk.library._F as F
+from faebryk.core.link import Link, LinkDirect, LinkFilteredException
+from faebryk.core.moduleinterface import (
+    ModuleInterface,
+    _resolve_link_duplicate,
+    _resolve_link_transitive,
+)
 from faebryk.core.node import Node
+from faebryk.core.trait import Trait
+
+
+def iter_children[T: Node](
+    node: Node,
+    types: type[T] | tuple[type[T], ...] = Node,
+    f_filter: Callable[[T], bool] | None = None,
+) -> Iterator[T]:
+    """
+    Depth-first walk over all (indirect) children of node
+
+    Equivalent to node.get_children(direct_only=False, ...), but driven by an
+    explicit work stack instead of recursion, so the depth of the design is
+    not bounded by the interpreter recursion limit.
+    """
+    stack = list(node.get_children(direct_only=True, types=Node))
+    while stack:
+        child = stack.pop()
+        if isinstance(child, types) and (f_filter is None or f_filter(child)):
+            yield child
+        stack.extend(child.get_children(direct_only=True, types=Node))
+
+
+# one step of the connect procedure, yields the steps it has to wait for
+type _ConnectStep = Generator["_ConnectStep", None, None]
+
+
+def _link_type(link: type[Link] | Link) -> type[Link]:
+    return type(link) if isinstance(link, Link) else link
+
+
+def _connect_siblings_and_connections(
+    a: ModuleInterface,
+    b: ModuleInterface,
+    linkcls: type[Link],
+    later: deque[_ConnectStep],
+) -> _ConnectStep:
+    # ModuleInterface._connect_siblings_and_connections
+    if a is b or a.is_connected_to(b):
+        return
+    yield _connect_across_hierarchies(a, b, linkcls, later)
+    # link filtered
+    if not a.is_connected_to(b):
+        return
+
+    for group in (
+        lambda m: m.get_connected(),
+        lambda m: m.get_specialized() | m.get_specializes(),
+    ):
+        s_group = group(a) | {a: linkcls}
+        d_group = group(b) | {b: linkcls}
+        for s, slink in s_group.items():
+            for d, dlink in d_group.items():
+                if s is d:
+                    continue
+                link = _resolve_link_transitive(
+                    [_link_type(slink), _link_type(dlink), linkcls]
+                )
+                # most of the net is linked already, skip those without a step
+                if not _is_linked(s, d, link):
+                    yield _connect_across_hierarchies(s, d, link, later)
+
+
+def _is_linked(a: ModuleInterface, b: ModuleInterface, linkcls: type[Link]) -> bool:
+    existing_link = a.is_connected_to(b)
+    if not existing_link:
+        return False
+    if isinstance(existing_link, linkcls):
+        return True
+    resolved = _resolve_link_duplicate([type(existing_link), linkcls])
+    if resolved is type(existing_link):
+        return True
+    raise NotImplementedError(
+        "Overriding existing links not implemented, tried to override "
+        + f"{existing_link} with {resolved}"
+    )
+
+
+def _connect_across_hierarchies(
+    a: ModuleInterface,
+    b: ModuleInterface,
+    linkcls: type[Link],
+    later: deque[_ConnectStep],
+) -> _ConnectStep:
+    # ModuleInterface._connect_across_hierarchies
+    if _is_linked(a, b, linkcls):
+        return
+    try:
+        a.connected.connect(b.connected, linkcls=linkcls)
+    except LinkFilteredException:
+        return
+    a._on_connect(b)
+
+    # down: the children of the same name
+    if isinstance(b, type(a)):
+        for src, dst in a.zip_children_by_name_with(b, ModuleInterface).values():
+            if src is None or dst is None:
+                continue
+            yield _connect_siblings_and_connections(src, dst, linkcls, later)
+
+    # up: the parents, once the nets of the children are merged
+    later.append(_connect_up(a, b, later))
+
+
+def _connect_up(
+    a: ModuleInterface, b: ModuleInterface, later: deque[_ConnectStep]
+) -> _ConnectStep:
+    # ModuleInterface._try_connect_up, once all the children are connected
+    p1 = a.get_parent()
+    p2 = b.get_parent()
+    if not (
+        p1
+        and p2
+        and p1[0] is not p2[0]
+        and isinstance(p1[0], type(p2[0]))
+        and isinstance(p1[0], ModuleInterface)
+    ):
+        return
+    src_m, dst_m = p1[0], p2[0]
+    links = [
+        src_i.is_connected_to(dst_i)
+        for src_i, dst_i in src_m.zip_children_by_name_with(
+            dst_m, sub_type=ModuleInterface
+        ).values()
+    ]
+    if not all(links):
+        return
+    yield _connect_siblings_and_connections(
+        src_m, dst_m, _resolve_link_transitive([type(link) for link in links]), later
+    )
+
+
+def connect(
+    mif: ModuleInterface, *others: ModuleInterface, linkcls: type[Link] | None = None
+):
+    """
+    mif.connect(*others), driven by an explicit work stack
+
+    faebryk connects an interface to everything on the net of the other one,
+    their children and, once all children are, their parents, by recursion.
+    On the power rails that nests a few frames per interface on the net, so
+    big nets exceed the interpreter recursion limit. This runs the same
+    procedure, keeping the pending steps on a list.
+
+    Unlike faebryk, the parents are connected after the nets of the children
+    are merged, not in between. faebryk starts connecting the parents of the
+    first linked pair while the rest of the two nets is still unlinked, and
+    every one of those parent connections walks both nets again, which is
+    cubic in the size of the net. The links end up the same.
+    """
+    if linkcls is None:
+        linkcls = LinkDirect
+    for other in others:
+        later: deque[_ConnectStep] = deque()
+        later.append(_connect_siblings_and_connections(mif, other, linkcls, later))
+        while later:
+            stack = [later.popleft()]
+            while stack:
+                try:
+                    stack.append(next(stack[-1]))
+                except StopIteration:
+                    stack.pop()
+
+
+class DesignIndex:
+    """
+    All (indirect) children of a node, by type and by trait
+
+    Built with one walk on the first query, later queries are dict lookups.
+    A change of the node or edge count of the graph rebuilds it on the next
+    query. Changes that keep both (e.g. removing one link and adding
+    another) don't, whoever makes them calls invalidate(). Results are
+    tuples in iter_children() order.
+    """
+
+    def __init__(self, root: Node):
+        self.root = root
+        self._key: tuple[int, int] | None = None
+        self._by_type: dict[type, tuple[Node, ...]] = {}
+        self._by_trait: dict[type[Trait], tuple[Node, ...]] = {}
+
+    def invalidate(self):
+        self._key = None
+
+    def _update(self):
+        G = self.root.get_graph()
+        key = (G.node_cnt, G.edge_cnt)
+        if key == self._key:
+            return
+        by_type: dict[type, list[Node]] = {}
+        for node in iter_children(self.root):
+            for cls in type(node).__mro__:
+                by_type.setdefault(cls, []).append(node)
+        self._by_type = {cls: tuple(nodes) for cls, nodes in by_type.items()}
+        self._by_trait = {}
+        self._key = key
+
+    def of_type[T: Node](self, t: type[T]) -> tuple[T, ...]:
+        self._update()
+        return self._by_type.get(t, ())
+
+    def with_trait(self, trait: type[Trait]) -> tuple[Node, ...]:
+        self._update()
+        if trait not in self._by_trait:
+            self._by_trait[trait] = tuple(
+                n for n in self.of_type(Node) if n.has_trait(trait)
+            )
+        return self._by_trait[trait]
+
+
+_indexes: weakref.WeakKeyDictionary[Node, DesignIndex] = weakref.WeakKeyDictionary()
+
+
+def design_index(node: Node) -> DesignIndex:
+    """
+    The index of node's children, shared by everyone querying the same node
+    """
+    index = _indexes.get(node)
+    if index is None:
+        index = _indexes[node] = DesignIndex(node)
+    return index
 
 
 def get_decoupling_caps(node: Node) -> set[F.Capacitor]:
     return {
         c.get_trait(F.is_decoupled).get_capacitor()
-        for c in node.get_children(
-            direct_only=False,
-            f_filter=lambda x: x.has_trait(F.is_decoupled),
-            types=Node,
-        )
+        for c in design_index(node).with_trait(F.is_decoupled)
     }
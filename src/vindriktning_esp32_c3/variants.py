@@ -0,0 +1,132 @@
+import json
+import logging
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, fields
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Variant:
+    """
+    The knobs that distinguish the board SKUs
+
+    Plain values only, so variants can be stored as JSON and sent to workers.
+    """
+
+    name: str = "default"
+    led_pixels: int = 5
+    led_buffered: bool = True
+    presence_sensor: bool = True
+    qwiic_fuse_trip_current_mA: float = 550
+    pm_update_interval_s: float = 20
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Variant":
+        known = {f.name for f in fields(cls)}
+        unknown = set(data) - known
+        if unknown:
+            raise ValueError(f"Unknown variant parameters: {', '.join(unknown)}")
+        return cls(**data)
+
+
+DEFAULT_VARIANT = Variant()
+
+# the SKUs we build on release
+MATRIX = [
+    DEFAULT_VARIANT,
+    Variant(name="no-presence", presence_sensor=False),
+    Variant(name="qwiic-1A", qwiic_fuse_trip_current_mA=1000),
+]
+
+
+def load_matrix(path: Path) -> list[Variant]:
+    variants = [Variant.from_dict(v) for v in json.loads(path.read_text())]
+    names = [v.name for v in variants]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Duplicate variant names in {path}")
+    return variants
+
+
+@dataclass
+class VariantResult:
+    variant: str
+    ok: bool
+    duration: float
+    build_dir: str
+    error: str | None = None
+
+
+def build_variant(
+    variant: Variant,
+    export_artifacts: bool = True,
+    export_esphome_config: bool = True,
+    force: bool = False,
+    cache: str | None = None,
+) -> VariantResult:
+    """
+    Build one variant into its own build directory, with its own PCB copy
+
+    cache is the store spec, the store itself is opened in the worker.
+    """
+    from vindriktning_esp32_c3.artifact_cache import ArtifactCache, open_store
+    from vindriktning_esp32_c3.build import BuildPaths, Pipeline
+
+    paths = BuildPaths.for_variant(variant.name)
+    start = time.perf_counter()
+    try:
+        # the matrix already runs variants in parallel, export them serially
+        pipeline = Pipeline(
+            paths,
+            force=force,
+            jobs=1,
+            variant=variant,
+            cache=ArtifactCache(open_store(cache)) if cache else None,
+        )
+        pipeline.layout()
+        exporters = []
+        if export_artifacts:
+            exporters += pipeline.artifacts_exporters()
+        if export_esphome_config:
+            exporters.append(pipeline.esphome_exporter())
+        pipeline.export(exporters)
+    except Exception:
+        return VariantResult(
+            variant.name,
+            False,
+            time.perf_counter() - start,
+            str(paths.build_dir),
+            traceback.format_exc(),
+        )
+    return VariantResult(
+        variant.name, True, time.perf_counter() - start, str(paths.build_dir)
+    )
+
+
+def build_matrix(
+    variants: list[Variant], jobs: int | None = None, **kwargs
+) -> list[VariantResult]:
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(build_variant, v, **kwargs) for v in variants]
+        return [f.result() for f in futures]
+
+
+def print_summary(results: list[VariantResult]):
+    from rich.console import Console
+    from rich.table import Table
+
+    table = Table("variant", "status", "time [s]", "build dir", title="Variants")
+    for r in results:
+        table.add_row(
+            r.variant,
+            "[green]ok[/green]" if r.ok else "[red]failed[/red]",
+            f"{r.duration:.1f}",
+            r.build_dir,
+        )
+    Console().print(table)
+    for r in results:
+        if not r.ok:
+            logger.error(f"Variant {r.variant} failed:\n{r.error}")
@@ -10,19 +10,23 @@ from vindriktning_esp32_c3.modules.IKEAVindriktningPMSensorInterface import (
     IKEAVindriktningPMSensorInterface,
 )
 from vindriktning_esp32_c3.modules.PCBMount import PCB_Mount
+from vindriktning_esp32_c3.util import connect
+from vindriktning_esp32_c3.variants import DEFAULT_VARIANT, Variant
 
 logger = logging.getLogger(__name__)
 
 
 class Vindriktning_ESP32_C3(Module):
+    def __init__(self, variant: Variant = DEFAULT_VARIANT):
+        super().__init__()
+        self._variant = variant
+
     # ----------------------------------------
     #     modules, interfaces, parameters
     # ----------------------------------------
     pm_sensor: IKEAVindriktningPMSensorInterface
     co2_sensor: F.SCD40
-    leds = L.f_field(DigitalLED)(5, buffered=True)
     mcu: F.ESP32_C3_MINI_1_Reference_Design
-    pressence_sensor: F.HLK_LD2410B_P
     usb_psu: F.USB_C_PSU_Vertical
     lux_sensor: F.BH1750FVI_TR
     ldo_mcu: F.ME6211C33M5G_N
@@ -31,6 +35,10 @@ class Vindriktning_ESP32_C3(Module):
     qwiic_connector: F.QWIIC
     qwiic_fuse: F.Fuse
 
+    @L.rt_field
+    def leds(self):
+        return DigitalLED(self._variant.led_pixels, buffered=self._variant.led_buffered)
+
     # ----------------------------------------
     #                 traits
     # ----------------------------------------
@@ -43,9 +51,11 @@ class Vindriktning_ESP32_C3(Module):
         #           connections
         # ------------------------------------
         # mcu has its own LDO
-        self.ldo_mcu.power_out.connect(self.mcu.vdd3v3)
-        # connect all 3.3V powers
-        self.ldo_peripheral.power_out.connect(
+        connect(self.ldo_mcu.power_out, self.mcu.vdd3v3)
+        # connect all 3.3V powers, the rails span the whole board so they are
+        # connected without recursion
+        connect(
+            self.ldo_peripheral.power_out,
             self.lux_sensor.power,
             self.pm_sensor.power_data,
             self.co2_sensor.power,
@@ -56,13 +66,13 @@ class Vindriktning_ESP32_C3(Module):
         self.qwiic_connector.power.hv.connect_via(
             self.qwiic_fuse, self.ldo_peripheral.power_out.hv
         )
-        self.qwiic_connector.power.lv.connect(gnd)
+        connect(self.qwiic_connector.power.lv, gnd)
 
         # connect all 5V powers
-        self.usb_psu.power_out.connect(
+        connect(
+            self.usb_psu.power_out,
             self.ldo_mcu.power_in,
             self.ldo_peripheral.power_in,
-            self.pressence_sensor.power,
             self.leds.power,
             self.pm_sensor.power,
         )
@@ -73,9 +83,13 @@ class Vindriktning_ESP32_C3(Module):
         # self.pm_sensor.uart.tx.connect(self.mcu.esp32_c3_mini_1.gpio[9])
         self.pm_sensor.fan_enable.connect(self.mcu.esp32_c3_mini_1.gpio[4])
 
-        # pressence sensor
-        self.pressence_sensor.uart.connect(self.mcu.uart)
-        self.pressence_sensor.out.connect(self.mcu.esp32_c3_mini_1.gpio[6])
+        # pressence sensor (optional)
+        pressence_sensor = None
+        if self._variant.presence_sensor:
+            pressence_sensor = self.add(F.HLK_LD2410B_P(), name="pressence_sensor")
+            connect(self.usb_psu.power_out, pressence_sensor.power)
+            pressence_sensor.uart.connect(self.mcu.uart)
+            pressence_sensor.out.connect(self.mcu.esp32_c3_mini_1.gpio[6])
 
         # I2C devices
         self.mcu.esp32_c3_mini_1.esp32_c3.i2c.connect(
@@ -99,7 +113,8 @@ class Vindriktning_ESP32_C3(Module):
         # ------------------------------------
         # esphome settings
         default_update_interval = 1 * P.s
-        self.pressence_sensor.esphome_config.throttle.merge(default_update_interval)
+        if pressence_sensor is not None:
+            pressence_sensor.esphome_config.throttle.merge(default_update_interval)
         self.lux_sensor.esphome_config.update_interval.merge(default_update_interval)
         self.leds.max_refresh_rate.merge(60 * P.Hz)
         self.co2_sensor.esphome_config.update_interval.merge(default_update_interval)
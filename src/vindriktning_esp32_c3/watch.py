@@ -0,0 +1,103 @@
+import importlib
+import logging
+import sys
+import time
+from pathlib import Path
+from typing import Callable
+
+from vindriktning_esp32_c3.build import Pipeline
+from vindriktning_esp32_c3.stages import LAYOUT_SOURCES, SOURCE_DIR
+
+logger = logging.getLogger(__name__)
+
+# modules that only script the layout, the built design stays valid for all
+# stages (the layout stage undoes its previous run on it)
+LAYOUT_MODULES = {f"vindriktning_esp32_c3.{Path(name).stem}" for name in LAYOUT_SOURCES}
+# build machinery, changes need a restart of the watcher
+INFRA_MODULES = {
+    "vindriktning_esp32_c3.build",
+    "vindriktning_esp32_c3.exporters",
+    "vindriktning_esp32_c3.main",
+    "vindriktning_esp32_c3.prefetch",
+    "vindriktning_esp32_c3.profiling",
+    "vindriktning_esp32_c3.stages",
+    "vindriktning_esp32_c3.watch",
+}
+
+
+def _module_name(path: Path) -> str:
+    rel = path.relative_to(SOURCE_DIR.parent).with_suffix("")
+    return ".".join(rel.parts)
+
+
+def _snapshot(pipeline: Pipeline) -> dict[Path, int]:
+    files = [p for p in SOURCE_DIR.rglob("*.py") if "__pycache__" not in p.parts]
+    files.append(pipeline.paths.pcbfile)
+    return {p: p.stat().st_mtime_ns for p in files if p.exists()}
+
+
+def _reload(pipeline: Pipeline, changed: set[Path]):
+    modules = {_module_name(p) for p in changed if p.suffix == ".py"}
+    if modules & INFRA_MODULES:
+        logger.warning(
+            "Build machinery changed, restart the watcher to pick it up: "
+            + ", ".join(sorted(modules & INFRA_MODULES))
+        )
+    modules -= INFRA_MODULES
+
+    if modules <= LAYOUT_MODULES:
+        for name in modules:
+            if name in sys.modules:
+                importlib.reload(sys.modules[name])
+        pipeline.refresh(keep_design=True)
+        return
+
+    # the design changed: drop all project modules except the build machinery
+    # and rebuild from scratch, faebryk itself stays imported
+    for name in list(sys.modules):
+        if name.startswith("vindriktning_esp32_c3.") and name not in INFRA_MODULES:
+            del sys.modules[name]
+    pipeline.refresh(keep_design=False)
+
+
+def watch(
+    pipeline: Pipeline,
+    run: Callable[[Pipeline], None],
+    interval: float = 0.2,
+):
+    """
+    Re-run the stale stages whenever a source file or the PCB changes
+
+    The built design is kept in memory across runs, so e.g. editing pcb.py
+    only re-runs the layout stage, on the same design.
+    """
+
+    def _run_once():
+        try:
+            run(pipeline)
+        except Exception:
+            logger.exception("Build failed, waiting for changes")
+            pipeline.refresh(keep_design=False)
+
+    _run_once()
+    state = _snapshot(pipeline)
+    logger.info(f"Watching {SOURCE_DIR} and {pipeline.paths.pcbfile}")
+
+    while True:
+        time.sleep(interval)
+        new_state = _snapshot(pipeline)
+        changed = {
+            p
+            for p in state.keys() | new_state.keys()
+            if state.get(p) != new_state.get(p)
+        }
+        if not changed:
+            continue
+
+        logger.info("Changed: " + ", ".join(p.name for p in sorted(changed)))
+        start = time.perf_counter()
+        _reload(pipeline, changed)
+        _run_once()
+        logger.info(f"Rebuilt in {time.perf_counter() - start:.2f}s")
+        # absorb our own writes (e.g. the PCB file)
+        state = _snapshot(pipeline)
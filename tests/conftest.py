@@ -0,0 +1,26 @@
+from dataclasses import replace
+
+import faebryk.libs.picker.lcsc as lcsc
+import pytest
+
+from vindriktning_esp32_c3.build import BuildPaths
+
+
+@pytest.fixture
+def variant_paths(tmp_path, monkeypatch):
+    """
+    Paths of a variant build in tmp_path, reading parts from the repo's store
+
+    The store is filled from the committed seed, so no download is needed.
+    """
+    shared_build_dir = BuildPaths.default().root.joinpath("build")
+    # setup_lcsc() points faebryk at the store, undo that afterwards
+    for name in ("BUILD_FOLDER", "LIB_FOLDER", "get_raw"):
+        monkeypatch.setattr(lcsc, name, getattr(lcsc, name))
+    monkeypatch.chdir(tmp_path)
+
+    def _paths(name: str) -> BuildPaths:
+        paths = BuildPaths.for_variant(name)
+        return replace(paths, shared_build_dir=shared_build_dir)
+
+    return _paths
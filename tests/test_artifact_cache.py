@@ -0,0 +1,78 @@
+import threading
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from vindriktning_esp32_c3.artifact_cache import (
+    ArtifactCache,
+    HttpStore,
+    LocalStore,
+    serve,
+)
+
+
+@pytest.fixture
+def outputs(tmp_path):
+    netlist = tmp_path.joinpath("out", "faebryk.net")
+    manufacturing = tmp_path.joinpath("out", "manufacturing")
+    manufacturing.mkdir(parents=True)
+    netlist.write_text("(export)")
+    manufacturing.joinpath("gerber.zip").write_bytes(b"\0gerber")
+    return [netlist, manufacturing]
+
+
+def _clear(outputs):
+    outputs[0].unlink()
+    outputs[1].joinpath("gerber.zip").unlink()
+
+
+def test_round_trip_over_http(tmp_path, outputs):
+    server = serve(tmp_path.joinpath("store"))
+    try:
+        url = f"http://{server.server_address[0]}:{server.server_address[1]}"
+        cache = ArtifactCache(HttpStore(url))
+
+        assert not cache.fetch("layout", "fp", outputs)
+        cache.publish("layout", "fp", outputs)
+        _clear(outputs)
+        assert cache.fetch("layout", "fp", outputs)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert outputs[0].read_text() == "(export)"
+    assert outputs[1].joinpath("gerber.zip").read_bytes() == b"\0gerber"
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_truncated_entry_is_a_miss(tmp_path, outputs):
+    store = LocalStore(tmp_path.joinpath("store"))
+    cache = ArtifactCache(store)
+    cache.publish("layout", "fp", outputs)
+    key = ArtifactCache.key("layout", "fp")
+    store.put(key, store.get(key)[:100])
+
+    assert not cache.fetch("layout", "fp", outputs)
+    assert cache.misses == 1
+
+
+def test_server_errors_are_a_miss(outputs):
+    class Failing(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_error(HTTPStatus.INTERNAL_SERVER_ERROR)
+
+        do_PUT = do_GET
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Failing)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        cache = ArtifactCache(HttpStore(f"http://127.0.0.1:{server.server_port}"))
+        cache.publish("layout", "fp", outputs)
+        assert not cache.fetch("layout", "fp", outputs)
+    finally:
+        server.shutdown()
+        server.server_close()
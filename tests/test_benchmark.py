@@ -0,0 +1,38 @@
+import logging
+import multiprocessing
+
+import pytest
+from typer.testing import CliRunner
+
+import vindriktning_esp32_c3.benchmark as benchmark
+
+
+def test_compare_without_baseline_fails_clearly(tmp_path, monkeypatch, caplog):
+    monkeypatch.setattr(
+        benchmark, "DEFAULT_BASELINE", tmp_path.joinpath("baseline.json")
+    )
+    current = tmp_path.joinpath("latest.json")
+    current.write_text('{"stages": {"make_app": 1.0}}')
+
+    with caplog.at_level(logging.ERROR):
+        result = CliRunner().invoke(benchmark.cli, ["compare", str(current)])
+
+    assert result.exit_code == 1
+    assert "No baseline" in caplog.text
+
+
+def test_scaling_worker_reports_a_recursion_error(monkeypatch):
+    def scale_once(pixels, report):
+        report("construct", 0.1)
+        raise RecursionError("maximum recursion depth exceeded")
+
+    monkeypatch.setattr(benchmark, "scale_once", scale_once)
+    recv, send = multiprocessing.Pipe(duplex=False)
+
+    with pytest.raises(RecursionError):
+        benchmark._scale_worker(5, send)
+
+    assert recv.recv() == ("construct", 0.1)
+    name, trace = recv.recv()
+    assert name == "failed"
+    assert "RecursionError" in trace
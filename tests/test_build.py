@@ -0,0 +1,128 @@
+import sys
+from pathlib import Path
+
+import faebryk.library._F as F
+import faebryk.libs.picker.lcsc as lcsc
+from faebryk.exporters.pcb.kicad.transformer import PCB_Transformer
+
+import vindriktning_esp32_c3.build as build
+from vindriktning_esp32_c3.build import (
+    BuildPaths,
+    Pipeline,
+    _sync_source,
+    build_design,
+)
+from vindriktning_esp32_c3.exporters import Exporter
+from vindriktning_esp32_c3.util import design_index
+from vindriktning_esp32_c3.variants import MATRIX, Variant
+
+
+def _paths(tmp_path) -> BuildPaths:
+    build_dir = tmp_path.joinpath("build")
+    faebryk_build_dir = build_dir.joinpath("faebryk")
+    paths = BuildPaths(
+        root=tmp_path,
+        shared_build_dir=build_dir,
+        build_dir=build_dir,
+        faebryk_build_dir=faebryk_build_dir,
+        netlist=faebryk_build_dir.joinpath("faebryk.net"),
+        pcbfile=tmp_path.joinpath("source", "main.kicad_pcb"),
+        esphome_config=build_dir.joinpath("esphome", "esphome.yaml"),
+        manufacturing_artifacts=build_dir.joinpath("manufacturing"),
+        parameters=faebryk_build_dir.joinpath("parameters.txt"),
+        picks_lock=tmp_path.joinpath("picks.lock"),
+    )
+    paths.pcbfile.parent.mkdir(parents=True)
+    paths.pcbfile.write_text("(kicad_pcb)")
+    return paths
+
+
+def test_artifact_exporters_have_disjoint_outputs(tmp_path):
+    from vindriktning_esp32_c3.exporters import _check_disjoint
+
+    pipeline = Pipeline(_paths(tmp_path), download_jobs=0)
+    _check_disjoint([exporter for exporter, _ in pipeline.artifacts_exporters()])
+
+
+def test_exports_after_a_lock_change_run_once(tmp_path, monkeypatch):
+    for name in ("BUILD_FOLDER", "LIB_FOLDER", "get_raw"):
+        monkeypatch.setattr(lcsc, name, getattr(lcsc, name))
+    paths = _paths(tmp_path)
+
+    def build_design(variant, picks_lock):
+        picks_lock.write_text("picked")
+        return object(), object()
+
+    monkeypatch.setattr(build, "build_design", build_design)
+    runs = []
+
+    def export(pipeline):
+        exporter = Exporter(
+            "out",
+            lambda d: runs.append(1) or d.joinpath("out").write_text("out"),
+            {"out": tmp_path.joinpath("out")},
+        )
+        pipeline.export([(exporter, lambda: pipeline.design_fp)])
+
+    export(Pipeline(paths, jobs=1, download_jobs=0))
+    # the next run finds the lock the first one wrote
+    export(Pipeline(paths, jobs=1, download_jobs=0))
+
+    assert len(runs) == 1
+
+
+def test_no_presence_variant_builds(variant_paths):
+    paths = variant_paths("no-presence")
+    assert paths.picks_lock.parent == paths.build_dir
+    assert paths.build_dir.is_relative_to("build/variants")
+    paths.setup_lcsc()
+
+    variant = next(v for v in MATRIX if v.name == "no-presence")
+    app, _ = build_design(variant, paths.picks_lock)
+
+    assert not app.get_children(direct_only=False, types=F.HLK_LD2410B_P)
+    assert paths.picks_lock.exists()
+
+
+def test_long_led_string_lays_out_with_default_recursion_limit(variant_paths):
+    # faebryk's own connect overflows the default limit from about 8 pixels
+    assert sys.getrecursionlimit() <= 1000
+    variant = Variant(name="long-string", led_pixels=24)
+
+    pipeline = Pipeline(
+        variant_paths(variant.name),
+        force=True,
+        jobs=1,
+        download_jobs=0,
+        variant=variant,
+    )
+    pipeline.layout()
+
+    app, _ = pipeline.get_design()
+    leds = design_index(app).of_type(F.XL_3528RGBW_WS2812B)
+    assert len(leds) == variant.led_pixels
+    assert all(
+        led.has_trait(PCB_Transformer.has_linked_kicad_footprint) for led in leds
+    )
+
+
+def test_variant_source_follows_the_project(tmp_path):
+    source = tmp_path.joinpath("source")
+    source.mkdir()
+    source.joinpath("main.kicad_pcb").write_text("(kicad_pcb)")
+    source.joinpath("fp-lib-table").write_text('(uri "${KIPRJMOD}/../libs/x")')
+    copy = tmp_path.joinpath("build", "variants", "v", "source")
+
+    _sync_source(source, copy)
+    lib = copy.joinpath("fp-lib-table").read_text()
+    lib = lib.split('"')[1].replace("${KIPRJMOD}", str(copy))
+    assert Path(lib).resolve() == tmp_path.joinpath("libs", "x")
+
+    # laid out for the variant, kept while the project is unchanged
+    copy.joinpath("main.kicad_pcb").write_text("(kicad_pcb variant)")
+    _sync_source(source, copy)
+    assert copy.joinpath("main.kicad_pcb").read_text() == "(kicad_pcb variant)"
+
+    source.joinpath("main.kicad_pcb").write_text("(kicad_pcb changed)")
+    _sync_source(source, copy)
+    assert copy.joinpath("main.kicad_pcb").read_text() == "(kicad_pcb changed)"
@@ -0,0 +1,37 @@
+import faebryk.library._F as F
+import pytest
+from faebryk.core.module import Module
+
+from vindriktning_esp32_c3.checks import CheckError, run_checks
+
+
+class _Board(Module):
+    power: F.ElectricPower
+    resistor: F.Resistor
+
+
+def test_all_violations_reported():
+    board = _Board()
+    assert set(run_checks(board, board.get_graph())) == {
+        "shorted_power",
+        "shorted_nets",
+        "net_name_collisions",
+        "shorted_components",
+    }
+
+    board.power.lv.connect(board.power.hv)
+    board.resistor.unnamed[0].connect(board.resistor.unnamed[1])
+    with pytest.raises(CheckError) as e:
+        run_checks(board, board.get_graph())
+    assert set(e.value.failures) == {"shorted_power", "shorted_components"}
+
+
+def test_parallel_checks_report_the_same():
+    board = _Board()
+    board.power.lv.connect(board.power.hv)
+
+    with pytest.raises(CheckError) as serial:
+        run_checks(board, board.get_graph(), jobs=1)
+    with pytest.raises(CheckError) as parallel:
+        run_checks(board, board.get_graph(), jobs=2)
+    assert parallel.value.failures == serial.value.failures
@@ -0,0 +1,35 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from vindriktning_esp32_c3.benchmark import HELP_BUDGET, time_cli_help
+
+SRC = Path(__file__).parent.parent.joinpath("src")
+
+
+@pytest.fixture(autouse=True)
+def _pythonpath(monkeypatch):
+    # the subprocesses import the package from the tree under test
+    monkeypatch.setenv("PYTHONPATH", str(SRC))
+
+
+def test_help_within_budget():
+    # best of three, a single slow start on a busy machine is no regression
+    assert min(time_cli_help() for _ in range(3)) < HELP_BUDGET
+
+
+def test_main_does_not_import_faebryk():
+    out = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys, vindriktning_esp32_c3.main;"
+            "print(sorted(m for m in sys.modules if m.split('.')[0] == 'faebryk'))",
+        ],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    assert out.strip() == "[]"
@@ -0,0 +1,87 @@
+import sys
+
+import faebryk.library._F as F
+from faebryk.core.moduleinterface import ModuleInterface
+from faebryk.core.node import FieldConstructionError
+
+import vindriktning_esp32_c3.modules.DigitalLED as digital_led
+import vindriktning_esp32_c3.vindriktning_esp32_c3_base as base
+from vindriktning_esp32_c3.app import SmartVindrikting
+from vindriktning_esp32_c3.build import _caused_by_recursion
+from vindriktning_esp32_c3.modules.DigitalLED import DigitalLED
+from vindriktning_esp32_c3.util import connect, iter_children
+
+# faebryk's recursive connect overflows the default limit from about 8 pixels
+PIXELS = 12
+
+
+def test_large_string_builds_with_default_recursion_limit():
+    assert sys.getrecursionlimit() <= 1000
+
+    leds = DigitalLED(pixels=PIXELS)
+
+    assert all(led.power.is_connected_to(leds.power) for led in leds.leds)
+    assert all(led.power.hv.is_connected_to(leds.power.hv) for led in leds.leds)
+    for led in leds.leds:
+        assert led.data_in.reference.is_connected_to(leds.power)
+        assert led.data_out.reference.is_connected_to(leds.power)
+    assert leds.data_in.signal.is_connected_to(leds.leds[0].data_in.signal)
+    for prev, led in zip(leds.leds, leds.leds[1:]):
+        assert prev.data_out.signal.is_connected_to(led.data_in.signal)
+        assert not prev.data_out.signal.is_connected_to(led.data_out.signal)
+
+
+def test_connect_matches_faebryk():
+    def rail(connect_fn):
+        powers = [F.ElectricPower() for _ in range(4)]
+        for p in powers[1:]:
+            connect_fn(powers[0], p)
+        return powers
+
+    ours = rail(connect)
+    theirs = rail(lambda a, b: a.connect(b))
+
+    def links(powers):
+        mifs = [m for p in powers for m in (p, p.hv, p.lv)]
+        return [[type(a.is_connected_to(b)) for b in mifs] for a in mifs]
+
+    assert links(ours) == links(theirs)
+
+
+def _links(app: SmartVindrikting) -> set[tuple[str, str, str]]:
+    return {
+        (mif.get_full_name(), other.get_full_name(), type(link).__name__)
+        for mif in iter_children(app, types=ModuleInterface)
+        for other, link in mif.get_connected().items()
+    }
+
+
+def test_connect_matches_faebryk_on_the_app(monkeypatch):
+    ours = _links(SmartVindrikting())
+
+    def faebryk_connect(mif, *others, linkcls=None):
+        mif.connect(*others, linkcls=linkcls)
+
+    for module in (digital_led, base):
+        monkeypatch.setattr(module, "connect", faebryk_connect)
+    # faebryk's recursive connect needs a deeper stack for the power rails
+    limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(20_000)
+    try:
+        theirs = _links(SmartVindrikting())
+    finally:
+        sys.setrecursionlimit(limit)
+
+    assert ours == theirs
+
+
+def test_recursion_error_found_behind_faebryk_wrappers():
+    try:
+        try:
+            raise RecursionError()
+        except RecursionError as e:
+            raise FieldConstructionError(None, "leds") from e
+    except FieldConstructionError as e:
+        assert _caused_by_recursion(e)
+
+    assert not _caused_by_recursion(ValueError())
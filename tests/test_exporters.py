@@ -0,0 +1,66 @@
+import pytest
+
+from vindriktning_esp32_c3.exporters import ExportError, Exporter, run_exporters
+
+
+def _write(name: str):
+    def func(d):
+        d.joinpath(name).write_text(name)
+
+    return func
+
+
+def _fail(d):
+    raise RuntimeError("no PCB")
+
+
+def test_outputs_only_written_if_all_succeed(tmp_path):
+    out = tmp_path.joinpath("out")
+    exporters = [
+        Exporter("a", _write("a.txt"), {"a.txt": out.joinpath("a.txt")}),
+        Exporter("b", _fail, {"b.txt": out.joinpath("b.txt")}),
+    ]
+    with pytest.raises(ExportError, match="no PCB"):
+        run_exporters(exporters, tmp_path.joinpath("staging"), jobs=1)
+    assert not out.exists()
+
+    exporters[1] = Exporter("b", _write("b.txt"), {"b.txt": out.joinpath("b.txt")})
+    run_exporters(exporters, tmp_path.joinpath("staging"), jobs=1)
+    assert out.joinpath("b.txt").read_text() == "b.txt"
+
+
+def test_overlapping_outputs_are_rejected(tmp_path):
+    out = tmp_path.joinpath("manufacturing")
+    exporters = [
+        Exporter("artifacts", _write("x"), {"manufacturing": out}),
+        Exporter("svg", _write("pcba.svg"), {"pcba.svg": out.joinpath("pcba.svg")}),
+    ]
+    with pytest.raises(ValueError, match="overlap"):
+        run_exporters(exporters, tmp_path.joinpath("staging"), jobs=1)
+
+
+def test_missing_output_fails_before_anything_is_written(tmp_path):
+    out = tmp_path.joinpath("out")
+    exporters = [
+        Exporter("a", _write("a.txt"), {"a.txt": out.joinpath("a.txt")}),
+        Exporter("b", _write("c.txt"), {"b.txt": out.joinpath("b.txt")}),
+    ]
+    with pytest.raises(ExportError, match="Did not write b.txt"):
+        run_exporters(exporters, tmp_path.joinpath("staging"), jobs=1)
+    assert not out.exists()
+
+
+def test_directory_outputs_are_replaced_whole(tmp_path):
+    out = tmp_path.joinpath("manufacturing")
+    out.mkdir()
+    out.joinpath("stale.gbr").write_text("old")
+
+    def func(d):
+        d.joinpath("gerbers").mkdir()
+        d.joinpath("gerbers", "top.gbr").write_text("new")
+
+    exporter = Exporter("artifacts", func, {"gerbers": out})
+    run_exporters([exporter], tmp_path.joinpath("staging"), jobs=1)
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["manufacturing"]
+    assert [p.name for p in out.iterdir()] == ["top.gbr"]
@@ -0,0 +1,75 @@
+import gc
+
+import faebryk.library._F as F
+import pytest
+from faebryk.core.module import Module
+
+from vindriktning_esp32_c3.nets import NetNameError, net_index
+
+
+class _Board(Module):
+    a: F.Electrical
+    b: F.Electrical
+    power: F.ElectricPower
+
+
+def _name(mif: F.Electrical, name: str) -> F.Net:
+    net = F.Net.with_name(name)
+    net.part_of.connect(mif)
+    return net
+
+
+class _KiCadNet:
+    def __init__(self, name: str):
+        self.name = name
+
+
+class _Transformer:
+    def __init__(self, *names: str):
+        self.pcb = type("PCB", (), {"nets": [_KiCadNet(n) for n in names]})()
+
+
+def test_lookup():
+    board = _Board()
+    gnd = _name(board.power.lv, "GND")
+    board.a.connect(board.power.lv)
+
+    index = net_index(board)
+    assert index.names() == ["GND"]
+    assert index["GND"] is gnd
+    assert index.net_of(board.a) is gnd
+    assert index.net_of(board.b) is None
+    with pytest.raises(TypeError):
+        index.net_of(board.power)
+
+
+def test_rebuilt_after_changes():
+    board = _Board()
+    _name(board.a, "A")
+    assert net_index(board).names() == ["A"]
+
+    b = _name(board.b, "B")
+    assert net_index(board).names() == ["A", "B"]
+    assert net_index(board).net_of(board.b) is b
+
+    _name(board.power.hv, "A")
+    with pytest.raises(NetNameError):
+        net_index(board)
+
+
+def test_pcb_nets_are_not_kept():
+    board = _Board()
+    _name(board.a, "A")
+    index = net_index(board)
+
+    transformer = _Transformer("A", "B")
+    assert index.pcb_net(transformer, "A").name == "A"
+    # B is no named net of the design
+    with pytest.raises(KeyError):
+        index.pcb_net(transformer, "B")
+
+    del transformer
+    gc.collect()
+    assert index._pcb_nets[0]() is None
+    index.forget_pcb()
+    assert index._pcb_nets is None
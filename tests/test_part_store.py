@@ -0,0 +1,24 @@
+import json
+
+from vindriktning_esp32_c3.part_store import PartStore
+
+
+def test_seed_is_imported_and_kept(tmp_path):
+    seed = tmp_path.joinpath("easyeda")
+    seed.mkdir()
+    seed.joinpath("C1525").write_text(json.dumps({"title": "100nF"}))
+
+    store = PartStore(tmp_path.joinpath("store"), seed=seed)
+    assert store.import_dir(seed) == 1
+    assert store.get("C1525") == {"title": "100nF"}
+    assert seed.joinpath("C1525").is_file()
+    assert store.import_dir(seed) == 0
+
+
+def test_new_parts_go_to_the_seed(tmp_path):
+    seed = tmp_path.joinpath("easyeda")
+    store = PartStore(tmp_path.joinpath("store"), seed=seed)
+
+    store.put("C25905", {"title": "5.1k"})
+
+    assert json.loads(seed.joinpath("C25905").read_text()) == {"title": "5.1k"}
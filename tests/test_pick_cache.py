@@ -0,0 +1,39 @@
+import faebryk.library._F as F
+from faebryk.libs.units import P
+
+from vindriktning_esp32_c3.pick_cache import (
+    PickCache,
+    module_signature,
+    param_signature,
+)
+from vindriktning_esp32_c3.pick_lock import PickLock
+
+
+def test_signature_in_the_parameters_unit():
+    capacitance = F.Range.from_center(100 * P.nF, 50 * P.nF)
+    assert param_signature(capacitance) == "[50 nF, 150 nF]"
+    assert param_signature(F.Range.lower_bound(10 * P.V)) == "[10 V, inf V]"
+    assert param_signature(F.Constant(24.96 * P.kohm)) == "24.96 kΩ"
+
+
+def test_equal_values_get_equal_signatures():
+    assert param_signature(F.Constant(0.1 * P.uF)) == param_signature(
+        F.Constant(100 * P.nF)
+    )
+
+
+def test_lock_keeps_the_signature_from_before_picking(tmp_path):
+    cache = PickCache()
+    capacitor = F.Capacitor()
+    capacitor.capacitance.merge(F.Range(10 * P.pF, 20 * P.pF))
+    capacitor.rated_voltage.merge(F.ANY())
+    capacitor.temperature_coefficient.merge(F.ANY())
+    before = module_signature(capacitor)
+    cache.use_lock(PickLock(tmp_path.joinpath("picks.lock")), [capacitor])
+
+    # what picking a sibling with a shared parameter does
+    capacitor.capacitance.merge(15 * P.pF)
+
+    assert param_signature(capacitor.capacitance) == "15 pF"
+    assert module_signature(capacitor) != before
+    assert cache.lock_signatures[capacitor] == before
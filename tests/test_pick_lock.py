@@ -0,0 +1,44 @@
+import json
+from types import SimpleNamespace
+
+from vindriktning_esp32_c3.pick_lock import PickLock
+
+
+def _module(name: str):
+    return SimpleNamespace(get_full_name=lambda: name)
+
+
+def _option(partno: str):
+    return SimpleNamespace(part=SimpleNamespace(partno=partno))
+
+
+def test_changed_signature_replaces_entry(tmp_path):
+    path = tmp_path.joinpath("picks.lock")
+    cap, option = _module("*.cap"), _option("C1525")
+
+    lock = PickLock(path)
+    lock.record(cap, "capacitance=100nF", option)
+    assert lock.save()
+
+    lock = PickLock(path)
+    assert lock.lookup(cap, "capacitance=100nF", [option]) is option
+    lock.record(cap, "capacitance=1uF", option)
+    assert lock.save()
+
+    lock = PickLock(path)
+    assert lock.lookup(cap, "capacitance=100nF", [option]) is None
+    assert lock.lookup(cap, "capacitance=1uF", [option]) is option
+    lock.record(cap, "capacitance=1uF", option)
+    assert not lock.save()
+
+
+def test_uncomparable_modules_are_not_locked(tmp_path):
+    path = tmp_path.joinpath("picks.lock")
+
+    lock = PickLock(path)
+    lock.record(_module("*.cap"), None, _option("C1525"))
+    lock.record(_module("*.res"), "resistance=10k", _option("C25076"))
+    lock.save()
+
+    picks = json.loads(path.read_text())["picks"]
+    assert picks == {"*.res": {"partno": "C25076", "signature": "resistance=10k"}}
@@ -0,0 +1,88 @@
+import fcntl
+import json
+import threading
+import time
+from collections import Counter
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import faebryk.libs.picker.lcsc as lcsc
+import pytest
+
+import vindriktning_esp32_c3.prefetch as prefetch
+from vindriktning_esp32_c3.part_store import PartStore
+from vindriktning_esp32_c3.prefetch import BackgroundPrefetch, Prefetcher, export_lock
+
+
+def test_background_prefetch_joins_its_threads(tmp_path, monkeypatch):
+    started = []
+
+    def prefetch_one(self, partno, store):
+        started.append(partno)
+        time.sleep(0.2)
+
+    monkeypatch.setattr(prefetch, "get_part_store", lambda: PartStore(tmp_path))
+    monkeypatch.setattr(Prefetcher, "prefetch_one", prefetch_one)
+
+    background = BackgroundPrefetch([f"C{i}" for i in range(20)], jobs=2)
+    background.close()
+
+    assert not [t for t in threading.enumerate() if t.name.startswith("prefetch")]
+    # queued downloads were cancelled, not run
+    assert len(started) < 20
+
+
+def test_prefetch_retries_rate_limits(tmp_path, monkeypatch):
+    requests = Counter()
+
+    class EasyEDA(BaseHTTPRequestHandler):
+        # rate limited twice per part, then the part
+        def do_GET(self):
+            partno = self.path.strip("/")
+            requests[partno] += 1
+            if requests[partno] <= 2:
+                self.send_error(HTTPStatus.TOO_MANY_REQUESTS)
+                return
+            body = json.dumps({"success": True, "result": {"lcsc": partno}})
+            self.send_response(HTTPStatus.OK)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body.encode())
+
+        def log_message(self, format, *args):
+            pass
+
+    store = PartStore(tmp_path)
+    monkeypatch.setattr(prefetch, "get_part_store", lambda: store)
+    # the footprint export is faebryk's
+    monkeypatch.setattr(Prefetcher, "_export", lambda self, partno: None)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), EasyEDA)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        prefetcher = Prefetcher(
+            jobs=2,
+            retries=3,
+            backoff=0,
+            api_url=f"http://127.0.0.1:{server.server_port}/{{partno}}",
+        )
+        errors = prefetcher.prefetch(["C1", "C2"])
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert errors == {}
+    assert requests == {"C1": 3, "C2": 3}
+    assert store.get("C1") == {"lcsc": "C1"}
+    assert store.get("C2") == {"lcsc": "C2"}
+
+
+def test_export_lock_is_a_file_lock(tmp_path, monkeypatch):
+    monkeypatch.setattr(lcsc, "BUILD_FOLDER", tmp_path)
+
+    with export_lock():
+        # what a variant build in another process does
+        with open(tmp_path.joinpath("cache", "libs.lock"), "a") as f:
+            with pytest.raises(BlockingIOError):
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
@@ -0,0 +1,34 @@
+import tracemalloc
+
+from vindriktning_esp32_c3.profiling import MemoryTracker
+
+
+def test_nested_stage_keeps_outer_peak():
+    tracker = MemoryTracker()
+    tracker.start()
+    try:
+        with tracker.stage("outer"):
+            big = bytearray(32 * 2**20)
+            del big
+            with tracker.stage("inner"):
+                small = bytearray(2**20)
+                del small
+    finally:
+        tracemalloc.stop()
+
+    peaks = {s.stage: s.peak for s in tracker.stats}
+    assert peaks["inner"] < 8 * 2**20
+    assert peaks["outer"] >= 32 * 2**20
+
+
+def test_construction_profiler_leaves_no_marks():
+    import faebryk.library._F as F
+
+    from vindriktning_esp32_c3.profiling import ConstructionProfiler
+
+    with ConstructionProfiler() as profiler:
+        resistor = F.Resistor()
+
+    assert profiler.stats[("Resistor", "construct")].count == 1
+    assert not hasattr(resistor, "_construction_profiled")
+    assert not profiler._constructing
@@ -0,0 +1,29 @@
+import faebryk.exporters.esphome.esphome as esphome
+from faebryk.exporters.parameters.parameters_to_file import export_parameters_to_file
+
+from vindriktning_esp32_c3.modules.DigitalLED import DigitalLED
+from vindriktning_esp32_c3.snapshot import take_snapshot, write_parameters
+
+
+def test_snapshot_parameters_match_faebryk(tmp_path):
+    leds = DigitalLED(pixels=2)
+    snapshot = take_snapshot(leds, leds.get_graph(), "fp")
+
+    write_parameters(snapshot, tmp_path.joinpath("snapshot.txt"))
+    export_parameters_to_file(leds, tmp_path.joinpath("faebryk.txt"))
+
+    ours = tmp_path.joinpath("snapshot.txt").read_text()
+    assert "    capacitance: " in ours
+    assert ours == tmp_path.joinpath("faebryk.txt").read_text()
+
+
+def test_snapshot_without_esphome_config(monkeypatch):
+    def make_esphome_config(G):
+        raise KeyError("no bus")
+
+    monkeypatch.setattr(esphome, "make_esphome_config", make_esphome_config)
+    leds = DigitalLED(pixels=1)
+    snapshot = take_snapshot(leds, leds.get_graph(), "fp")
+
+    assert snapshot["esphome"] is None
+    assert snapshot["parameters"]
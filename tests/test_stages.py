@@ -0,0 +1,44 @@
+from pathlib import Path
+
+from vindriktning_esp32_c3.stages import (
+    LAYOUT_SOURCES,
+    SOURCE_DIR,
+    TOOLING_SOURCES,
+    StageTracker,
+    hash_tree,
+)
+
+
+def test_outputs_recorded_relative_to_root(tmp_path, monkeypatch):
+    root = tmp_path.joinpath("repo")
+    out = root.joinpath("build", "faebryk.net")
+    out.parent.mkdir(parents=True)
+    out.write_text("(export)")
+    state = root.joinpath("build", "stages.json")
+
+    monkeypatch.chdir(root)
+    StageTracker(state, root).record("layout", "fp", [Path("build/faebryk.net")])
+
+    # the same output, named from elsewhere
+    monkeypatch.chdir(tmp_path)
+    tracker = StageTracker(state, root)
+    assert list(tracker.records["layout"].outputs) == ["build/faebryk.net"]
+    assert tracker.is_up_to_date("layout", "fp", [out])
+    assert tracker.is_up_to_date("layout", "fp", [Path("repo/build/faebryk.net")])
+
+    out.write_text("(export changed)")
+    assert not tracker.is_up_to_date("layout", "fp", [out])
+
+
+def test_layout_and_tooling_are_no_design_sources(tmp_path):
+    for name in ("app.py", *LAYOUT_SOURCES, *TOOLING_SOURCES):
+        tmp_path.joinpath(name).write_text(SOURCE_DIR.joinpath(name).read_text())
+    excluded = LAYOUT_SOURCES + TOOLING_SOURCES
+    before = hash_tree(tmp_path, "*.py", exclude=excluded)
+
+    for name in excluded:
+        tmp_path.joinpath(name).write_text("# changed\n")
+    assert hash_tree(tmp_path, "*.py", exclude=excluded) == before
+
+    tmp_path.joinpath("app.py").write_text("# changed\n")
+    assert hash_tree(tmp_path, "*.py", exclude=excluded) != before
@@ -0,0 +1,56 @@
+import tomllib
+from importlib.metadata import version
+from pathlib import Path
+
+import faebryk.library._F as F
+from faebryk.core.module import Module
+
+import vindriktning_esp32_c3.util as util
+from vindriktning_esp32_c3.util import design_index
+
+
+class _Board(Module):
+    r1: F.Resistor
+    r2: F.Resistor
+    c1: F.Capacitor
+
+
+def test_results_are_immutable_and_follow_the_design():
+    board = _Board()
+    index = design_index(board)
+
+    resistors = index.of_type(F.Resistor)
+    assert isinstance(resistors, tuple)
+    assert set(resistors) == {board.r1, board.r2}
+    assert index.of_type(F.Diode) == ()
+
+    board.add(F.Resistor(), name="r3")
+    assert len(index.of_type(F.Resistor)) == 3
+    assert len(resistors) == 2
+
+
+def test_invalidate_rebuilds(monkeypatch):
+    board = _Board()
+    index = design_index(board)
+    index.of_type(F.Resistor)
+
+    walks = []
+    iter_children = util.iter_children
+    monkeypatch.setattr(
+        util, "iter_children", lambda *a, **k: walks.append(1) or iter_children(*a, **k)
+    )
+    index.of_type(F.Capacitor)
+    assert not walks
+
+    index.invalidate()
+    assert index.of_type(F.Capacitor) == (board.c1,)
+    assert len(walks) == 1
+
+
+def test_faebryk_is_the_pinned_version():
+    # util.connect follows faebryk internals that change between releases
+    pyproject = Path(__file__).parents[1].joinpath("pyproject.toml")
+    dependencies = tomllib.loads(pyproject.read_text())["tool"]["poetry"][
+        "dependencies"
+    ]
+    assert version("faebryk") == dependencies["faebryk"]
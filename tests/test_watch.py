@@ -0,0 +1,41 @@
+import faebryk.libs.picker.picker as picker
+
+import vindriktning_esp32_c3.app
+import vindriktning_esp32_c3.watch as watch
+from vindriktning_esp32_c3.build import Pipeline
+from vindriktning_esp32_c3.stages import SOURCE_DIR
+
+
+def _without_uuids(pcb: str) -> list[str]:
+    # inserted graphics get fresh ones on every layout
+    return [line for line in pcb.splitlines() if "uuid" not in line]
+
+
+def test_pcb_edit_keeps_the_design(variant_paths, monkeypatch):
+    made, picked = [], []
+    pick = picker.pick_part_recursively
+
+    app_cls = vindriktning_esp32_c3.app.SmartVindrikting
+    init = app_cls.__init__
+
+    def __init__(self, *args):
+        made.append(self)
+        init(self, *args)
+
+    monkeypatch.setattr(app_cls, "__init__", __init__)
+    monkeypatch.setattr(
+        picker, "pick_part_recursively", lambda m: picked.append(1) or pick(m)
+    )
+
+    paths = variant_paths("watch")
+    pipeline = Pipeline(paths, force=True, jobs=1, download_jobs=0)
+    pipeline.layout()
+    laid_out = _without_uuids(paths.pcbfile.read_text())
+
+    # what the watcher does after pcb.py was saved
+    watch._reload(pipeline, {SOURCE_DIR.joinpath("pcb.py")})
+    pipeline.layout()
+
+    assert (len(made), len(picked)) == (1, 1)
+    # laid out again from scratch, not on top of the positions of the first
+    assert _without_uuids(paths.pcbfile.read_text()) == laid_out